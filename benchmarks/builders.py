@@ -0,0 +1,47 @@
+"""Microbenchmarks of the element builders.
+
+Run from the repository root::
+
+    python benchmarks/builders.py [--number N]
+
+"""
+
+import argparse
+import timeit
+
+from premis.agent_base import agent
+from premis.base import identifier, premis_ns
+from premis.event_base import event, outcome
+
+CASES = [
+    ('premis_ns', lambda: premis_ns('eventIdentifierValue')),
+    ('premis_ns with prefix',
+     lambda: premis_ns('IdentifierValue', 'linkingAgent')),
+    ('identifier', lambda: identifier('local', 'object-001')),
+    ('identifier with role', lambda: identifier(
+        'local', 'agent-001', 'linkingAgent', 'executing program')),
+    ('agent', lambda: agent(identifier('local', 'agent-001', 'agent'),
+                            'clamscan', 'software')),
+    ('event', lambda: event(
+        identifier('local', 'event-001', 'event'), 'virus check',
+        '2020-01-01T00:00:00', 'Virus check with ClamAV',
+        child_elements=[outcome('success')],
+        linking_objects=[('local', 'object-001')],
+        linking_agents=[('local', 'agent-001')])),
+]
+
+
+def main():
+    """Print the time per call of each builder"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000,
+                        help='Number of calls per timed run')
+    args = parser.parse_args()
+
+    for name, func in CASES:
+        best = min(timeit.repeat(func, number=args.number, repeat=5))
+        print('{:<24} {:8.2f} us'.format(name, best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark the startup cost of importing the premis package.
+
+Each statement is run in a fresh interpreter, since imports are cached
+within a process. Run from the repository root::
+
+    python benchmarks/import_startup.py [--runs N]
+
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    ('interpreter only', 'pass'),
+    ('import lxml.etree', 'import lxml.etree'),
+    ('import premis', 'import premis'),
+    ('premis.identifier', "import premis; premis.identifier('a', 'b')"),
+    ('premis.event', 'import premis; premis.event'),
+    ('import all base modules',
+     'import premis.base, premis.object_base, premis.event_base, '
+     'premis.agent_base'),
+]
+
+
+def startup_time(statement, runs):
+    """Return median wall clock time of running `statement` in a new
+    interpreter.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    """Print startup times"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20,
+                        help='Number of interpreter launches per statement')
+    args = parser.parse_args()
+
+    for name, statement in STATEMENTS:
+        print('{:<28} {:8.1f} ms'.format(
+            name, startup_time(statement, args.runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
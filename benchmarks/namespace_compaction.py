@@ -0,0 +1,98 @@
+"""Benchmark the effect of namespace compaction on output size and speed.
+
+The document is assembled from separately serialized events with
+PremisWriter, so that each event carries its own namespace declarations,
+like documents concatenated from fragments. The same document is then
+compacted with compact_namespaces. Run from the repository root::
+
+    python benchmarks/namespace_compaction.py [--events N] [--runs N]
+
+"""
+
+import argparse
+import io
+import timeit
+
+import lxml.etree as ET
+
+from premis.base import compact_namespaces, identifier, premis
+from premis.event_base import event, outcome
+from premis.stream import PremisWriter
+
+EXTENSION_NS = 'http://www.example.com/extension'
+
+# pylint: disable=c-extension-no-member
+
+
+def build_events(count):
+    """Return events with an outcome detail extension."""
+    events = []
+    for number in range(count):
+        extension = ET.Element(
+            '{%s}check' % EXTENSION_NS, nsmap={'ext': EXTENSION_NS})
+        extension.text = 'ok'
+        events.append(event(
+            identifier('local', 'event-%d' % number, 'event'),
+            'validation', '2020-01-01T00:00:00', 'File validation',
+            child_elements=[outcome('success', detail_extension=[extension])],
+            linking_objects=[identifier('local', 'object-%d' % number)]))
+    return events
+
+
+def fragmented_document(count, root=None):
+    """Return document whose events carry their own declarations."""
+    output = io.BytesIO()
+    with PremisWriter(output, root) as writer:
+        for elem in build_events(count):
+            writer.write(elem)
+    return output.getvalue()
+
+
+def best_time(func, runs):
+    """Return the best wall clock time of `runs` calls of `func`."""
+    return min(timeit.repeat(func, number=1, repeat=runs))
+
+
+def main():
+    """Print output sizes and compaction, serialization and parsing
+    times
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=10000,
+                        help='Number of events in the document')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of timed runs')
+    args = parser.parse_args()
+
+    documents = {
+        'root without ext': fragmented_document(args.events),
+        'root with ext': fragmented_document(args.events, premis(
+            namespaces={'ext': EXTENSION_NS}))}
+    for name, data in documents.items():
+        compact = best_time(
+            lambda data=data: compact_namespaces(ET.fromstring(data)),
+            args.runs)
+        parse = best_time(lambda data=data: ET.fromstring(data), args.runs)
+        print('compact_namespaces, {:<17} {:7.1f} ms'.format(
+            name + ':', (compact - parse) * 1000))
+
+    for compact in (False, True):
+        print('premis(compact={}): {:7.1f} ms'.format(compact, best_time(
+            lambda compact=compact: premis(
+                child_elements=build_events(args.events), compact=compact),
+            args.runs) * 1000))
+
+    fragmented = ET.fromstring(documents['root without ext'])
+    compacted = compact_namespaces(ET.fromstring(
+        documents['root without ext']))
+    for name, root in (('fragmented', fragmented), ('compacted', compacted)):
+        data = ET.tostring(root)
+        serialize = best_time(lambda root=root: ET.tostring(root), args.runs)
+        parse = best_time(lambda data=data: ET.fromstring(data), args.runs)
+        print('{:<11} {:10d} bytes  serialize {:7.1f} ms  '
+              'parse {:7.1f} ms'.format(
+                  name, len(data), serialize * 1000, parse * 1000))
+
+
+if __name__ == '__main__':
+    main()
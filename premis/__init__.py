@@ -1,7 +1,124 @@
-"""Import everything for making convenient use of the library possible"""
+"""Import everything for making convenient use of the library possible
+
+The functions of the base modules are available as premis.<function>. The
+modules are imported only when one of their functions is first used, so
+importing the package is cheap for short-lived processes. Other submodules,
+such as premis.index, are imported when they are first accessed.
+"""
+import importlib
+import sys
+
 __version__ = '0.29'
 
-from premis.base import *  # noqa: F401,F403
-from premis.object_base import *   # noqa: F401,F403
-from premis.event_base import *  # noqa: F401,F403
-from premis.agent_base import *  # noqa: F401,F403
+# Public names of the base modules and the modules defining them
+_EXPORTS = {
+    'ET': 'base',
+    'NAMESPACES': 'base',
+    'PREMIS_NS': 'base',
+    'XSI_NS': 'base',
+    'compact_namespaces': 'base',
+    'decode_utf8': 'base',
+    'identifier': 'base',
+    'iter_elements': 'base',
+    'parse_identifier': 'base',
+    'parse_identifier_type_value': 'base',
+    'premis': 'base',
+    'premis_ns': 'base',
+    'xsi_ns': 'base',
+    'contains_object': 'object_base',
+    'creating_application': 'object_base',
+    'creating_application_name': 'object_base',
+    'creating_application_version': 'object_base',
+    'date_created': 'object_base',
+    'dependency': 'object_base',
+    'environment': 'object_base',
+    'environments_with_purpose': 'object_base',
+    'filter_objects': 'object_base',
+    'find_object_by_id': 'object_base',
+    'fixity': 'object_base',
+    'format': 'object_base',
+    'format_designation': 'object_base',
+    'format_registry': 'object_base',
+    'get_dependency_identifier': 'object_base',
+    'add_to_object': 'object_base',
+    'iter_environments': 'object_base',
+    'iter_objects': 'object_base',
+    'object': 'object_base',
+    'object_characteristics': 'object_base',
+    'object_count': 'object_base',
+    'objects_with_type': 'object_base',
+    'parse_dependency': 'object_base',
+    'parse_fixity': 'object_base',
+    'parse_fixities': 'object_base',
+    'parse_format': 'object_base',
+    'parse_format_registry': 'object_base',
+    'parse_object_record': 'object_base',
+    'parse_object_type': 'object_base',
+    'parse_original_name': 'object_base',
+    'parse_relationship': 'object_base',
+    'parse_relationship_subtype': 'object_base',
+    'parse_relationship_type': 'object_base',
+    'relationship': 'object_base',
+    'add_to_event': 'event_base',
+    'event': 'event_base',
+    'event_count': 'event_base',
+    'event_with_type_and_detail': 'event_base',
+    'events_with_outcome': 'event_base',
+    'find_event_by_id': 'event_base',
+    'iter_events': 'event_base',
+    'link_agents': 'event_base',
+    'link_objects': 'event_base',
+    'outcome': 'event_base',
+    'parse_datetime': 'event_base',
+    'parse_detail': 'event_base',
+    'parse_event_record': 'event_base',
+    'parse_event_type': 'event_base',
+    'parse_outcome': 'event_base',
+    'parse_outcome_detail_extension': 'event_base',
+    'parse_outcome_detail_note': 'event_base',
+    'agent': 'agent_base',
+    'AgentRegistry': 'agent_base',
+    'agent_count': 'agent_base',
+    'agents_with_type': 'agent_base',
+    'find_agent_by_id': 'agent_base',
+    'iter_agents': 'agent_base',
+    'parse_agent_record': 'agent_base',
+    'parse_agent_type': 'agent_base',
+    'parse_name': 'agent_base',
+    'parse_note': 'agent_base',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    """Import the module defining `name` on first access."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        if name.startswith('__'):
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name))
+        try:
+            return importlib.import_module(__name__ + '.' + name)
+        except ModuleNotFoundError as error:
+            if error.name != __name__ + '.' + name:
+                raise
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module(__name__ + '.' + module_name),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) is not supported
+    from premis.base import *  # noqa: F401,F403
+    from premis.object_base import *   # noqa: F401,F403
+    from premis.event_base import *  # noqa: F401,F403
+    from premis.agent_base import *  # noqa: F401,F403
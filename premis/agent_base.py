@@ -9,9 +9,13 @@ References:
 
 """
 
+import copy
+
 from xml_helpers.utils import decode_utf8
-from premis.base import (_element, _subelement, iter_elements, premis_ns,
-                         NAMESPACES)
+
+from premis import memo
+from premis.base import (_element, _subelement, _text, identifier,
+                         iter_elements, premis_ns, NAMESPACES)
 
 
 def agent(agent_id, agent_name, agent_type, note=None):
@@ -42,18 +46,116 @@ def agent(agent_id, agent_name, agent_type, note=None):
     _agent.append(agent_id)
 
     _agent_name = _subelement(_agent, 'agentName')
-    _agent_name.text = decode_utf8(agent_name)
+    _agent_name.text = _text(agent_name)
 
     _agent_type = _subelement(_agent, 'agentType')
-    _agent_type.text = decode_utf8(agent_type)
+    _agent_type.text = _text(agent_type)
 
     if note is not None:
         _agent_type = _subelement(_agent, 'agentNote')
-        _agent_type.text = decode_utf8(note)
+        _agent_type.text = _text(note)
 
     return _agent
 
 
+class AgentRegistry:
+    """Distinct PREMIS agents keyed by (identifier type, identifier value).
+
+    Each agent is built once, and its linkingAgentIdentifier is prebuilt
+    for linking the agent to events::
+
+        registry = AgentRegistry()
+        key = registry.add('local', 'clamscan', 'clamscan', 'software')
+        event(..., linking_agents=[registry.linking_identifier(key)])
+        premis(child_elements=objects + events + registry.agents())
+
+    """
+
+    def __init__(self):
+        self._agents = {}
+        self._linking_identifiers = {}
+
+    def __contains__(self, key):
+        return key in self._agents
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __iter__(self):
+        return iter(self._agents)
+
+    def add(self, identifier_type, identifier_value, agent_name, agent_type,
+            note=None):
+        """Add an agent unless an agent with the same identifier exists.
+
+        :identifier_type: Agent identifier type
+        :identifier_value: Agent identifier value
+        :agent_name: Agent name
+        :agent_type: Agent type
+        :note: Agent note (default=None)
+        :returns: Key of the agent
+
+        """
+        key = (decode_utf8(identifier_type), decode_utf8(identifier_value))
+        if key not in self._agents:
+            self._agents[key] = agent(
+                identifier(key[0], key[1], 'agent'), agent_name, agent_type,
+                note)
+        return key
+
+    def add_element(self, agent_elem):
+        """Add an agent element unless an agent with the same identifier
+        exists.
+
+        :agent_elem: Agent element
+        :returns: Key of the agent
+
+        """
+        key = (agent_elem.findtext('/'.join([
+            premis_ns('agentIdentifier'), premis_ns('agentIdentifierType')])),
+               agent_elem.findtext('/'.join([
+                   premis_ns('agentIdentifier'),
+                   premis_ns('agentIdentifierValue')])))
+        self._agents.setdefault(key, agent_elem)
+        return key
+
+    def get(self, key):
+        """Return the agent element with given key or None."""
+        return self._agents.get(key)
+
+    def linking_identifier(self, key, role=None):
+        """Return the linkingAgentIdentifier of an agent.
+
+        The same element is returned on every call. :func:`event` copies it
+        to the event, so it must not be appended to other elements as such.
+
+        :key: Key of the agent
+        :role: Linking agent role (default=None)
+        :returns: linkingAgentIdentifier element
+        :raises KeyError: If the agent is not in the registry
+
+        """
+        cache_key = (key, role)
+        linking = self._linking_identifiers.get(cache_key)
+        if linking is None:
+            if key not in self._agents:
+                raise KeyError(key)
+            linking = identifier(key[0], key[1], 'linkingAgent', role)
+            self._linking_identifiers[cache_key] = linking
+        return linking
+
+    def agents(self):
+        """Return copies of the agents in the order they were added.
+
+        Copies are returned, so the registry can be used for more than one
+        document.
+
+        :returns: List of agent elements
+
+        """
+        return [copy.deepcopy(elem) for elem in self._agents.values()]
+
+
 def iter_agents(premis):
     """Iterate all PREMIS agents from starting element.
 
@@ -109,6 +211,7 @@ def agents_with_type(agents, agent_type='organization'):
 
 # pylint: disable=redefined-outer-name
 # Listed as requiring a fix in KDKPAS-2522
+@memo.memoize
 def parse_name(agent):
     """
     :param agent: Agent Element object.
@@ -118,6 +221,7 @@ def parse_name(agent):
                                    namespaces=NAMESPACES)[0])
 
 
+@memo.memoize
 def parse_agent_type(agent):
     """
     :param agent: Agent Element object.
@@ -127,6 +231,7 @@ def parse_agent_type(agent):
                                    namespaces=NAMESPACES)[0])
 
 
+@memo.memoize
 def parse_note(agent):
     """
     :param agent: Agent Element object.
@@ -134,3 +239,24 @@ def parse_note(agent):
     """
     return decode_utf8(agent.xpath(".//premis:agentNote/text()",
                                    namespaces=NAMESPACES)[0])
+
+
+def parse_agent_record(agent):
+    """Return the fields of a PREMIS agent as a dictionary.
+
+    The record contains only strings, so it can be pickled or serialized
+    as JSON.
+
+    :param agent: Agent Element object.
+    :return: Dictionary with keys identifier_type, identifier_value, name,
+             type and note
+    """
+    return {
+        'identifier_type': agent.findtext('/'.join([
+            premis_ns('agentIdentifier'), premis_ns('agentIdentifierType')])),
+        'identifier_value': agent.findtext('/'.join([
+            premis_ns('agentIdentifier'),
+            premis_ns('agentIdentifierValue')])),
+        'name': agent.findtext(premis_ns('agentName')),
+        'type': agent.findtext(premis_ns('agentType')),
+        'note': agent.findtext(premis_ns('agentNote'))}
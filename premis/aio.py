@@ -0,0 +1,234 @@
+"""Asyncio interface for reading and writing PREMIS documents.
+
+Parsing, serialization and validation run in an executor, so they do not
+block the event loop::
+
+    async for event in aiter_events('premis.xml'):
+        ...
+
+    async with AsyncPremisWriter('out.xml') as writer:
+        await writer.write(event(...))
+
+By default the default executor of the event loop is used, which has a
+bounded number of worker threads. Elements are passed from the parsing
+thread to the consumer through a bounded queue, so parsing pauses when the
+consumer falls behind.
+
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+import lxml.etree as ET
+
+from premis.stream import ELEMENT_KINDS, PremisWriter, iterparse_elements
+
+# pylint: disable=c-extension-no-member
+
+_END = object()
+
+# asyncio.get_running_loop is new in Python 3.7. Before it, get_event_loop
+# returns the running loop when called from a coroutine.
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class _Error:
+    """Exception raised in the parsing thread."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def _run(executor, func, *args):
+    """Run `func` in `executor` and return the result."""
+    loop = _running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args))
+
+
+async def aiter_elements(source, kinds=ELEMENT_KINDS, executor=None,
+                         queue_size=100):
+    """Iterate PREMIS elements from a file asynchronously.
+
+    :param source: Path or binary file object
+    :param kinds: Local names of the elements to iterate
+    :param executor: Executor for parsing (default: default executor of the
+                     event loop)
+    :param queue_size: Number of parsed elements waiting for the consumer
+                       before parsing pauses
+    :returns: Asynchronous generator object for iterating elements
+
+    """
+    loop = _running_loop()
+    queue = asyncio.Queue(queue_size)
+    stopped = threading.Event()
+
+    def put(item):
+        """Put item to the queue, waiting while the queue is full.
+
+        :returns: False if the consumer has stopped, True otherwise
+        """
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stopped.is_set() or loop.is_closed():
+                    future.cancel()
+                    return False
+
+    def produce():
+        """Parse elements and pass them to the consumer."""
+        try:
+            for elem in iterparse_elements(source, kinds):
+                if not put(elem):
+                    return
+        except Exception as error:  # pylint: disable=broad-except
+            put(_Error(error))
+            return
+        put(_END)
+
+    producer = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _Error):
+                raise item.error
+            yield item
+    finally:
+        # The parsing thread stops when it next waits for the queue
+        stopped.set()
+        await producer
+
+
+def aiter_objects(source, executor=None, queue_size=100):
+    """Iterate PREMIS objects from a file asynchronously.
+
+    :param source: Path or binary file object
+    :returns: Asynchronous generator object for iterating objects
+
+    """
+    return aiter_elements(source, ['object'], executor, queue_size)
+
+
+def aiter_events(source, executor=None, queue_size=100):
+    """Iterate PREMIS events from a file asynchronously.
+
+    :param source: Path or binary file object
+    :returns: Asynchronous generator object for iterating events
+
+    """
+    return aiter_elements(source, ['event'], executor, queue_size)
+
+
+def aiter_agents(source, executor=None, queue_size=100):
+    """Iterate PREMIS agents from a file asynchronously.
+
+    :param source: Path or binary file object
+    :returns: Asynchronous generator object for iterating agents
+
+    """
+    return aiter_elements(source, ['agent'], executor, queue_size)
+
+
+async def parse(source, executor=None):
+    """Parse a PREMIS document asynchronously.
+
+    :param source: Path or binary file object
+    :param executor: Executor for parsing
+    :returns: Root element of the document
+
+    """
+    tree = await _run(executor, ET.parse, source)
+    return tree.getroot()
+
+
+def _validate(document, schema):
+    """Validate document against schema and return the error log."""
+    if not isinstance(schema, ET.XMLSchema):
+        schema = ET.XMLSchema(ET.parse(schema))
+    if not hasattr(document, 'tag'):
+        document = ET.parse(document)
+    schema.validate(document)
+    return schema.error_log
+
+
+async def validate(document, schema, executor=None):
+    """Validate a PREMIS document against an XML schema asynchronously.
+
+    The schema is read from a local file, so no network access is needed
+    if the schema does not import remote schemas.
+
+    :param document: Element, path or binary file object
+    :param schema: Path to the XML schema or lxml.etree.XMLSchema object
+    :param executor: Executor for validation
+    :returns: List of validation errors, empty if the document is valid
+
+    """
+    error_log = await _run(executor, _validate, document, schema)
+    return list(error_log)
+
+
+class AsyncPremisWriter:
+    """Write a PREMIS document element by element asynchronously.
+
+    Serialization and writing run in the executor. The executor calls are
+    serialized with a lock, so writes started concurrently, e.g. with
+    asyncio.gather(), are written one at a time in the order they were
+    started.
+
+    :param target: Path or binary file object to write to
+    :param root: Root element of the document (default: premis())
+    :param executor: Executor for serialization and writing
+
+    """
+
+    def __init__(self, target, root=None, executor=None):
+        self._writer = PremisWriter(target, root)
+        self._executor = executor
+        # Created on first use, as a lock is bound to the event loop in
+        # older Python versions
+        self._lock = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _call(self, func, *args):
+        """Run `func` in the executor after the preceding calls."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await _run(self._executor, func, *args)
+
+    async def open(self):
+        """Write the XML declaration and the root start tag."""
+        await self._call(self._writer.open)
+
+    async def close(self):
+        """Write the root end tag and close the target."""
+        await self._call(self._writer.close)
+
+    async def write(self, elem):
+        """Write an element or a serialized element to the document."""
+        await self._call(self._writer.write, elem)
+
+    async def write_many(self, elements):
+        """Write multiple elements to the document in one executor call."""
+        def write_all():
+            """Write all elements"""
+            for elem in elements:
+                self._writer.write(elem)
+        await self._call(write_all)
+
+    async def write_raw(self, data, namespaces=None):
+        """Write a serialized element to the document as such."""
+        await self._call(self._writer.write_raw, data, namespaces)
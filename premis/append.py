@@ -0,0 +1,351 @@
+"""Functions for appending elements to existing PREMIS files.
+
+Elements are written directly into the file without parsing it. Only the
+part of the file after the insertion point is rewritten, so appending an
+event costs time in proportion to the event and the agents following it
+instead of the whole file::
+
+    with PremisAppender('premis.xml') as appender:
+        appender.append(event(...))
+        appender.append(agent(...))
+
+New elements are placed after the last existing element of the same type,
+or of the preceding type, so that objects, events, agents and rights stay in
+the order required by the PREMIS schema.
+
+Before the file is modified, the original bytes after the insertion point
+are saved to a journal file. If appending is interrupted, the next append
+or a call to :func:`recover` restores the file from the journal.
+
+"""
+
+import os
+import re
+
+import lxml.etree as ET
+
+from premis.stream import iter_tags, mapped_file
+
+ELEMENT_ORDER = ('object', 'event', 'agent', 'rights')
+JOURNAL_SUFFIX = '.journal'
+
+# pylint: disable=c-extension-no-member
+
+_ROOT_END_RE = re.compile(rb'</((?:[^\s/<>:]+:)?)premis\s*>')
+_ATTRIBUTES = rb'(?:[^>"\']|"[^"]*"|\'[^\']*\')*'
+_START_TAG_RE = re.compile(rb'\s*<(?:[^\s/>:]+:)?([^\s/>:]+)')
+# Chunk size of the first search from the end of a file
+_SEARCH_CHUNK = 4096
+
+
+def _serialize(elem):
+    """Return element as bytes. Bytes are returned as such."""
+    if isinstance(elem, (bytes, bytearray, memoryview)):
+        return bytes(elem)
+    return ET.tostring(elem, encoding='UTF-8', with_tail=False)
+
+
+def _element_kind(data):
+    """Return local name of the serialized element in `data`."""
+    match = _START_TAG_RE.match(data)
+    if match is None:
+        raise ValueError("Appended data does not start with an element")
+    return match.group(1).decode('utf-8')
+
+
+def _element_order(data):
+    """Return sort key for serialized element by ELEMENT_ORDER."""
+    kind = _element_kind(data)
+    if kind in ELEMENT_ORDER:
+        return ELEMENT_ORDER.index(kind)
+    return len(ELEMENT_ORDER)
+
+
+class _AmbiguousMarkup(Exception):
+    """Raised when a tag found by searching from the end of a file may be
+    inside a comment, CDATA section or processing instruction.
+    """
+
+
+def _inside_markup(buf, pos, end):
+    """Return True if `pos` may be inside a comment, CDATA section or
+    processing instruction that ends before `end`.
+
+    Only the bytes from `pos` to `end` are read. A position inside a
+    comment is followed by '-->' without a preceding '<!--', as comments
+    cannot contain '--'. CDATA sections and processing instructions may
+    contain their own opening delimiter, so any ']]>' or '?>' is reported.
+    The check never misses a position inside such markup, but it may
+    report positions followed by e.g. '?>' in text content.
+    """
+    close = buf.find(b'-->', pos, end)
+    if close != -1 and buf.find(b'<!--', pos, close) == -1:
+        return True
+    return (buf.find(b']]>', pos, end) != -1 or
+            buf.find(b'?>', pos, end) != -1)
+
+
+def _search_last(pattern, buf, end):
+    """Return the last match of a pattern before `end` or None.
+
+    The file is searched backwards in growing chunks, so that only the end
+    of the file is read when the match is near it.
+    """
+    chunk = _SEARCH_CHUNK
+    while True:
+        start = max(0, end - chunk)
+        match = None
+        for match in pattern.finditer(buf, start, end):
+            pass
+        if match is not None or start == 0:
+            return match
+        chunk *= 16
+
+
+def _root_end(buf):
+    """Return offset and prefix of the closing premis:premis tag."""
+    match = _search_last(_ROOT_END_RE, buf, len(buf))
+    if match is None:
+        raise ValueError("Closing premis:premis tag not found")
+    if _inside_markup(buf, match.start(), len(buf)):
+        raise _AmbiguousMarkup
+    return match.start(), match.group(1)
+
+
+def _insert_position(buf, prefix, kind, root_end):
+    """Return offset where an element of type `kind` is inserted.
+
+    The element is placed after the last element of the same type or of
+    a preceding type in ELEMENT_ORDER. As the elements are in schema order,
+    this is the last closing tag of any of those types.
+    """
+    if kind not in ELEMENT_ORDER:
+        return root_end
+    candidates = ELEMENT_ORDER[:ELEMENT_ORDER.index(kind) + 1]
+    end_tag = re.compile(
+        rb'</' + re.escape(prefix) +
+        rb'(?:' + b'|'.join(name.encode('utf-8') for name in candidates) +
+        rb')\s*>')
+    match = _search_last(end_tag, buf, root_end)
+    if match is None:
+        # No preceding elements, insert after the premis:premis start tag
+        root_start = re.compile(
+            rb'<' + re.escape(prefix) + rb'premis' + _ATTRIBUTES + rb'>')
+        match = root_start.search(buf)
+    if _inside_markup(buf, match.start(), root_end):
+        raise _AmbiguousMarkup
+    return match.end()
+
+
+def _scan_structure(buf):
+    """Return the offsets of the root element and the end offsets of the
+    last child elements of each type by tokenizing the whole document.
+
+    :returns: (end of the root start tag, start of the root end tag,
+              dictionary of end offsets by local name)
+
+    """
+    depth = 0
+    root_start = root_end = None
+    ends = {}
+    for start, end, name, kind in iter_tags(buf):
+        if kind == 'end':
+            depth -= 1
+            if depth == 0:
+                root_end = start
+            elif depth == 1:
+                ends[name.rpartition(b':')[2].decode('utf-8')] = end
+        elif kind == 'empty':
+            if depth == 1:
+                ends[name.rpartition(b':')[2].decode('utf-8')] = end
+        else:
+            if depth == 0:
+                root_start = end
+            depth += 1
+    if root_end is None:
+        raise ValueError("Closing premis:premis tag not found")
+    return root_start, root_end, ends
+
+
+def _scanned_position(structure, kind):
+    """Return offset where an element of type `kind` is inserted using the
+    result of _scan_structure.
+    """
+    root_start, root_end, ends = structure
+    if kind not in ELEMENT_ORDER:
+        return root_end
+    for candidate in reversed(ELEMENT_ORDER[:ELEMENT_ORDER.index(kind) + 1]):
+        if candidate in ends:
+            return ends[candidate]
+    return root_start
+
+
+def _insert_positions(buf, fragments):
+    """Return serialized elements grouped by their insertion offsets.
+
+    The insertion points are first searched from the end of the file. If a
+    found tag may be inside a comment, CDATA section or processing
+    instruction, the whole document is tokenized instead.
+    """
+    positions = {}
+    try:
+        root_end, prefix = _root_end(buf)
+        for data in fragments:
+            pos = _insert_position(
+                buf, prefix, _element_kind(data), root_end)
+            positions.setdefault(pos, []).append(data)
+    except _AmbiguousMarkup:
+        structure = _scan_structure(buf)
+        positions = {}
+        for data in fragments:
+            pos = _scanned_position(structure, _element_kind(data))
+            positions.setdefault(pos, []).append(data)
+    return positions
+
+
+def _fsync_directory(path):
+    """Flush directory entry changes of the directory containing `path`."""
+    try:
+        descriptor = os.open(
+            os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def _write_journal(path, offset, data):
+    """Save the original bytes starting from `offset` to the journal."""
+    journal = path + JOURNAL_SUFFIX
+    temp_path = journal + '.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(b'%d\n' % offset)
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, journal)
+    _fsync_directory(path)
+
+
+def recover(path):
+    """Restore a PREMIS file after an interrupted append.
+
+    :param path: Path to the PREMIS file
+    :returns: True if the file was restored, False if there was nothing
+              to restore
+
+    """
+    journal = path + JOURNAL_SUFFIX
+    if os.path.exists(journal + '.tmp'):
+        # The journal was not completed, so the file was not modified
+        os.remove(journal + '.tmp')
+    if not os.path.exists(journal):
+        return False
+
+    with open(journal, 'rb') as handle:
+        offset = int(handle.readline())
+        data = handle.read()
+    with open(path, 'r+b') as handle:
+        handle.seek(offset)
+        handle.write(data)
+        handle.truncate()
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.remove(journal)
+    _fsync_directory(path)
+    return True
+
+
+def append_elements(path, elements):
+    """Append elements to a PREMIS file in a single write.
+
+    :param path: Path to the PREMIS file
+    :param elements: Iterable of ElementTree elements or serialized
+                     elements as bytes
+    :returns: Number of appended elements
+
+    """
+    recover(path)
+    fragments = [_serialize(elem) for elem in elements]
+    if not fragments:
+        return 0
+
+    with mapped_file(path) as buf:
+        positions = _insert_positions(buf, fragments)
+        first = min(positions)
+        original = bytes(buf[first:])
+
+    region = []
+    last = first
+    for pos in sorted(positions):
+        region.append(original[last - first:pos - first])
+        region.extend(sorted(positions[pos], key=_element_order))
+        last = pos
+    region.append(original[last - first:])
+
+    _write_journal(path, first, original)
+    with open(path, 'r+b') as handle:
+        handle.seek(first)
+        handle.write(b''.join(region))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.remove(path + JOURNAL_SUFFIX)
+    _fsync_directory(path)
+
+    return len(fragments)
+
+
+class PremisAppender:
+    """Collect elements and append them to a PREMIS file in one write.
+
+    Collected elements are written when :meth:`flush` is called or when the
+    context manager exits without an exception.
+
+    :param path: Path to the PREMIS file
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fragments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def append(self, elem):
+        """Add an element to be appended.
+
+        :param elem: ElementTree element or serialized element as bytes
+
+        """
+        self._fragments.append(_serialize(elem))
+
+    def extend(self, elements):
+        """Add elements to be appended.
+
+        :param elements: Iterable of elements or serialized elements
+
+        """
+        for elem in elements:
+            self.append(elem)
+
+    def flush(self):
+        """Write the collected elements to the file.
+
+        :returns: Number of appended elements
+
+        """
+        count = append_elements(self.path, self._fragments)
+        self._fragments = []
+        return count
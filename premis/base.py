@@ -9,18 +9,81 @@ References:
 
 """
 
+import bisect
+
 import lxml.etree as ET
 from xml_helpers.utils import XSI_NS, xsi_ns, decode_utf8
 
+from premis import memo
+
 PREMIS_NS = 'info:lc/xmlns/premis-v2'
 NAMESPACES = {'premis': PREMIS_NS,
               'xsi': XSI_NS}
 
+_PREMIS_NSMAP = {'premis': PREMIS_NS}
+
 # using lxml.etree causes these, but importing c extensions is not a problem
 # for us
 # pylint: disable=c-extension-no-member
 
 
+# Local names of the PREMIS elements used in the library
+_TAGS = [
+    'premis', 'object', 'event', 'agent', 'rights',
+    'objectIdentifier', 'objectIdentifierType', 'objectIdentifierValue',
+    'preservationLevel', 'significantProperties', 'objectCharacteristics',
+    'compositionLevel', 'fixity', 'messageDigestAlgorithm', 'messageDigest',
+    'messageDigestOriginator', 'size', 'format', 'formatDesignation',
+    'formatName', 'formatVersion', 'formatRegistry', 'formatRegistryName',
+    'formatRegistryKey', 'formatRegistryRole', 'creatingApplication',
+    'creatingApplicationName', 'creatingApplicationVersion',
+    'dateCreatedByApplication', 'inhibitors', 'objectCharacteristicsExtension',
+    'originalName', 'storage', 'environment', 'environmentCharacteristic',
+    'environmentPurpose', 'environmentNote', 'environmentExtension',
+    'dependency', 'dependencyName', 'signatureInformation', 'relationship',
+    'relationshipType', 'relationshipSubType', 'relatedObjectIdentification',
+    'relatedEventIdentification', 'eventIdentifier', 'eventIdentifierType',
+    'eventIdentifierValue', 'eventType', 'eventDateTime', 'eventDetail',
+    'eventOutcomeInformation', 'eventOutcome', 'eventOutcomeDetail',
+    'eventOutcomeDetailNote', 'eventOutcomeDetailExtension',
+    'agentIdentifier', 'agentIdentifierType', 'agentIdentifierValue',
+    'agentName', 'agentNote', 'agentType', 'agentExtension']
+
+# Prefixes of the identifier elements built with identifier()
+_IDENTIFIER_PREFIXES = [
+    'object', 'event', 'agent', 'dependency', 'relatedObject',
+    'relatedEvent', 'linkingObject', 'linkingEvent', 'linkingAgent',
+    'linkingIntellectualEntity', 'linkingRightsStatement']
+
+
+def _premis_ns(tag, prefix):
+    """Return PREMIS qualified name without using the name table."""
+    if prefix:
+        tag = tag[0].upper() + tag[1:]
+        return f'{{{PREMIS_NS}}}{prefix}{tag}'
+    return f'{{{PREMIS_NS}}}{tag}'
+
+
+# Precomputed qualified names by (tag, prefix), as premis_ns() is called
+# for every element built or searched
+_QNAMES = {(tag, ''): _premis_ns(tag, '') for tag in _TAGS}
+_QNAMES.update(
+    ((tag, prefix), _premis_ns(tag, prefix))
+    for prefix in _IDENTIFIER_PREFIXES
+    for tag in ['Identifier', 'IdentifierType', 'IdentifierValue', 'Role',
+                'Identification'])
+
+
+def _text(value):
+    """Return text value as str, decoding UTF-8 encoded bytes.
+
+    Values that already are str are returned without calling decode_utf8.
+    """
+    if value.__class__ is str:
+        return value
+    return decode_utf8(value)
+
+
 def premis_ns(tag, prefix=""):
     """Prefix ElementTree tags with PREMIS namespace.
     object -> {info:lc...premis}object
@@ -29,13 +92,12 @@ def premis_ns(tag, prefix=""):
     :returns: Prefixed tag
 
     """
-    tag = decode_utf8(tag)
-
-    if prefix:
-        prefix = decode_utf8(prefix)
-        tag = tag[0].upper() + tag[1:]
-        return f'{{{PREMIS_NS}}}{prefix}{tag}'
-    return f'{{{PREMIS_NS}}}{tag}'
+    try:
+        return _QNAMES[tag, prefix]
+    except KeyError:
+        pass
+    prefix = _text(prefix)
+    return _premis_ns(_text(tag), prefix)
 
 
 def _element(tag, prefix="", ns=None):
@@ -55,8 +117,9 @@ def _element(tag, prefix="", ns=None):
 
     """
     if ns is None:
-        ns = {}
-    ns['premis'] = PREMIS_NS
+        ns = _PREMIS_NSMAP
+    else:
+        ns['premis'] = PREMIS_NS
     return ET.Element(premis_ns(tag, prefix), nsmap=ns)
 
 
@@ -73,8 +136,9 @@ def _subelement(parent, tag, prefix="", ns=None):
 
     """
     if ns is None:
-        ns = {}
-    ns['premis'] = PREMIS_NS
+        ns = _PREMIS_NSMAP
+    else:
+        ns['premis'] = PREMIS_NS
     return ET.SubElement(parent, premis_ns(tag, prefix), nsmap=ns)
 
 
@@ -134,7 +198,7 @@ def identifier(identifier_type, identifier_value, prefix='object', role=None):
         </premis:linkingAgentIdentifier>
 
     """
-    prefix = decode_utf8(prefix)
+    prefix = _text(prefix)
 
     if prefix == 'relatedObject':
         _identifier = _element('Identification', prefix)
@@ -143,12 +207,12 @@ def identifier(identifier_type, identifier_value, prefix='object', role=None):
 
     _type = _subelement(_identifier, 'IdentifierType', prefix)
     if identifier_type is not None:
-        identifier_type = decode_utf8(identifier_type)
+        identifier_type = _text(identifier_type)
     _type.text = identifier_type
 
     _value = _subelement(_identifier, 'IdentifierValue', prefix)
     if identifier_value is not None:
-        identifier_value = decode_utf8(identifier_value)
+        identifier_value = _text(identifier_value)
     _value.text = identifier_value
 
     if 'linking' in prefix and role is not None:
@@ -158,6 +222,60 @@ def identifier(identifier_type, identifier_value, prefix='object', role=None):
     return _identifier
 
 
+class _ChildRanks:
+    """Sequence of the schema ranks of the children of an element, for
+    binary search over the children. Ranks are looked up on access.
+    """
+
+    def __init__(self, parent, ranks):
+        self.parent = parent
+        self.ranks = ranks
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __getitem__(self, index):
+        return self.ranks.get(self.parent[index].tag, -1)
+
+
+def _insert_in_order(parent, elem, ranks):
+    """Insert element among the children of `parent` in schema order, after
+    the existing children of the same type.
+
+    :parent: Parent element with children in schema order
+    :elem: Element to insert
+    :ranks: Dictionary of schema order numbers by tag
+    :returns: Parent element
+    :raises ValueError: If the element is not allowed in the parent
+
+    """
+    rank = ranks.get(elem.tag)
+    if rank is None:
+        raise ValueError("Element {} is not allowed in {}".format(
+            elem.tag, parent.tag))
+    parent.insert(bisect.bisect_right(_ChildRanks(parent, ranks), rank), elem)
+    memo.invalidate(parent)
+    return parent
+
+
+def _identifier_fields(value):
+    """Return (type, value, role) of an identifier given as a tuple or a
+    record.
+
+    :value: (type, value) or (type, value, role) tuple, or a dictionary
+            with keys identifier_type, identifier_value and optionally role
+    :returns: (identifier_type, identifier_value, role) tuple, or None if
+              `value` is an element
+
+    """
+    if isinstance(value, dict):
+        return (value['identifier_type'], value['identifier_value'],
+                value.get('role'))
+    if isinstance(value, (tuple, list)):
+        return (tuple(value) + (None,))[:3]
+    return None
+
+
 def parse_identifier_type_value(id_elem, prefix='object'):
     """Return identifierType and IdentifierValue from given PREMIS id.
     If segment contains multiple identifiers, returns first
@@ -188,10 +306,71 @@ def parse_identifier_type_value(id_elem, prefix='object'):
     return None
 
 
-def premis(child_elements=None, namespaces=None):
+def _hoistable_namespaces(elements, nsmap=None):
+    """Return the namespace declarations of elements and their descendants
+    that can be declared once at the root element.
+
+    Default namespaces and prefixes bound to different namespaces in
+    different places are excluded, unless bound in `nsmap`.
+
+    :elements: Iterable of elements
+    :nsmap: Namespace declarations of the root element
+    :returns: Dictionary of namespaces by prefix
+
+    """
+    top_nsmap = dict(nsmap or {})
+    conflicting = set()
+    for element in elements:
+        for elem in element.iter(ET.Element):
+            for prefix, uri in elem.nsmap.items():
+                if prefix is None or prefix in conflicting:
+                    continue
+                if top_nsmap.setdefault(prefix, uri) != uri:
+                    conflicting.add(prefix)
+    for prefix in conflicting:
+        if prefix not in (nsmap or {}):
+            del top_nsmap[prefix]
+    top_nsmap.pop(None, None)
+    return top_nsmap
+
+
+def compact_namespaces(root):
+    """Move namespace declarations to the root element and remove redundant
+    declarations from the descendants.
+
+    Declarations of prefixes that are bound to different namespaces in
+    different parts of the tree, and default namespace declarations, are
+    left in place. Declarations are kept even if unused, as prefixes may be
+    used in attribute values, e.g. xsi:type="premis:file".
+
+    :root: Root element, modified in place
+    :returns: The root element
+
+    """
+    top_nsmap = _hoistable_namespaces(list(root), root.nsmap)
+    if all(root.nsmap.get(prefix) == uri
+           for prefix, uri in top_nsmap.items()):
+        # lxml removes declarations already in scope when elements are
+        # moved to another document, which is much faster than
+        # cleanup_namespaces
+        children = list(root)
+        ET.Element('tmp').extend(children)
+        root.extend(children)
+    else:
+        ET.cleanup_namespaces(root, top_nsmap=top_nsmap,
+                              keep_ns_prefixes=list(top_nsmap))
+    return root
+
+
+def premis(child_elements=None, namespaces=None, compact=False):
     """Create PREMIS Data Dictionary root element.
 
     :child_elements: Any elements appended to the PREMIS dictionary
+    :namespaces: Namespace declarations of the root element
+                 (default=NAMESPACES)
+    :compact: Move the namespace declarations of the child elements and
+              their descendants to the root element, see
+              :func:`compact_namespaces` (default=False)
 
     Returns the following ElementTree structure::
 
@@ -206,6 +385,9 @@ def premis(child_elements=None, namespaces=None):
     """
     if namespaces is None:
         namespaces = NAMESPACES
+    if compact and child_elements:
+        child_elements = list(child_elements)
+        namespaces = _hoistable_namespaces(child_elements, namespaces)
     _premis = _element('premis', ns=namespaces)
     _premis.set(
         xsi_ns('schemaLocation'),
@@ -214,6 +396,8 @@ def premis(child_elements=None, namespaces=None):
     _premis.set('version', '2.2')
 
     if child_elements:
+        # Appending under a root declaring all namespaces removes redundant
+        # declarations from the appended elements
         for elem in child_elements:
             _premis.append(elem)
 
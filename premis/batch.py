@@ -0,0 +1,125 @@
+"""Functions for parsing many PREMIS files concurrently.
+
+lxml releases the GIL while parsing, so a thread pool parses files in
+parallel without the cost of passing results between processes. A process
+pool can be used for extraction functions that spend most of their time in
+Python code::
+
+    for path, record_list in parse_many(paths, extract=event_records):
+        ...
+
+"""
+
+from collections import Counter, deque
+from concurrent.futures import (FIRST_COMPLETED, Executor,
+                                ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait)
+
+import lxml.etree as ET
+
+from premis.base import iter_elements
+from premis.event_base import iter_events, parse_event_record
+from premis.parallel import chunks, pending_limit
+from premis.stream import ELEMENT_KINDS
+
+# pylint: disable=c-extension-no-member
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor
+}
+
+
+def count_elements(premis_elem):
+    """Return number of PREMIS objects, events and agents.
+
+    :param premis_elem: ElementTree element
+    :returns: Counter of element types
+
+    """
+    counts = Counter({kind: 0 for kind in ELEMENT_KINDS})
+    for kind in ELEMENT_KINDS:
+        for _ in iter_elements(premis_elem, kind):
+            counts[kind] += 1
+    return counts
+
+
+def event_records(premis_elem):
+    """Return records of all PREMIS events.
+
+    :param premis_elem: ElementTree element
+    :returns: List of dictionaries returned by parse_event_record
+
+    """
+    return [parse_event_record(event) for event in iter_events(premis_elem)]
+
+
+def _parse_chunk(paths, extract, return_exceptions):
+    """Parse files and return (path, result) tuples."""
+    results = []
+    for path in paths:
+        try:
+            root = ET.parse(path).getroot()
+            results.append((path, extract(root) if extract else root))
+        except Exception as error:  # pylint: disable=broad-except
+            if not return_exceptions:
+                raise
+            results.append((path, error))
+    return results
+
+
+# pylint: disable=too-many-arguments
+def parse_many(paths, extract=None, executor='thread', max_workers=None,
+               chunksize=1, ordered=True, return_exceptions=False):
+    """Parse PREMIS files concurrently.
+
+    At most two chunks of files per worker are processed at a time, so
+    `paths` can be a lazy iterable.
+
+    :param paths: Iterable of file paths
+    :param extract: Function called with the root element of each file.
+                    The root element itself is returned by default, which
+                    is not possible with a process pool.
+    :param executor: 'thread', 'process' or an Executor object
+    :param max_workers: Number of workers for a new executor
+    :param chunksize: Number of files parsed by a worker at a time
+    :param ordered: Yield results in the order of `paths` if True, in the
+                    order of completion otherwise
+    :param return_exceptions: Yield exceptions raised for a file as its
+                              result instead of raising them
+    :returns: Generator object for iterating (path, result) tuples
+
+    """
+    if isinstance(executor, Executor):
+        pool = executor
+    else:
+        if executor == 'process' and extract is None:
+            raise ValueError(
+                "Elements cannot be returned from a process pool")
+        pool = EXECUTORS[executor](max_workers)
+
+    limit = pending_limit(max_workers)
+    pending = deque()
+    try:
+        for chunk in chunks(paths, chunksize):
+            pending.append(pool.submit(
+                _parse_chunk, chunk, extract, return_exceptions))
+            while len(pending) >= limit:
+                yield from _completed(pending, ordered)
+        while pending:
+            yield from _completed(pending, ordered)
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not executor:
+            pool.shutdown()
+
+
+def _completed(pending, ordered):
+    """Remove a completed future from `pending` and return its results."""
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = done.pop()
+    pending.remove(future)
+    return future.result()
@@ -0,0 +1,271 @@
+"""On-disk cache of records extracted from PREMIS files.
+
+The records of the objects, events and agents of a file are extracted once
+and stored in a cache directory. Later reads of an unchanged file return
+the stored records without parsing the file::
+
+    with DocumentCache('/var/cache/premis', max_size=2**30) as cache:
+        for path in paths:
+            records = cache.get(path)
+            records['events']
+
+A file is unchanged if its size and modification time equal the stored
+ones and, with ``verify_hash=True``, if the SHA-256 digest of its content
+equals the stored one. Entries are stored as JSON, so reading a cache
+directory shared with other users cannot execute code.
+
+Entries that have not been used within `max_age` seconds, and the least
+recently used entries exceeding `max_size` bytes in total, are removed by
+:meth:`DocumentCache.evict`, which is called when the cache is used as a
+context manager and closed.
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from premis.agent_base import parse_agent_record
+from premis.event_base import parse_event_record
+from premis.object_base import parse_object_record
+from premis.stream import iterparse_elements
+
+# Version of the stored records. Entries of other versions are ignored.
+FORMAT_VERSION = 2
+
+ENTRY_SUFFIX = '.json'
+
+_RECORDS = {
+    'object': ('objects', parse_object_record),
+    'event': ('events', parse_event_record),
+    'agent': ('agents', parse_agent_record)
+}
+
+
+def document_records(source):
+    """Return the records of the objects, events and agents of a file.
+
+    The file is parsed element by element, so the whole document is not
+    held in memory.
+
+    :param source: Path or binary file object
+    :returns: Dictionary with keys objects, events and agents, whose values
+              are lists of records returned by parse_object_record,
+              parse_event_record and parse_agent_record
+
+    """
+    records = {'objects': [], 'events': [], 'agents': []}
+    for elem in iterparse_elements(source):
+        key, parse = _RECORDS[elem.tag.rpartition('}')[2]]
+        records[key].append(parse(elem))
+    return records
+
+
+def _file_hash(path):
+    """Return SHA-256 hex digest of file content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for block in iter(lambda: infile.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _decode_records(data):
+    """Return records read from a cache entry with the tuples of the record
+    fields restored.
+
+    :raises ValueError: If the entry does not contain records
+
+    """
+    records = json.loads(data.decode('utf-8'))
+    if not isinstance(records, dict):
+        raise ValueError("Invalid cache entry")
+    return {
+        key: [{field: [tuple(item) for item in value]
+                      if isinstance(value, list) else value
+               for field, value in record.items()}
+              for record in values]
+        for key, values in records.items()}
+
+
+class DocumentCache:
+    """Cache of records extracted from PREMIS files.
+
+    :param directory: Cache directory, created if missing
+    :param max_size: Maximum total size of the entries in bytes, None for
+                     no limit
+    :param max_age: Maximum time in seconds since an entry was last used,
+                    None for no limit
+    :param verify_hash: Compare file content digests in addition to size
+                        and modification time
+
+    """
+
+    def __init__(self, directory, max_size=None, max_age=None,
+                 verify_hash=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.verify_hash = verify_hash
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Remove expired and excess entries."""
+        self.evict()
+
+    def _entry_path(self, path):
+        """Return path of the cache entry of a file."""
+        key = hashlib.sha256(
+            os.path.abspath(path).encode('utf-8', 'surrogateescape'))
+        return os.path.join(self.directory, key.hexdigest() + ENTRY_SUFFIX)
+
+    def _signature(self, path, stat=None):
+        """Return the values identifying the current version of a file,
+        without the content digest.
+        """
+        if stat is None:
+            stat = os.stat(path)
+        return [FORMAT_VERSION, os.path.abspath(path), stat.st_size,
+                stat.st_mtime_ns]
+
+    def load(self, path):
+        """Return the stored records of a file if the file is unchanged.
+
+        :param path: Path to a PREMIS file
+        :returns: Records or None if there is no valid entry
+
+        """
+        entry_path = self._entry_path(path)
+        # Entries that cannot be decoded are treated as missing
+        try:
+            with open(entry_path, 'rb') as entry:
+                (signature, digest) = json.loads(
+                    entry.readline().decode('utf-8'))
+                if signature != self._signature(path):
+                    return None
+                if self.verify_hash and digest != _file_hash(path):
+                    return None
+                records = _decode_records(entry.read())
+        except (OSError, ValueError, TypeError, AttributeError,
+                RecursionError):
+            return None
+        # The modification time of the entry tells when it was last used
+        os.utime(entry_path)
+        return records
+
+    def store(self, path, records, stat=None):
+        """Store the records of a file.
+
+        :param path: Path to a PREMIS file
+        :param records: Dictionary of records, see
+                        :func:`document_records`
+        :param stat: Result of os.stat(path) taken before the records were
+                     extracted (default: stat the file now)
+
+        """
+        header = [self._signature(path, stat),
+                  _file_hash(path) if self.verify_hash else None]
+        handle, tmp_path = tempfile.mkstemp(
+            suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as entry:
+                # The header is on its own line, so that the records of a
+                # changed file are not decoded
+                entry.write(json.dumps(header).encode('utf-8') + b'\n')
+                entry.write(json.dumps(records).encode('utf-8'))
+            os.replace(tmp_path, self._entry_path(path))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get(self, path):
+        """Return the records of a file, parsing the file only if it has
+        changed since the records were stored.
+
+        :param path: Path to a PREMIS file
+        :returns: Dictionary of records, see :func:`document_records`
+
+        """
+        records = self.load(path)
+        if records is not None:
+            self.hits += 1
+            return records
+
+        self.misses += 1
+        # Stat before parsing, so that a file modified during parsing is
+        # parsed again next time
+        stat = os.stat(path)
+        records = document_records(path)
+        self.store(path, records, stat)
+        return records
+
+    def invalidate(self, path):
+        """Remove the entry of a file.
+
+        :param path: Path to a PREMIS file
+
+        """
+        try:
+            os.remove(self._entry_path(path))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """Return (last use time, size, path) of the entries sorted by last
+        use time.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Remove entries older than max_age and the least recently used
+        entries exceeding max_size.
+
+        :returns: Number of removed entries
+
+        """
+        if self.max_size is None and self.max_age is None:
+            return 0
+
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        oldest = time.time() - self.max_age if self.max_age is not None \
+            else None
+        removed = 0
+        for used, size, path in entries:
+            if not ((oldest is not None and used < oldest) or
+                    (self.max_size is not None and total > self.max_size)):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Remove all entries."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,229 @@
+"""Conversion of PREMIS 2.2 documents to PREMIS 3.0.
+
+The objects, events, agents and rights statements of a document are read,
+converted and written one at a time, so memory use does not depend on the
+size of the document::
+
+    convert_file('premis-v2.xml', 'premis-v3.xml')
+    convert_files([(source, target) for source, target in pairs])
+
+Elements are moved from the ``info:lc/xmlns/premis-v2`` namespace to
+``http://www.loc.gov/premis/v3``, keeping their prefixes, and the following
+structural differences are converted:
+
+* ``eventDetail`` is wrapped in ``eventDetailInformation``
+* ``relatedObjectIdentification`` and ``relatedEventIdentification`` are
+  renamed to ``relatedObjectIdentifier`` and ``relatedEventIdentifier``
+* ``linkingIntellectualEntityIdentifier`` of an object becomes a
+  structural "is part of" ``relationship`` to the intellectual entity
+* ``environment`` of an object, which PREMIS 3 replaces with separate
+  environment objects, is kept as such inside ``environmentExtension``
+* the ``version`` and ``xsi:schemaLocation`` attributes of the root element
+
+Elements in other namespaces, such as the content of extension elements,
+are copied as such.
+
+"""
+
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.etree as ET
+from xml_helpers.utils import XSI_NS, xsi_ns
+
+from premis.base import PREMIS_NS
+from premis.parallel import chunks
+from premis.stream import PremisWriter, iterparse_elements
+
+PREMIS3_NS = 'http://www.loc.gov/premis/v3'
+PREMIS3_VERSION = '3.0'
+PREMIS3_SCHEMA_LOCATION = (
+    'http://www.loc.gov/premis/v3 '
+    'http://www.loc.gov/standards/premis/v3/premis.xsd')
+
+CONVERTED_KINDS = ('object', 'event', 'agent', 'rights')
+
+_V2 = '{%s}' % PREMIS_NS
+_V3 = '{%s}' % PREMIS3_NS
+
+_RENAMED = {
+    'relatedObjectIdentification': 'relatedObjectIdentifier',
+    'relatedEventIdentification': 'relatedEventIdentifier'
+}
+
+# Children of an object that follow the converted environments and
+# intellectual entity links in PREMIS 3
+_AFTER_ENVIRONMENT = frozenset(
+    _V3 + tag for tag in ('relationship', 'linkingEventIdentifier',
+                          'linkingRightsStatementIdentifier'))
+_AFTER_RELATIONSHIP = frozenset(
+    _V3 + tag for tag in ('linkingEventIdentifier',
+                          'linkingRightsStatementIdentifier'))
+
+# pylint: disable=c-extension-no-member
+
+
+def _tag(tag):
+    """Return PREMIS 3 tag for a PREMIS 2 tag, other tags as such."""
+    if tag.startswith(_V2):
+        local = tag[len(_V2):]
+        return _V3 + _RENAMED.get(local, local)
+    return tag
+
+
+def _nsmap(nsmap):
+    """Return namespace map with PREMIS 2 replaced by PREMIS 3."""
+    return {
+        prefix: PREMIS3_NS if uri == PREMIS_NS else uri
+        for prefix, uri in nsmap.items()}
+
+
+def _attrib(elem):
+    """Return attributes of an element with PREMIS 2 names converted."""
+    return {_tag(name): value for name, value in elem.attrib.items()}
+
+
+def _copy_children(source, target):
+    """Convert the children of `source` and append them to `target`."""
+    parent_nsmap = source.nsmap
+    for child in source:
+        if not isinstance(child.tag, str):
+            # Comments and processing instructions
+            target.append(copy.copy(child))
+            continue
+
+        child_nsmap = child.nsmap
+        declared = None
+        if child_nsmap != parent_nsmap:
+            declared = {
+                prefix: uri for prefix, uri in _nsmap(child_nsmap).items()
+                if parent_nsmap.get(prefix) != child_nsmap[prefix]}
+
+        if child.tag == _V2 + 'eventDetail':
+            information = ET.SubElement(
+                target, _V3 + 'eventDetailInformation', nsmap=declared)
+            new = ET.SubElement(information, _V3 + 'eventDetail')
+        else:
+            new = ET.SubElement(
+                target, _tag(child.tag), _attrib(child), nsmap=declared)
+        new.text = child.text
+        new.tail = child.tail
+        _copy_children(child, new)
+
+
+def _insert_before(parent, elems, following):
+    """Insert elements before the first child whose tag is in `following`,
+    or append them if there is none.
+    """
+    for index, child in enumerate(parent):
+        if child.tag in following:
+            break
+    else:
+        index = len(parent)
+    parent[index:index] = elems
+
+
+def _convert_object(source, target):
+    """Convert the PREMIS 2 only children of an object."""
+    environments = []
+    for environment in target.findall(_V3 + 'environment'):
+        extension = ET.Element(_V3 + 'environmentExtension')
+        extension.append(copy.deepcopy(
+            source[target.index(environment)]))
+        extension[0].tail = None
+        environments.append((environment, extension))
+    relationships = []
+    for link in target.findall(_V3 + 'linkingIntellectualEntityIdentifier'):
+        relationship = ET.Element(_V3 + 'relationship')
+        ET.SubElement(relationship, _V3 + 'relationshipType').text = \
+            'structural'
+        ET.SubElement(relationship, _V3 + 'relationshipSubType').text = \
+            'is part of'
+        related = ET.SubElement(relationship, _V3 + 'relatedObjectIdentifier')
+        ET.SubElement(related, _V3 + 'relatedObjectIdentifierType').text = \
+            link.findtext(_V3 + 'linkingIntellectualEntityIdentifierType')
+        ET.SubElement(related, _V3 + 'relatedObjectIdentifierValue').text = \
+            link.findtext(_V3 + 'linkingIntellectualEntityIdentifierValue')
+        relationships.append((link, relationship))
+
+    for removed, _ in environments + relationships:
+        target.remove(removed)
+    if environments:
+        _insert_before(target, [extension for _, extension in environments],
+                       _AFTER_ENVIRONMENT)
+    if relationships:
+        _insert_before(target, [relation for _, relation in relationships],
+                       _AFTER_RELATIONSHIP)
+
+
+def convert_element(elem):
+    """Convert a PREMIS 2 element and its descendants to PREMIS 3.
+
+    The source element is not modified.
+
+    :param elem: PREMIS 2 element, e.g. an object, event or the premis root
+    :returns: New PREMIS 3 element
+
+    """
+    new = ET.Element(_tag(elem.tag), _attrib(elem), nsmap=_nsmap(elem.nsmap))
+    new.text = elem.text
+    _copy_children(elem, new)
+
+    if new.tag == _V3 + 'object':
+        # The copied children correspond to the source children one to one
+        # until the object is restructured
+        _convert_object(elem, new)
+    elif new.tag == _V3 + 'premis':
+        new.set('version', PREMIS3_VERSION)
+        new.set(xsi_ns('schemaLocation'), PREMIS3_SCHEMA_LOCATION)
+    return new
+
+
+def premis3_root():
+    """Return an empty PREMIS 3 root element."""
+    root = ET.Element(_V3 + 'premis',
+                      nsmap={'premis': PREMIS3_NS, 'xsi': XSI_NS})
+    root.set(xsi_ns('schemaLocation'), PREMIS3_SCHEMA_LOCATION)
+    root.set('version', PREMIS3_VERSION)
+    return root
+
+
+def convert_file(source, target):
+    """Convert a PREMIS 2 document to PREMIS 3 element by element.
+
+    The objects, events, agents and rights statements of the source are
+    written under a new PREMIS 3 root element in document order.
+
+    :param source: Path or binary file object of a PREMIS 2 document
+    :param target: Path or binary file object to write to
+    :returns: Number of converted elements
+
+    """
+    count = 0
+    with PremisWriter(target, premis3_root()) as writer:
+        for elem in iterparse_elements(source, CONVERTED_KINDS):
+            writer.write(convert_element(elem))
+            count += 1
+    return count
+
+
+def _convert_chunk(pairs):
+    """Convert the (source, target) path pairs in `pairs`."""
+    return sum(convert_file(source, target) for source, target in pairs)
+
+
+def convert_files(pairs, max_workers=None, chunksize=1, executor=None):
+    """Convert PREMIS 2 documents to PREMIS 3 in a process pool.
+
+    :param pairs: Iterable of (source, target) path pairs
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param chunksize: Number of files converted by a worker at a time
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: Total number of converted elements
+
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as pool:
+            return convert_files(pairs, chunksize=chunksize, executor=pool)
+
+    return sum(executor.map(_convert_chunk, chunks(pairs, chunksize)))
@@ -9,9 +9,13 @@ References:
 
 """
 
+import copy
+
 from xml_helpers.utils import decode_utf8
 
-from premis.base import (_element, _subelement, premis_ns, identifier,
+from premis import memo
+from premis.base import (_element, _identifier_fields, _insert_in_order,
+                         _subelement, _text, premis_ns, identifier,
                          iter_elements, NAMESPACES)
 
 
@@ -46,14 +50,14 @@ def outcome(outcome, detail_note=None, detail_extension=None,
     outcome_information = _element('eventOutcomeInformation')
 
     _outcome = _subelement(outcome_information, 'eventOutcome')
-    _outcome.text = decode_utf8(outcome)
+    _outcome.text = _text(outcome)
 
     if detail_note or detail_extension:
         detail = _subelement(outcome_information, 'eventOutcomeDetail')
 
         if detail_note is not None:
             _detail_note = _subelement(detail, 'eventOutcomeDetailNote')
-            _detail_note.text = decode_utf8(detail_note)
+            _detail_note.text = _text(detail_note)
 
         if detail_extension:
             if single_extension_element:
@@ -76,6 +80,38 @@ def outcome(outcome, detail_note=None, detail_extension=None,
     return outcome_information
 
 
+_EVENT_RANKS = {premis_ns(tag): rank for rank, tag in enumerate([
+    'eventIdentifier',
+    'eventType',
+    'eventDateTime',
+    'eventDetail',
+    'eventOutcomeInformation',
+    'linkingAgentIdentifier',
+    'linkingObjectIdentifier'])}
+
+
+def _linking_identifier(elem, kind):
+    """Return linking identifier for an object or agent, or a copy of a
+    prebuilt linking identifier element.
+
+    :elem: Object, agent or linking identifier element, or an identifier
+           tuple or record
+    :kind: 'object' or 'agent'
+    :returns: Linking identifier element
+
+    """
+    prefix = 'linking' + kind.capitalize()
+    fields = _identifier_fields(elem)
+    if fields is not None:
+        return identifier(fields[0], fields[1], prefix, fields[2])
+    if elem.tag == premis_ns('Identifier', prefix):
+        return copy.deepcopy(elem)
+    return identifier(
+        elem.findtext('.//' + premis_ns(kind + 'IdentifierType')),
+        elem.findtext('.//' + premis_ns(kind + 'IdentifierValue')),
+        prefix)
+
+
 # pylint: disable=too-many-arguments, too-many-locals
 # too-many-arguments: The given arguments are used to form the Element obj.
 def event(event_id, event_type, event_date_time, event_detail,
@@ -88,6 +124,14 @@ def event(event_id, event_type, event_date_time, event_detail,
     :event_detail: Event details
     :child_elements: Any child elements appended to the event (default=None)
     :linking_objects: Any linking objects appended to the event (default=None)
+    :linking_agents: Any linking agents appended to the event (default=None)
+
+    Linking objects and agents can be given as object and agent elements,
+    as (type, value) or (type, value, role) tuples, as records with keys
+    identifier_type, identifier_value and optionally role, or as prebuilt
+    linking identifier elements, e.g. from
+    :class:`premis.agent_base.AgentRegistry`, which are copied to the event.
+    Tuples and records avoid searching the identifiers from the elements.
 
     Returns the following ElementTree structure::
 
@@ -109,13 +153,13 @@ def event(event_id, event_type, event_date_time, event_detail,
     _event.append(event_id)
 
     _event_type = _subelement(_event, 'eventType')
-    _event_type.text = decode_utf8(event_type)
+    _event_type.text = _text(event_type)
 
     _event_date_time = _subelement(_event, 'eventDateTime')
-    _event_date_time.text = decode_utf8(event_date_time)
+    _event_date_time.text = _text(event_date_time)
 
     _event_detail = _subelement(_event, 'eventDetail')
-    _event_detail.text = decode_utf8(event_detail)
+    _event_detail.text = _text(event_detail)
 
     if child_elements:
         for elem in child_elements:
@@ -123,23 +167,67 @@ def event(event_id, event_type, event_date_time, event_detail,
 
     if linking_agents:
         for _agent in linking_agents:
-            linking_agent = identifier(
-                _agent.findtext('.//' + premis_ns('agentIdentifierType')),
-                _agent.findtext('.//' + premis_ns('agentIdentifierValue')),
-                'linkingAgent')
-            _event.append(linking_agent)
+            _event.append(_linking_identifier(_agent, 'agent'))
 
     if linking_objects:
         for _object in linking_objects:
-            linking_object = identifier(
-                _object.findtext('.//' + premis_ns('objectIdentifierType')),
-                _object.findtext('.//' + premis_ns('objectIdentifierValue')),
-                'linkingObject')
-            _event.append(linking_object)
+            _event.append(_linking_identifier(_object, 'object'))
 
     return _event
 
 
+def add_to_event(event_elem, elem):
+    """Add an element to an existing event in schema order.
+
+    :event_elem: PREMIS event element
+    :elem: Element to add, e.g. an outcome or a linking identifier
+    :returns: The event element
+    :raises ValueError: If the element is not allowed in an event
+
+    """
+    return _insert_in_order(event_elem, elem, _EVENT_RANKS)
+
+
+def link_objects(event_elem, objects):
+    """Link objects to an existing event.
+
+    Suitable for linking one event to many objects, e.g. all files of a
+    package, when the objects are given as identifier tuples.
+
+    :event_elem: PREMIS event element
+    :objects: Iterable of objects in any form accepted by :func:`event`
+    :returns: The event element
+
+    """
+    event_elem.extend(
+        [_linking_identifier(_object, 'object') for _object in objects])
+    memo.invalidate(event_elem)
+    return event_elem
+
+
+def link_agents(event_elem, agents):
+    """Link agents to an existing event.
+
+    The linking agent identifiers are inserted before the linking object
+    identifiers, as required by the PREMIS schema.
+
+    :event_elem: PREMIS event element
+    :agents: Iterable of agents in any form accepted by :func:`event`
+    :returns: The event element
+
+    """
+    linking_agents = [_linking_identifier(_agent, 'agent')
+                      for _agent in agents]
+    first_object = event_elem.find(premis_ns('linkingObjectIdentifier'))
+    if first_object is None:
+        event_elem.extend(linking_agents)
+    else:
+        index = event_elem.index(first_object)
+        event_elem[index:index] = linking_agents
+    memo.invalidate(event_elem)
+    return event_elem
+
+
 def iter_events(premis):
     """Iterate all PREMIS events from starting element.
 
@@ -214,6 +302,7 @@ def events_with_outcome(events, outcome):
             yield _event
 
 
+@memo.memoize
 def parse_event_type(event_elem):
     """
     :param event_elem: Premis event element.
@@ -227,6 +316,7 @@ def parse_event_type(event_elem):
         return ""
 
 
+@memo.memoize
 def parse_datetime(event_elem):
     """
     :param event_elem: Premis event element.
@@ -237,6 +327,7 @@ def parse_datetime(event_elem):
         namespaces=NAMESPACES)[0]
 
 
+@memo.memoize
 def parse_detail(event_elem):
     """
     :param event_elem: Premis event element.
@@ -250,6 +341,7 @@ def parse_detail(event_elem):
         return ""
 
 
+@memo.memoize
 def parse_outcome(event_elem):
     """
     :param event_elem: Premis event element.
@@ -260,6 +352,7 @@ def parse_outcome(event_elem):
         namespaces=NAMESPACES)[0]
 
 
+@memo.memoize
 def parse_outcome_detail_note(event_elem):
     """
     :param event_elem: Premis event element.
@@ -283,3 +376,48 @@ def parse_outcome_detail_extension(event_elem):
         (".//premis:eventOutcomeInformation/premis:eventOutcomeDetail/"
          "premis:eventOutcomeDetailExtension"),
         namespaces=NAMESPACES)
+
+
+def _linking_identifiers(event_elem, prefix):
+    """Return (type, value, role) tuples of the linking identifiers with
+    given prefix in an event.
+    """
+    return [
+        (_identifier.findtext(premis_ns('IdentifierType', prefix)),
+         _identifier.findtext(premis_ns('IdentifierValue', prefix)),
+         _identifier.findtext(premis_ns('Role', prefix)))
+        for _identifier in event_elem.iterchildren(
+            premis_ns('Identifier', prefix))]
+
+
+def parse_event_record(event_elem):
+    """Return the fields of a PREMIS event as a dictionary.
+
+    The record contains only strings, lists and tuples, so it can be
+    pickled or serialized as JSON.
+
+    :param event_elem: Premis event element.
+    :return: Dictionary with keys identifier_type, identifier_value, type,
+             datetime, detail, outcome, outcome_detail_note, linking_agents
+             and linking_objects. Linking identifiers are lists of
+             (type, value, role) tuples.
+    """
+    return {
+        'identifier_type': event_elem.findtext('/'.join([
+            premis_ns('eventIdentifier'),
+            premis_ns('eventIdentifierType')])),
+        'identifier_value': event_elem.findtext('/'.join([
+            premis_ns('eventIdentifier'),
+            premis_ns('eventIdentifierValue')])),
+        'type': event_elem.findtext(premis_ns('eventType')),
+        'datetime': event_elem.findtext(premis_ns('eventDateTime')),
+        'detail': event_elem.findtext(premis_ns('eventDetail')),
+        'outcome': event_elem.findtext('/'.join([
+            premis_ns('eventOutcomeInformation'),
+            premis_ns('eventOutcome')])),
+        'outcome_detail_note': event_elem.findtext('/'.join([
+            premis_ns('eventOutcomeInformation'),
+            premis_ns('eventOutcomeDetail'),
+            premis_ns('eventOutcomeDetailNote')])),
+        'linking_agents': _linking_identifiers(event_elem, 'linkingAgent'),
+        'linking_objects': _linking_identifiers(event_elem, 'linkingObject')}
@@ -0,0 +1,286 @@
+"""Index of PREMIS objects by fixity digest for finding duplicate files.
+
+Every (algorithm, digest) pair of every object is collected while the
+files are read element by element::
+
+    index = build_index(paths, max_workers=8)
+    index.lookup('MD5', 'd41d8cd98f00b204e9800998ecf8427e')
+    for (algorithm, digest), objects in index.duplicates():
+        ...
+    index.save('fixity.index')
+
+Objects are listed as (source, identifier_type, identifier_value) tuples.
+Algorithm names are compared without case and hyphens, so 'SHA-256' and
+'sha256' are the same algorithm, and hexadecimal digests are compared
+without case. Hexadecimal digests are stored as bytes, halving the size of
+the keys.
+
+Indexes built separately, e.g. in worker processes, can be merged.
+
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from premis.base import premis_ns
+from premis.object_base import parse_fixities
+from premis.parallel import chunks
+from premis.stream import iterparse_elements
+
+# Version of the saved index. Files of other versions are not loaded.
+FORMAT_VERSION = 2
+
+_OBJECT = premis_ns('object')
+_IDENTIFIER_TYPE = '/'.join([
+    premis_ns('objectIdentifier'), premis_ns('objectIdentifierType')])
+_IDENTIFIER_VALUE = '/'.join([
+    premis_ns('objectIdentifier'), premis_ns('objectIdentifierValue')])
+
+
+def _algorithm(algorithm):
+    """Return normalized algorithm name."""
+    return (algorithm or '').replace('-', '').upper()
+
+
+def _digest(digest):
+    """Return hexadecimal digest as bytes, other digests as such."""
+    digest = (digest or '').strip()
+    try:
+        return bytes.fromhex(digest)
+    except ValueError:
+        return digest
+
+
+def _hexdigest(digest):
+    """Return digest stored with _digest as a string."""
+    if isinstance(digest, bytes):
+        return digest.hex()
+    return digest
+
+
+class FixityIndex:
+    """Objects by fixity digest."""
+
+    def __init__(self):
+        self.sources = []
+        self._source_numbers = {}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __eq__(self, other):
+        return (isinstance(other, FixityIndex) and
+                dict(other.items()) == dict(self.items()))
+
+    def _source_number(self, source):
+        """Return number of a source, adding it if necessary."""
+        try:
+            return self._source_numbers[source]
+        except KeyError:
+            number = self._source_numbers[source] = len(self.sources)
+            self.sources.append(source)
+            return number
+
+    def add(self, algorithm, digest, identifier_type, identifier_value,
+            source=None):
+        """Add a fixity of an object.
+
+        :param algorithm: Message digest algorithm
+        :param digest: Message digest
+        :param identifier_type: Object identifier type
+        :param identifier_value: Object identifier value
+        :param source: Source of the object, e.g. a file path
+
+        """
+        key = (_algorithm(algorithm), _digest(digest))
+        self._entries.setdefault(key, []).append(
+            (self._source_number(source), identifier_type, identifier_value))
+
+    def add_object(self, premis_object, source=None):
+        """Add all fixities of a PREMIS object.
+
+        :param premis_object: Premis object element
+        :param source: Source of the object, e.g. a file path
+
+        """
+        identifier_type = premis_object.findtext(_IDENTIFIER_TYPE)
+        identifier_value = premis_object.findtext(_IDENTIFIER_VALUE)
+        for algorithm, digest in parse_fixities(premis_object):
+            self.add(algorithm, digest, identifier_type, identifier_value,
+                     source)
+
+    def add_tree(self, premis_elem, source=None):
+        """Add all PREMIS objects in a tree.
+
+        :param premis_elem: ElementTree element
+        :param source: Source of the tree, e.g. a file path
+
+        """
+        for premis_object in premis_elem.iter(_OBJECT):
+            self.add_object(premis_object, source)
+
+    def add_file(self, source):
+        """Add all PREMIS objects in a file without parsing the whole file
+        into memory.
+
+        :param source: Path or binary file object
+
+        """
+        for premis_object in iterparse_elements(source, ['object']):
+            self.add_object(premis_object, source)
+
+    def merge(self, other):
+        """Add the entries of another index to this one.
+
+        :param other: FixityIndex object
+        :returns: self
+
+        """
+        numbers = [self._source_number(source) for source in other.sources]
+        entries = self._entries
+        for key, objects in other._entries.items():
+            entries.setdefault(key, []).extend(
+                (numbers[number], identifier_type, identifier_value)
+                for number, identifier_type, identifier_value in objects)
+        return self
+
+    def _objects(self, objects):
+        """Return stored objects with their sources."""
+        sources = self.sources
+        return [
+            (sources[number], identifier_type, identifier_value)
+            for number, identifier_type, identifier_value in objects]
+
+    def lookup(self, algorithm, digest):
+        """Return the objects with a digest.
+
+        :param algorithm: Message digest algorithm
+        :param digest: Message digest
+        :returns: List of (source, identifier_type, identifier_value) tuples
+
+        """
+        return self._objects(self._entries.get(
+            (_algorithm(algorithm), _digest(digest)), []))
+
+    def items(self):
+        """Iterate all digests and their objects.
+
+        :returns: Generator object for iterating ((algorithm, digest),
+                  objects) pairs, where objects is a list of (source,
+                  identifier_type, identifier_value) tuples
+
+        """
+        for (algorithm, digest), objects in self._entries.items():
+            yield (algorithm, _hexdigest(digest)), self._objects(objects)
+
+    def duplicates(self):
+        """Iterate the digests shared by more than one object.
+
+        Objects with the same identifier in the same source are counted
+        once.
+
+        :returns: Generator object for iterating ((algorithm, digest),
+                  objects) pairs like :meth:`items`
+
+        """
+        for (algorithm, digest), objects in self._entries.items():
+            if len(objects) < 2:
+                continue
+            unique = list(dict.fromkeys(objects))
+            if len(unique) > 1:
+                yield (algorithm, _hexdigest(digest)), self._objects(unique)
+
+    def save(self, path):
+        """Save the index to a file as JSON.
+
+        The sources of the objects must be strings or other values
+        supported by :mod:`json`.
+
+        :param path: Path of the index file
+
+        """
+        data = {
+            'version': FORMAT_VERSION,
+            'sources': self.sources,
+            'entries': [
+                [algorithm, _hexdigest(digest), objects]
+                for (algorithm, digest), objects in self._entries.items()]}
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                output.write(json.dumps(data).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with :meth:`save`.
+
+        :param path: Path of the index file
+        :returns: FixityIndex object
+        :raises ValueError: If the file is not a fixity index or is of
+                            another format version
+
+        """
+        with open(path, 'rb') as infile:
+            data = infile.read()
+        try:
+            data = json.loads(data.decode('utf-8'))
+            version = data['version']
+        except (ValueError, TypeError, KeyError, RecursionError) as error:
+            raise ValueError(
+                "Invalid fixity index {}".format(path)) from error
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported fixity index version {}".format(version))
+
+        index = cls()
+        try:
+            for source in data['sources']:
+                index._source_number(source)
+            for algorithm, digest, objects in data['entries']:
+                index._entries[(algorithm, _digest(digest))] = [
+                    (number, identifier_type, identifier_value)
+                    for number, identifier_type, identifier_value
+                    in objects]
+        except (ValueError, TypeError, KeyError, AttributeError) as error:
+            raise ValueError(
+                "Invalid fixity index {}".format(path)) from error
+        return index
+
+
+def _index_chunk(paths):
+    """Return fixity index of the files in `paths`."""
+    index = FixityIndex()
+    for path in paths:
+        index.add_file(path)
+    return index
+
+
+def build_index(paths, max_workers=None, chunksize=16, executor=None):
+    """Build fixity index of PREMIS files in a process pool.
+
+    Each worker indexes a chunk of files, and the partial indexes are
+    merged.
+
+    :param paths: Iterable of file paths
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param chunksize: Number of files processed by a worker at a time
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: FixityIndex object
+
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as pool:
+            return build_index(paths, chunksize=chunksize, executor=pool)
+
+    index = FixityIndex()
+    for partial in executor.map(_index_chunk, chunks(paths, chunksize)):
+        index.merge(partial)
+    return index
@@ -0,0 +1,300 @@
+"""Persistent byte offset index for random access into PREMIS files.
+
+The index is stored as an SQLite database next to the indexed file. It maps
+the identifier values of PREMIS objects, events and agents to their byte
+ranges in the file, so that a single element can be parsed without parsing
+the whole document::
+
+    elem = load_element('premis.xml', 'event-id-001')
+
+The index is rebuilt automatically when the size or modification time of
+the indexed file changes, or when its SHA-256 digest changes if hash
+verification is enabled.
+
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from collections import namedtuple
+
+from premis.stream import (fragment_identifier, mapped_file, parse_fragment,
+                           scan_fragments)
+
+INDEX_SUFFIX = '.idx'
+INDEX_FORMAT = '1'
+
+IndexEntry = namedtuple(
+    'IndexEntry',
+    ['kind', 'identifier_type', 'identifier_value', 'start', 'end',
+     'namespaces'])
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE contexts (id INTEGER PRIMARY KEY, namespaces TEXT);
+CREATE TABLE elements (
+    kind TEXT,
+    identifier_type TEXT,
+    identifier_value TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    context INTEGER);
+"""
+
+_INDEXES = """
+CREATE INDEX elements_identifier_value ON elements (identifier_value);
+"""
+
+
+def _sha256(path):
+    """Return SHA-256 hex digest of the file in `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dump_namespaces(namespaces):
+    """Return namespace dictionary as JSON string."""
+    return json.dumps(sorted(
+        (prefix or '', uri) for prefix, uri in namespaces.items()))
+
+
+def _load_namespaces(value):
+    """Return namespace dictionary from JSON string."""
+    return {prefix or None: uri for prefix, uri in json.loads(value)}
+
+
+def build_index(path, index_path=None, verify_hash=False):
+    """Scan a PREMIS file and write its byte offset index.
+
+    The index is first written to a temporary file, which then replaces
+    any existing index.
+
+    :param path: Path to the PREMIS file
+    :param index_path: Path to the index (default: `path` + '.idx')
+    :param verify_hash: Store SHA-256 digest of the file in the index
+    :returns: Path to the index
+
+    """
+    if index_path is None:
+        index_path = path + INDEX_SUFFIX
+    temp_path = index_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    stat = os.stat(path)
+    meta = {
+        'format': INDEX_FORMAT,
+        'size': str(stat.st_size),
+        'mtime_ns': str(stat.st_mtime_ns),
+        'sha256': _sha256(path) if verify_hash else ''}
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript(_SCHEMA)
+        contexts = {}
+        with mapped_file(path) as buf:
+            rows = []
+            for fragment in scan_fragments(buf):
+                key = _dump_namespaces(fragment.namespaces)
+                if key not in contexts:
+                    contexts[key] = len(contexts)
+                identifier = fragment_identifier(buf, fragment) or (
+                    None, None)
+                rows.append((fragment.kind, identifier[0], identifier[1],
+                             fragment.start, fragment.end, contexts[key]))
+                if len(rows) >= 10000:
+                    connection.executemany(
+                        'INSERT INTO elements VALUES (?, ?, ?, ?, ?, ?)',
+                        rows)
+                    rows = []
+            connection.executemany(
+                'INSERT INTO elements VALUES (?, ?, ?, ?, ?, ?)', rows)
+        connection.executemany(
+            'INSERT INTO contexts VALUES (?, ?)',
+            [(value, key) for key, value in contexts.items()])
+        connection.executemany(
+            'INSERT INTO meta VALUES (?, ?)', sorted(meta.items()))
+        connection.executescript(_INDEXES)
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(temp_path, index_path)
+    return index_path
+
+
+class ElementIndex:
+    """Byte offset index of PREMIS objects, events and agents in a file.
+
+    The index is built when it does not exist and rebuilt when the indexed
+    file has changed::
+
+        with ElementIndex('premis.xml') as index:
+            elem = index.load_element('event-id-001', kind='event')
+
+    :param path: Path to the PREMIS file
+    :param index_path: Path to the index (default: `path` + '.idx')
+    :param verify_hash: Detect changes also by SHA-256 digest of the file.
+                        This reads the whole file whenever the index is
+                        opened or refreshed.
+
+    """
+
+    def __init__(self, path, index_path=None, verify_hash=False):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.verify_hash = verify_hash
+        self._connection = None
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the index database."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def is_stale(self):
+        """Return True if the indexed file has changed since the index was
+        built.
+        """
+        if self._connection is None:
+            return True
+        try:
+            meta = dict(self._connection.execute(
+                'SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError:
+            return True
+
+        stat = os.stat(self.path)
+        if meta.get('format') != INDEX_FORMAT or \
+                meta.get('size') != str(stat.st_size):
+            return True
+
+        mtime_changed = meta.get('mtime_ns') != str(stat.st_mtime_ns)
+        if not self.verify_hash:
+            return mtime_changed
+        if meta.get('sha256') != _sha256(self.path):
+            return True
+        if mtime_changed:
+            # Only the timestamp has changed
+            self._connection.execute(
+                "UPDATE meta SET value = ? WHERE key = 'mtime_ns'",
+                (str(stat.st_mtime_ns),))
+            self._connection.commit()
+        return False
+
+    def refresh(self):
+        """Rebuild the index if the indexed file has changed.
+
+        :returns: True if the index was rebuilt, False otherwise
+
+        """
+        if self._connection is None and os.path.exists(self.index_path):
+            self._connection = sqlite3.connect(self.index_path)
+        if not self.is_stale():
+            return False
+        self.rebuild()
+        return True
+
+    def rebuild(self):
+        """Rebuild the index unconditionally."""
+        self.close()
+        build_index(self.path, self.index_path, self.verify_hash)
+        self._connection = sqlite3.connect(self.index_path)
+
+    def lookup(self, identifier_value, kind=None):
+        """Return index entries for elements with given identifier value.
+
+        :param identifier_value: PREMIS identifier value
+        :param kind: Element type ('object', 'event' or 'agent'). All types
+                     are searched by default.
+        :returns: List of IndexEntry tuples in document order
+
+        """
+        query = (
+            'SELECT kind, identifier_type, identifier_value, start_offset, '
+            'end_offset, contexts.namespaces FROM elements '
+            'JOIN contexts ON contexts.id = elements.context '
+            'WHERE identifier_value = ?')
+        parameters = [identifier_value]
+        if kind is not None:
+            query += ' AND kind = ?'
+            parameters.append(kind)
+        query += ' ORDER BY start_offset'
+
+        return [
+            IndexEntry(*row[:5], namespaces=_load_namespaces(row[5]))
+            for row in self._connection.execute(query, parameters)]
+
+    def entries(self, kind=None):
+        """Iterate all index entries in document order.
+
+        :param kind: Element type to iterate. All types by default.
+        :returns: Generator object for iterating IndexEntry tuples
+
+        """
+        query = (
+            'SELECT kind, identifier_type, identifier_value, start_offset, '
+            'end_offset, contexts.namespaces FROM elements '
+            'JOIN contexts ON contexts.id = elements.context')
+        parameters = []
+        if kind is not None:
+            query += ' WHERE kind = ?'
+            parameters.append(kind)
+        query += ' ORDER BY start_offset'
+
+        for row in self._connection.execute(query, parameters):
+            yield IndexEntry(*row[:5], namespaces=_load_namespaces(row[5]))
+
+    def read_entry(self, entry):
+        """Return the parsed element for an index entry.
+
+        :param entry: IndexEntry tuple
+        :returns: ElementTree element
+
+        """
+        with open(self.path, 'rb') as handle:
+            handle.seek(entry.start)
+            data = handle.read(entry.end - entry.start)
+        return parse_fragment(data, entry.namespaces)
+
+    def load_element(self, identifier_value, kind=None):
+        """Parse the first element with given identifier value.
+
+        :param identifier_value: PREMIS identifier value
+        :param kind: Element type ('object', 'event' or 'agent')
+        :returns: Element if found, None otherwise
+
+        """
+        entries = self.lookup(identifier_value, kind)
+        if not entries:
+            return None
+        return self.read_entry(entries[0])
+
+
+def load_element(path, identifier_value, kind=None, index_path=None,
+                 verify_hash=False):
+    """Parse a single PREMIS object, event or agent from a file.
+
+    The byte offset index of the file is built or refreshed when needed.
+
+    :param path: Path to the PREMIS file
+    :param identifier_value: PREMIS identifier value
+    :param kind: Element type ('object', 'event' or 'agent')
+    :param index_path: Path to the index (default: `path` + '.idx')
+    :param verify_hash: Detect changes also by SHA-256 digest of the file
+    :returns: Element if found, None otherwise
+
+    """
+    with ElementIndex(path, index_path, verify_hash) as index:
+        return index.load_element(identifier_value, kind)
@@ -0,0 +1,164 @@
+"""Referential integrity checks of PREMIS documents.
+
+The identifiers of the objects, events and agents and the references
+between them are collected in one pass, and references to identifiers that
+are not found are reported::
+
+    for reference in check_file('premis.xml'):
+        print(reference.kind, reference.identifier, reference.link,
+              reference.target)
+
+The following references are checked:
+
+    * linkingObjectIdentifier and linkingAgentIdentifier of events
+    * relatedObjectIdentification, relatedEventIdentification and
+      linkingEventIdentifier of objects
+    * dependencyIdentifier of object environments
+
+References are matched by identifier type and value. Many documents, such
+as the shards of a package, can be checked together by adding them to the
+same IntegrityChecker.
+
+"""
+
+from collections import namedtuple
+
+from premis.base import premis_ns
+from premis.stream import ELEMENT_KINDS, iterparse_elements
+
+DanglingReference = namedtuple(
+    'DanglingReference',
+    ['kind', 'identifier', 'link', 'target_kind', 'target', 'source'])
+DanglingReference.__doc__ = """Reference to an identifier that is not found.
+
+:kind: Kind of the referring element, e.g. 'event'
+:identifier: (identifier_type, identifier_value) of the referring element
+:link: Local name of the referring element, e.g. 'linkingAgentIdentifier'
+:target_kind: Kind of the referred element, e.g. 'agent'
+:target: (identifier_type, identifier_value) of the missing element
+:source: Source the referring element was read from, or None
+"""
+
+_KINDS = {premis_ns(kind): kind for kind in ELEMENT_KINDS}
+
+_IDENTIFIERS = {
+    kind: (premis_ns(kind + 'Identifier'),
+           premis_ns(kind + 'IdentifierType'),
+           premis_ns(kind + 'IdentifierValue'))
+    for kind in ELEMENT_KINDS}
+
+# Referring elements: (local name, prefix of the identifier type and value,
+# kind of the referred element)
+_REFERENCES = (
+    ('linkingObjectIdentifier', 'linkingObject', 'object'),
+    ('linkingAgentIdentifier', 'linkingAgent', 'agent'),
+    ('linkingEventIdentifier', 'linkingEvent', 'event'),
+    ('relatedObjectIdentification', 'relatedObject', 'object'),
+    ('relatedEventIdentification', 'relatedEvent', 'event'),
+    ('dependencyIdentifier', 'dependency', 'object')
+)
+
+_REFERENCE_TAGS = {
+    premis_ns(name): (name, premis_ns('IdentifierType', prefix),
+                      premis_ns('IdentifierValue', prefix), kind)
+    for name, prefix, kind in _REFERENCES}
+
+
+def _identifier(elem, kind):
+    """Return (identifier_type, identifier_value) of an element."""
+    tag, type_tag, value_tag = _IDENTIFIERS[kind]
+    identifier = elem.find(tag)
+    if identifier is None:
+        return None
+    return (identifier.findtext(type_tag), identifier.findtext(value_tag))
+
+
+class IntegrityChecker:
+    """Collector of identifiers and references of PREMIS elements."""
+
+    def __init__(self):
+        self.identifiers = {kind: set() for kind in ELEMENT_KINDS}
+        self._references = []
+
+    def add_element(self, elem, source=None):
+        """Collect the identifier and references of a PREMIS object, event
+        or agent.
+
+        Other elements are ignored.
+
+        :param elem: ElementTree element
+        :param source: Source of the element reported with its references
+
+        """
+        kind = _KINDS.get(elem.tag)
+        if kind is None:
+            return
+        identifier = _identifier(elem, kind)
+        if identifier is not None:
+            self.identifiers[kind].add(identifier)
+
+        for reference in elem.iterdescendants(*_REFERENCE_TAGS):
+            name, type_tag, value_tag, target_kind = \
+                _REFERENCE_TAGS[reference.tag]
+            self._references.append((
+                kind, identifier, name, target_kind,
+                (reference.findtext(type_tag),
+                 reference.findtext(value_tag)),
+                source))
+
+    def add_tree(self, premis_elem, source=None):
+        """Collect all PREMIS objects, events and agents in a tree.
+
+        :param premis_elem: ElementTree element
+        :param source: Source of the tree reported with its references
+
+        """
+        for elem in premis_elem.iter(*_KINDS):
+            self.add_element(elem, source)
+
+    def add_file(self, source):
+        """Collect all PREMIS objects, events and agents in a file without
+        parsing the whole file into memory.
+
+        :param source: Path or binary file object
+
+        """
+        for elem in iterparse_elements(source):
+            self.add_element(elem, source)
+
+    def dangling(self):
+        """Return the references to identifiers that are not found.
+
+        :returns: List of DanglingReference tuples in the order the
+                  references were collected
+
+        """
+        identifiers = self.identifiers
+        return [
+            DanglingReference(*reference) for reference in self._references
+            if reference[4] not in identifiers[reference[3]]]
+
+
+def check_tree(premis_elem):
+    """Return the dangling references of a PREMIS tree.
+
+    :param premis_elem: ElementTree element
+    :returns: List of DanglingReference tuples
+
+    """
+    checker = IntegrityChecker()
+    checker.add_tree(premis_elem)
+    return checker.dangling()
+
+
+def check_file(source):
+    """Return the dangling references of a PREMIS file without parsing the
+    whole file into memory.
+
+    :param source: Path or binary file object
+    :returns: List of DanglingReference tuples
+
+    """
+    checker = IntegrityChecker()
+    checker.add_file(source)
+    return checker.dangling()
@@ -0,0 +1,159 @@
+"""Memoization of parse function results per element.
+
+Caching is opt-in. The results of the parse_* functions are cached while
+a ParseCache is active::
+
+    with ParseCache(maxsize=10000) as cache:
+        for obj in iter_objects(root):
+            parse_format(obj)     # Evaluated
+        for obj in iter_objects(root):
+            parse_format(obj)     # Cached
+        cache.hits
+
+Elements that support weak references, i.e. instances of
+lxml.etree.ElementBase subclasses, are referenced weakly and their results
+are dropped when the element is freed. The default lxml element class does
+not support weak references, so those elements are referenced strongly
+until they are evicted or the cache is closed. The cache holds at most
+`maxsize` elements and evicts the least recently used ones, and it is
+cleared when the ``with`` block exits.
+
+The mutation helpers of the library, such as
+:func:`premis.object_base.add_to_object`, invalidate the cached results of
+the modified element and its ancestors. Elements modified in other ways
+must be invalidated with :meth:`ParseCache.invalidate`.
+
+Caches are active in the thread that entered the ``with`` block.
+
+Cached results are shared, so they must not be modified.
+
+"""
+
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+
+# Stack of the active caches of each thread
+_LOCAL = threading.local()
+
+
+def _active():
+    """Return the active caches of the current thread, innermost last."""
+    return getattr(_LOCAL, 'caches', ())
+
+
+def _lookup_key(elem):
+    """Return key of an element: weak reference if possible, otherwise the
+    element itself.
+    """
+    try:
+        return weakref.ref(elem)
+    except TypeError:
+        return elem
+
+
+class ParseCache:
+    """Bounded LRU cache of parse function results by element.
+
+    :param maxsize: Maximum number of elements with cached results
+
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._previous = []
+
+    def __enter__(self):
+        caches = _active()
+        self._previous.append(caches)
+        _LOCAL.caches = caches + (self,)
+        return self
+
+    def __exit__(self, *exc_info):
+        _LOCAL.caches = self._previous.pop()
+        self.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        """Remove entries of a freed element."""
+        self._entries.pop(key, None)
+
+    def get(self, func, elem):
+        """Return the result of func(elem), evaluating it on the first call.
+
+        :param func: Parse function
+        :param elem: ElementTree element
+        :returns: Result of the function
+
+        """
+        key = _lookup_key(elem)
+        results = self._entries.get(key)
+        if results is not None:
+            self._entries.move_to_end(key)
+            try:
+                result = results[func]
+            except KeyError:
+                pass
+            else:
+                self.hits += 1
+                return result
+
+        self.misses += 1
+        result = func(elem)
+        if results is None:
+            if isinstance(key, weakref.ref):
+                key = weakref.ref(elem, self._remove)
+            results = self._entries[key] = {}
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        results[func] = result
+        return result
+
+    def invalidate(self, elem):
+        """Drop the cached results of an element and its ancestors.
+
+        :param elem: Modified ElementTree element
+
+        """
+        self._entries.pop(_lookup_key(elem), None)
+        for ancestor in elem.iterancestors():
+            self._entries.pop(_lookup_key(ancestor), None)
+
+    def clear(self):
+        """Drop all cached results."""
+        self._entries.clear()
+
+
+def memoize(func):
+    """Decorate a parse function of one element to use the active
+    ParseCache.
+
+    The element may be given as a positional or keyword argument. Without
+    an active cache, or if called with other arguments, the function is
+    called as such.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        caches = _active()
+        if not caches or len(args) + len(kwargs) != 1:
+            return func(*args, **kwargs)
+        elem = args[0] if args else next(iter(kwargs.values()))
+        return caches[-1].get(func, elem)
+    return wrapper
+
+
+def invalidate(elem):
+    """Drop the cached results of a modified element and its ancestors from
+    the active caches.
+
+    :param elem: Modified ElementTree element
+
+    """
+    for cache in _active():
+        cache.invalidate(elem)
@@ -0,0 +1,200 @@
+"""Merge events of many PREMIS files in eventDateTime order.
+
+The events are merged with a heap holding one event per input, so memory
+use does not depend on the number of events::
+
+    write_merged('timeline.xml', paths)
+    write_jsonl('timeline.jsonl', paths)
+
+Files whose events are already in time order are streamed as such with
+``presorted=True``. Otherwise the events of each file are sorted in chunks
+of bounded size, which are spilled to temporary files and merged. At most
+`fan_in` inputs are merged at a time; with more inputs, the inputs are first
+merged in groups into temporary files.
+
+Events whose eventDateTime cannot be parsed are ordered before all other
+events. Events with the same time are kept in the order of the inputs.
+
+"""
+
+import datetime
+import heapq
+import json
+import os
+import pickle
+import tempfile
+from itertools import islice
+from operator import itemgetter
+
+import lxml.etree as ET
+
+from premis.base import premis_ns
+from premis.event_base import parse_event_record
+from premis.stream import PremisWriter, iterparse_elements
+from premis.timeline import parse_timestamp
+
+# pylint: disable=c-extension-no-member
+
+UNDATED = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+_KEY = itemgetter(0)
+
+
+def _serialize(event_elem):
+    """Return serialized event element."""
+    return ET.tostring(event_elem, encoding='UTF-8', with_tail=False)
+
+
+def _event_key(event_elem):
+    """Return eventDateTime of an event as a datetime for sorting."""
+    try:
+        return parse_timestamp(event_elem.findtext(
+            premis_ns('eventDateTime')))
+    except (TypeError, ValueError):
+        return UNDATED
+
+
+def _file_events(source, extract, presorted):
+    """Iterate (timestamp, value) pairs of the events in a file."""
+    previous = UNDATED
+    for elem in iterparse_elements(source, ['event']):
+        key = _event_key(elem)
+        if presorted:
+            if key < previous:
+                raise ValueError(
+                    "Events are not in time order in {}".format(source))
+            previous = key
+        yield key, extract(elem)
+
+
+def _write_run(items, directory):
+    """Write (timestamp, value) pairs to a temporary file and return the
+    path.
+    """
+    handle, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(handle, 'wb') as run:
+        for item in items:
+            pickle.dump(item, run, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    """Iterate (timestamp, value) pairs from a temporary file and remove the
+    file when done.
+    """
+    try:
+        with open(path, 'rb') as run:
+            while True:
+                try:
+                    yield pickle.load(run)
+                except EOFError:
+                    return
+    finally:
+        # The directory may already be removed if merging was interrupted
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _sorted_runs(source, extract, chunksize, directory):
+    """Sort the events of a file in chunks and return the temporary files
+    of the chunks.
+    """
+    events = _file_events(source, extract, False)
+    paths = []
+    while True:
+        chunk = list(islice(events, chunksize))
+        if not chunk:
+            return paths
+        chunk.sort(key=_KEY)
+        paths.append(_write_run(chunk, directory))
+
+
+def merge_events(sources, extract=None, presorted=False, chunksize=10000,
+                 fan_in=256, tmpdir=None):
+    """Iterate the events of many files in eventDateTime order.
+
+    :param sources: Iterable of paths or binary file objects
+    :param extract: Function applied to each event element. The results
+                    must be picklable. Default: serialize the element to
+                    bytes.
+    :param presorted: True if the events of each file are in time order
+    :param chunksize: Number of events sorted in memory at a time when the
+                      files are not presorted
+    :param fan_in: Maximum number of inputs merged at a time
+    :param tmpdir: Directory for temporary files
+    :returns: Generator object for iterating (datetime, value) pairs
+    :raises ValueError: If events of a presorted file are not in time order
+
+    """
+    if extract is None:
+        extract = _serialize
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    with tempfile.TemporaryDirectory(dir=tmpdir) as directory:
+        runs = []
+        pending = []
+        for source in sources:
+            if presorted:
+                pending.append(_file_events(source, extract, True))
+            else:
+                pending.extend(_read_run(path) for path in _sorted_runs(
+                    source, extract, chunksize, directory))
+            # Merge groups of inputs so that at most fan_in files are open
+            while len(pending) >= fan_in:
+                group, pending = pending[:fan_in], pending[fan_in:]
+                runs.append(_read_run(_write_run(
+                    heapq.merge(*group, key=_KEY), directory)))
+        runs.extend(pending)
+
+        while len(runs) > fan_in:
+            runs = [
+                _read_run(_write_run(
+                    heapq.merge(*runs[index:index + fan_in], key=_KEY),
+                    directory))
+                for index in range(0, len(runs), fan_in)]
+
+        yield from heapq.merge(*runs, key=_KEY)
+
+
+def write_merged(target, sources, root=None, **kwargs):
+    """Write the events of many files into one PREMIS document in
+    eventDateTime order.
+
+    :param target: Path or binary file object to write to
+    :param sources: Iterable of paths or binary file objects
+    :param root: Root element of the document (default: premis())
+    :param kwargs: Keyword arguments for :func:`merge_events`
+    :returns: Number of written events
+
+    """
+    count = 0
+    with PremisWriter(target, root) as writer:
+        for _, data in merge_events(sources, **kwargs):
+            writer.write_raw(data)
+            count += 1
+    return count
+
+
+def write_jsonl(target, sources, **kwargs):
+    """Write the events of many files as JSON lines in eventDateTime order.
+
+    Each line is an event record returned by
+    :func:`premis.event_base.parse_event_record`.
+
+    :param target: Path or text file object to write to
+    :param sources: Iterable of paths or binary file objects
+    :param kwargs: Keyword arguments for :func:`merge_events`
+    :returns: Number of written events
+
+    """
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'w', encoding='utf-8') as output:
+            return write_jsonl(output, sources, **kwargs)
+
+    count = 0
+    for _, record in merge_events(
+            sources, extract=parse_event_record, **kwargs):
+        target.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
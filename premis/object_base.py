@@ -10,7 +10,11 @@ References:
 """
 
 from xml_helpers.utils import decode_utf8, xsi_ns
+
+from premis import memo
 from premis.base import (_element,
+                         _identifier_fields,
+                         _insert_in_order,
                          _subelement,
                          identifier,
                          iter_elements,
@@ -19,6 +23,34 @@ from premis.base import (_element,
                          premis_ns)
 
 
+_OBJECT_ORDER = tuple(premis_ns(tag) for tag in [
+    'objectIdentifier',
+    'preservationLevel',
+    'significantProperties',
+    'objectCharacteristics',
+    'originalName',
+    'storage',
+    'environment',
+    'signatureInformation',
+    'relationship',
+    'linkingEventIdentifier',
+    'linkingIntellectualEntityIdentifier',
+    'linkingRightsStatementIdentifier'])
+
+_OBJECT_CHARACTERISTICS_ORDER = tuple(premis_ns(tag) for tag in [
+    'compositionLevel',
+    'fixity',
+    'size',
+    'format',
+    'creatingApplication',
+    'inhibitors',
+    'objectCharacteristicsExtension'])
+
+_OBJECT_RANKS = {tag: rank for rank, tag in enumerate(_OBJECT_ORDER)}
+_OBJECT_CHARACTERISTICS_RANKS = {
+    tag: rank for rank, tag in enumerate(_OBJECT_CHARACTERISTICS_ORDER)}
+
+
 def _object_elems_order(elem):
     """Return order number for given element in premis:object schema.
     This can be used for example with sort().
@@ -26,19 +58,11 @@ def _object_elems_order(elem):
     All elements for file, representation and bitstream are included,
     the sort order is the same for all these three types.
     """
-    return [
-        premis_ns('objectIdentifier'),
-        premis_ns('preservationLevel'),
-        premis_ns('significantProperties'),
-        premis_ns('objectCharacteristics'),
-        premis_ns('originalName'),
-        premis_ns('storage'),
-        premis_ns('environment'),
-        premis_ns('signatureInformation'),
-        premis_ns('relationship'),
-        premis_ns('linkingEventIdentifier'),
-        premis_ns('linkingIntellectualEntityIdentifier'),
-        premis_ns('linkingRightsStatementIdentifier')].index(elem.tag)
+    try:
+        return _OBJECT_RANKS[elem.tag]
+    except KeyError:
+        raise ValueError(
+            "{} is not a child of premis:object".format(elem.tag)) from None
 
 
 def fixity(message_digest, digest_algorithm='MD5'):
@@ -166,7 +190,10 @@ def relationship(
 
     :relationship_type: Relationship type from PREMIS vocabulary
     :relationship_subtype: Relationship subtype from PREMIS vocabulary
-    :related_objects: Iterable of related objects linked to relationship
+    :related_objects: Iterable of related objects linked to relationship.
+                      Objects can also be given as (type, value) tuples
+                      or records with keys identifier_type and
+                      identifier_value.
     :returns: ElementTree DOM tree
 
     Produces the following PREMIS segment::
@@ -195,8 +222,12 @@ def relationship(
     _subtype.text = decode_utf8(relationship_subtype)
 
     for related_object in related_objects:
-        (related_type, related_value) = parse_identifier_type_value(
-            related_object)
+        fields = _identifier_fields(related_object)
+        if fields is None:
+            (related_type, related_value) = parse_identifier_type_value(
+                related_object)
+        else:
+            (related_type, related_value, _) = fields
 
         related_identifier = identifier(
             related_type, related_value, prefix='relatedObject')
@@ -358,6 +389,31 @@ def object(
     return _object
 
 
+def add_to_object(premis_object, elem):
+    """Add an element to an existing object in schema order.
+
+    Elements belonging to objectCharacteristics, such as fixity, size and
+    format, are added to the first objectCharacteristics of the object,
+    which is created if missing.
+
+    :premis_object: PREMIS object element
+    :elem: Element to add
+    :returns: The object element
+    :raises ValueError: If the element is not allowed in an object
+
+    """
+    if elem.tag in _OBJECT_CHARACTERISTICS_RANKS:
+        characteristics = premis_object.find(
+            premis_ns('objectCharacteristics'))
+        if characteristics is None:
+            characteristics = object_characteristics()
+            _insert_in_order(premis_object, characteristics, _OBJECT_RANKS)
+        _insert_in_order(characteristics, elem,
+                         _OBJECT_CHARACTERISTICS_RANKS)
+        return premis_object
+    return _insert_in_order(premis_object, elem, _OBJECT_RANKS)
+
+
 def iter_objects(premis_el):
     """Iterate all PREMIS objects from starting element.
 
@@ -457,6 +513,7 @@ def objects_with_type(objects, object_identifier_type):
             yield _object
 
 
+@memo.memoize
 def parse_object_type(obj):
     """
     :param obj:
@@ -465,6 +522,7 @@ def parse_object_type(obj):
     return obj.xpath('./@xsi:type', namespaces=NAMESPACES)[0]
 
 
+@memo.memoize
 def parse_fixity(obj):
     """
     :param obj:
@@ -479,6 +537,20 @@ def parse_fixity(obj):
     return (algorithm, digest)
 
 
+@memo.memoize
+def parse_fixities(obj):
+    """Return all fixities of an object.
+
+    :param obj: Premis object element.
+    :return: Tuple of (algorithm, digest) tuples in document order.
+    """
+    return tuple(
+        (_fixity.findtext(premis_ns('messageDigestAlgorithm')),
+         _fixity.findtext(premis_ns('messageDigest')))
+        for _fixity in obj.iterfind('.//' + premis_ns('fixity')))
+
+
+@memo.memoize
 def parse_format(obj):
     """
     :param obj:
@@ -495,6 +567,7 @@ def parse_format(obj):
     return (format_name, format_version)
 
 
+@memo.memoize
 def parse_format_registry(obj):
     """
     :param obj:
@@ -509,6 +582,7 @@ def parse_format_registry(obj):
     return (format_registry_name, format_registry_key)
 
 
+@memo.memoize
 def parse_original_name(premis_object):
     """
     :param premis_object:
@@ -590,3 +664,55 @@ def parse_relationship_subtype(premis_elem):
             namespaces=NAMESPACES)[0]
     except IndexError:
         return ""
+
+
+def parse_object_record(premis_object):
+    """Return the fields of a PREMIS object as a dictionary.
+
+    The record contains only strings, lists and tuples, so it can be
+    pickled or serialized as JSON.
+
+    :param premis_object: Premis object element.
+    :return: Dictionary with keys identifier_type, identifier_value,
+             object_type, original_name, formats, fixities, relationships
+             and linking_events. Formats are a list of (name, version)
+             tuples, fixities a list of (algorithm, digest) tuples,
+             relationships a list of (type, subtype, related object
+             identifier type, related object identifier value) tuples and
+             linking events a list of (type, value) tuples.
+    """
+    characteristics = premis_ns('objectCharacteristics')
+    return {
+        'identifier_type': premis_object.findtext('/'.join([
+            premis_ns('objectIdentifier'),
+            premis_ns('objectIdentifierType')])),
+        'identifier_value': premis_object.findtext('/'.join([
+            premis_ns('objectIdentifier'),
+            premis_ns('objectIdentifierValue')])),
+        'object_type': premis_object.get(xsi_ns('type')),
+        'original_name': premis_object.findtext(premis_ns('originalName')),
+        'formats': [
+            (designation.findtext(premis_ns('formatName')),
+             designation.findtext(premis_ns('formatVersion')))
+            for designation in premis_object.iterfind('/'.join([
+                characteristics, premis_ns('format'),
+                premis_ns('formatDesignation')]))],
+        'fixities': [
+            (_fixity.findtext(premis_ns('messageDigestAlgorithm')),
+             _fixity.findtext(premis_ns('messageDigest')))
+            for _fixity in premis_object.iterfind('/'.join([
+                characteristics, premis_ns('fixity')]))],
+        'relationships': [
+            (_relationship.findtext(premis_ns('relationshipType')),
+             _relationship.findtext(premis_ns('relationshipSubType')),
+             related.findtext(premis_ns('relatedObjectIdentifierType')),
+             related.findtext(premis_ns('relatedObjectIdentifierValue')))
+            for _relationship in premis_object.iterfind(
+                premis_ns('relationship'))
+            for related in _relationship.iterfind(
+                premis_ns('relatedObjectIdentification'))],
+        'linking_events': [
+            (linking.findtext(premis_ns('linkingEventIdentifierType')),
+             linking.findtext(premis_ns('linkingEventIdentifierValue')))
+            for linking in premis_object.iterfind(
+                premis_ns('linkingEventIdentifier'))]}
@@ -0,0 +1,115 @@
+"""Functions for building and serializing PREMIS elements in parallel.
+
+Records are converted to PREMIS elements and serialized in worker processes.
+Only the records and the serialized elements are passed between processes,
+and the parent process concatenates the results under a premis() root in
+the order of the records::
+
+    def build_event(record):
+        return event(identifier('local', record['id'], 'event'), ...)
+
+    write_parallel('premis.xml', build_event, records)
+
+The builder function and the records must be picklable, so the builder has
+to be defined at the top level of a module.
+
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import lxml.etree as ET
+
+from premis.stream import PremisWriter
+
+# pylint: disable=c-extension-no-member
+
+
+def chunks(records, chunksize):
+    """Iterate lists of consecutive records.
+
+    :param records: Iterable of records
+    :param chunksize: Maximum number of records in a list
+    :returns: Generator object for iterating lists of records
+
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def pending_limit(max_workers=None):
+    """Return the number of submitted chunks to keep pending at a time.
+
+    :param max_workers: Number of workers (default: CPU count)
+    :returns: Two chunks per worker
+
+    """
+    return 2 * (max_workers or os.cpu_count() or 1)
+
+
+def _serialize_chunk(builder, records):
+    """Build and serialize elements for a list of records."""
+    return [
+        ET.tostring(builder(record), encoding='UTF-8', with_tail=False)
+        for record in records]
+
+
+def serialize_parallel(builder, records, max_workers=None, chunksize=100,
+                       executor=None):
+    """Build and serialize elements in a process pool.
+
+    At most two chunks of records per worker are processed at a time, so
+    records can be given as a lazy iterable.
+
+    :param builder: Function returning an element for a record
+    :param records: Iterable of records
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param chunksize: Number of records sent to a worker at a time
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: Generator object for iterating serialized elements as bytes
+              in the order of the records
+
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as pool:
+            yield from serialize_parallel(
+                builder, records, max_workers, chunksize, executor=pool)
+        return
+
+    limit = pending_limit(max_workers)
+    pending = deque()
+    for chunk in chunks(records, chunksize):
+        pending.append(executor.submit(_serialize_chunk, builder, chunk))
+        if len(pending) >= limit:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def write_parallel(target, builder, records, root=None, max_workers=None,
+                   chunksize=100, executor=None):
+    """Write a PREMIS document with elements built in a process pool.
+
+    :param target: Path or binary file object to write to
+    :param builder: Function returning an element for a record
+    :param records: Iterable of records
+    :param root: Root element of the document (default: premis())
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param chunksize: Number of records sent to a worker at a time
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: Number of written elements
+
+    """
+    count = 0
+    with PremisWriter(target, root) as writer:
+        for data in serialize_parallel(builder, records, max_workers,
+                                       chunksize, executor):
+            writer.write_raw(data)
+            count += 1
+    return count
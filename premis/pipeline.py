@@ -0,0 +1,303 @@
+"""Composable streaming pipelines of PREMIS elements.
+
+A pipeline reads items from a source, passes them through stages and
+consumes them with a sink. Stages are functions taking an iterable of items
+and returning an iterable, such as the filters of the library::
+
+    failures = (
+        Pipeline.from_files(paths, kinds=['event'])
+        .stage(events_with_outcome, 'failure')
+        .map(parse_event_record)
+        .run(list))
+
+    (Pipeline(iter_objects(root))
+     .filter(Query('object', format_name='text/plain').matches)
+     .run(write_premis('text.xml')))
+
+Items are pulled through the stages one at a time, so memory use does not
+depend on the number of items. Map stages can be run in a thread or process
+pool. At most `max_pending` chunks of items are submitted to the pool at a
+time, so a slow consumer holds back the source instead of queueing items in
+memory. Items and results passed to a process pool must be picklable, which
+lxml elements are not; use threads for maps of elements.
+
+The number of items produced by each stage and the time spent in the stage
+itself, excluding the time spent in the preceding stages, are collected to
+:attr:`Pipeline.metrics` while the pipeline runs.
+
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from premis.parallel import chunks, pending_limit
+from premis.stream import ELEMENT_KINDS, PremisWriter, iterparse_elements
+
+
+class StageMetrics:
+    """Throughput of a pipeline stage.
+
+    :param name: Name of the stage
+    :param upstream: Metrics of the preceding stage or None
+
+    """
+
+    def __init__(self, name, upstream=None):
+        self.name = name
+        self.upstream = upstream
+        self.items = 0
+        self.elapsed = 0.0
+
+    @property
+    def seconds(self):
+        """Time spent in the stage itself in seconds."""
+        if self.upstream is None:
+            return self.elapsed
+        return max(self.elapsed - self.upstream.elapsed, 0.0)
+
+    @property
+    def throughput(self):
+        """Items produced per second spent in the stage."""
+        if not self.seconds:
+            return 0.0
+        return self.items / self.seconds
+
+    def as_dict(self):
+        """Return metrics as a dictionary."""
+        return {'name': self.name, 'items': self.items,
+                'seconds': self.seconds, 'throughput': self.throughput}
+
+
+def _measured(items, metrics):
+    """Iterate items counting them and the time spent producing them."""
+    iterator = iter(items)
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            metrics.elapsed += clock() - start
+            return
+        metrics.elapsed += clock() - start
+        metrics.items += 1
+        yield item
+
+
+def _map_chunk(func, chunk):
+    """Apply a function to a list of items."""
+    return [func(item) for item in chunk]
+
+
+def _parallel_map(items, func, executor, chunksize, max_pending):
+    """Iterate results of a function in a pool in the order of the items."""
+    pending = deque()
+    for chunk in chunks(items, chunksize):
+        pending.append(executor.submit(_map_chunk, func, chunk))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _pool_map(items, func, workers, processes, chunksize, max_pending):
+    """Iterate results of a function in a new thread or process pool."""
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(workers) as pool:
+        yield from _parallel_map(items, func, pool, chunksize, max_pending)
+
+
+def _filter(items, predicate):
+    """Iterate items for which the predicate is true."""
+    return (item for item in items if predicate(item))
+
+
+def _batch(items, size):
+    """Iterate lists of at most `size` items."""
+    return chunks(items, size)
+
+
+def _flatten(batches):
+    """Iterate the items of batches."""
+    for batch in batches:
+        yield from batch
+
+
+def _files(paths, kinds):
+    """Iterate PREMIS elements of many files."""
+    for path in paths:
+        yield from iterparse_elements(path, kinds)
+
+
+class Pipeline:
+    """Pipeline of streaming stages.
+
+    Stages are added with the methods returning the pipeline itself, and the
+    pipeline is run by iterating it or with :meth:`run`. A pipeline whose
+    source is an iterator can be run only once.
+
+    :param source: Iterable of items
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.metrics = []
+        self._stages = []
+
+    @classmethod
+    def from_files(cls, paths, kinds=ELEMENT_KINDS):
+        """Return pipeline reading PREMIS elements from files one element at
+        a time.
+
+        :param paths: Iterable of paths or binary file objects
+        :param kinds: Local names of the elements to read
+        :returns: Pipeline
+
+        """
+        return cls(_files(paths, kinds))
+
+    def stage(self, func, *args, name=None):
+        """Add stage func(items, *args) returning an iterable of items,
+        e.g. :func:`premis.event_base.events_with_outcome`.
+
+        :param func: Function taking an iterable as the first argument
+        :param args: Other arguments of the function
+        :param name: Name of the stage in metrics (default: function name)
+        :returns: The pipeline
+
+        """
+        self._stages.append((
+            name or func.__name__, lambda items: func(items, *args)))
+        return self
+
+    def filter(self, predicate, name=None):
+        """Add stage passing the items for which `predicate` is true.
+
+        :param predicate: Function taking an item
+        :param name: Name of the stage in metrics
+        :returns: The pipeline
+
+        """
+        self._stages.append((
+            name or 'filter', lambda items: _filter(items, predicate)))
+        return self
+
+    def map(self, func, workers=None, processes=False, chunksize=1,
+            max_pending=None, executor=None, name=None):
+        """Add stage replacing each item with func(item).
+
+        Without `workers` and `executor` the function is called in the
+        calling thread. Results are returned in the order of the items.
+
+        :param func: Function taking an item. With processes, the function
+                     must be defined at the top level of a module.
+        :param workers: Number of threads or processes in a new pool
+        :param processes: Use a process pool instead of a thread pool
+        :param chunksize: Number of items submitted to the pool at a time
+        :param max_pending: Maximum number of chunks submitted to the pool
+                            at a time (default: two per worker)
+        :param executor: Existing executor to use instead of a new pool
+        :param name: Name of the stage in metrics
+        :returns: The pipeline
+
+        """
+        name = name or getattr(func, '__name__', 'map')
+        if workers is None and executor is None:
+            self._stages.append((name, lambda items: map(func, items)))
+            return self
+
+        if max_pending is None:
+            max_pending = pending_limit(workers)
+        if executor is None:
+            self._stages.append((name, lambda items: _pool_map(
+                items, func, workers, processes, chunksize, max_pending)))
+        else:
+            self._stages.append((name, lambda items: _parallel_map(
+                items, func, executor, chunksize, max_pending)))
+        return self
+
+    def batch(self, size, name=None):
+        """Add stage grouping items into lists of at most `size` items.
+
+        :param size: Number of items in a list
+        :param name: Name of the stage in metrics
+        :returns: The pipeline
+
+        """
+        self._stages.append((
+            name or 'batch', lambda items: _batch(items, size)))
+        return self
+
+    def flatten(self, name=None):
+        """Add stage iterating the items of lists produced by the
+        preceding stage.
+
+        :param name: Name of the stage in metrics
+        :returns: The pipeline
+
+        """
+        self._stages.append((name or 'flatten', _flatten))
+        return self
+
+    def __iter__(self):
+        self.metrics = []
+        upstream = StageMetrics('source')
+        self.metrics.append(upstream)
+        items = _measured(self.source, upstream)
+        for name, build in self._stages:
+            metrics = StageMetrics(name, upstream)
+            self.metrics.append(metrics)
+            items = _measured(build(items), metrics)
+            upstream = metrics
+        return items
+
+    def run(self, sink=None):
+        """Run the pipeline.
+
+        :param sink: Function consuming an iterable of items, e.g.
+                     :func:`write_premis` or list. Default: count the
+                     items.
+        :returns: Result of the sink
+
+        """
+        if sink is None:
+            sink = _count
+        items = iter(self)
+        upstream = self.metrics[-1]
+        metrics = StageMetrics(getattr(sink, '__name__', 'sink'), upstream)
+        self.metrics.append(metrics)
+        start = time.perf_counter()
+        try:
+            return sink(items)
+        finally:
+            metrics.items = upstream.items
+            metrics.elapsed = time.perf_counter() - start
+
+
+def _count(items):
+    """Return number of items."""
+    count = 0
+    for _ in items:
+        count += 1
+    return count
+
+
+def write_premis(target, root=None):
+    """Return sink writing elements to a PREMIS document.
+
+    :param target: Path or binary file object to write to
+    :param root: Root element of the document (default: premis())
+    :returns: Function writing elements or serialized elements and
+              returning their number
+
+    """
+    def write_premis(items):
+        count = 0
+        with PremisWriter(target, root) as writer:
+            for elem in items:
+                writer.write(elem)
+                count += 1
+        return count
+    return write_premis
@@ -0,0 +1,230 @@
+"""Compiled queries over PREMIS events, objects and agents.
+
+A query is built with keyword filters, which are compiled into one XPath
+expression. The expression is evaluated by libxml2, so a single pass
+replaces chaining Python-level filters such as
+:func:`premis.event_base.events_with_outcome`::
+
+    query = Query('event', type='validation', outcome='success',
+                  after='2020-01-01', linking_object=('local', 'obj1'))
+    events = query.findall(premis_root)
+
+    for _event in query.iterfile('large-premis.xml'):
+        ...
+
+All conditions must match. Supported filters by element type:
+
+    * event: identifier, type, detail, outcome, after, before,
+      linking_object, linking_agent
+    * object: identifier, type (e.g. 'premis:file'), format_name,
+      format_version
+    * agent: identifier, type, name
+
+Identifier filters accept an identifier value or a tuple of identifier type
+and value. The datetime range is half-open: `after` is inclusive and
+`before` exclusive. The bounds and the eventDateTime values are parsed with
+:func:`premis.timeline.parse_timestamp`, so dates, datetimes without
+seconds and datetimes separated with a space are accepted. Datetimes are
+compared as points in time, so time zones are taken into account, and
+dates without a time mean midnight UTC. Events whose eventDateTime cannot
+be parsed never match a datetime range.
+
+"""
+
+import datetime
+import functools
+
+import lxml.etree as ET
+from xml_helpers.utils import decode_utf8
+
+from premis.base import NAMESPACES
+from premis.stream import ELEMENT_KINDS, iterparse_elements
+from premis.timeline import parse_timestamp
+
+# pylint: disable=c-extension-no-member
+
+# Namespace of the XPath extension functions of queries
+FUNCTIONS_NS = 'urn:x-premis:query-functions'
+
+_QUERY_NAMESPACES = dict(NAMESPACES, query=FUNCTIONS_NS)
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+_IDENTIFIER_FILTERS = {
+    'event': {
+        'identifier': 'eventIdentifier',
+        'linking_object': 'linkingObjectIdentifier',
+        'linking_agent': 'linkingAgentIdentifier'},
+    'object': {'identifier': 'objectIdentifier'},
+    'agent': {'identifier': 'agentIdentifier'}
+}
+
+_FILTERS = {
+    'event': {
+        'type': 'premis:eventType = $type',
+        'detail': 'premis:eventDetail = $detail',
+        'outcome': ('premis:eventOutcomeInformation/premis:eventOutcome '
+                    '= $outcome'),
+        'after': 'query:seconds(string(premis:eventDateTime)) >= $after',
+        'before': 'query:seconds(string(premis:eventDateTime)) < $before'},
+    'object': {
+        'type': '@xsi:type = $type',
+        'format_name': ('premis:objectCharacteristics/premis:format/'
+                        'premis:formatDesignation/premis:formatName '
+                        '= $format_name'),
+        'format_version': ('premis:objectCharacteristics/premis:format/'
+                           'premis:formatDesignation/premis:formatVersion '
+                           '= $format_version')},
+    'agent': {
+        'type': 'premis:agentType = $type',
+        'name': 'premis:agentName = $name'}
+}
+
+
+# Filters whose values are datetimes
+_DATETIME_FILTERS = ('after', 'before')
+
+
+def _seconds(value):
+    """Return datetime string as seconds since the epoch.
+
+    :raises ValueError: If the value cannot be parsed
+
+    """
+    return (parse_timestamp(value) - _EPOCH).total_seconds()
+
+
+def _xpath_seconds(_context, value):
+    """XPath extension function returning a datetime string as seconds
+    since the epoch, or NaN if it cannot be parsed.
+    """
+    try:
+        return _seconds(value)
+    except ValueError:
+        return float('nan')
+
+
+_EXTENSIONS = {(FUNCTIONS_NS, 'seconds'): _xpath_seconds}
+
+
+def _identifier_condition(name, tag, with_type):
+    """Return XPath condition for an identifier filter."""
+    condition = 'premis:{tag}[premis:{tag}Value = ${name}'.format(
+        tag=tag, name=name)
+    if with_type:
+        condition += ' and premis:{tag}Type = ${name}_type'.format(
+            tag=tag, name=name)
+    return condition + ']'
+
+
+@functools.lru_cache(maxsize=128)
+def _compile(kind, signature):
+    """Compile XPath expressions for the filters in `signature`.
+
+    :param kind: Element type
+    :param signature: Tuple of (filter name, identifier type given) pairs
+    :returns: Tuple of expressions for selecting matching descendants and
+              for testing an element
+
+    """
+    conditions = []
+    for name, with_type in signature:
+        if name in _IDENTIFIER_FILTERS[kind]:
+            conditions.append(_identifier_condition(
+                name, _IDENTIFIER_FILTERS[kind][name], with_type))
+        else:
+            conditions.append(_FILTERS[kind][name])
+
+    step = 'premis:' + kind
+    if conditions:
+        step += '[' + ' and '.join(
+            '(%s)' % condition for condition in conditions) + ']'
+
+    return (
+        ET.XPath('descendant-or-self::' + step,
+                 namespaces=_QUERY_NAMESPACES, extensions=_EXTENSIONS),
+        ET.XPath('boolean(self::' + step + ')',
+                 namespaces=_QUERY_NAMESPACES, extensions=_EXTENSIONS))
+
+
+class Query:
+    """Compiled filter for PREMIS events, objects or agents.
+
+    :param kind: 'event', 'object' or 'agent'
+    :param filters: Filter names and values, see the module documentation
+    :raises ValueError: If the element type or a filter is not supported,
+                        or a datetime cannot be parsed
+
+    """
+
+    def __init__(self, kind, **filters):
+        if kind not in ELEMENT_KINDS:
+            raise ValueError("Unknown element type: {}".format(kind))
+
+        self.kind = kind
+        self.filters = filters
+        self._variables = {}
+        signature = []
+        for name in sorted(filters):
+            value = filters[name]
+            if name in _IDENTIFIER_FILTERS[kind]:
+                with_type = isinstance(value, tuple)
+                if with_type:
+                    self._variables[name + '_type'] = decode_utf8(value[0])
+                    value = value[1]
+            elif name in _FILTERS[kind]:
+                with_type = False
+            else:
+                raise ValueError(
+                    "Unknown filter for {}: {}".format(kind, name))
+            if name in _DATETIME_FILTERS:
+                self._variables[name] = _seconds(value)
+            else:
+                self._variables[name] = decode_utf8(value)
+            signature.append((name, with_type))
+
+        self._select, self._test = _compile(kind, tuple(signature))
+
+    def __repr__(self):
+        return 'Query({!r}, {})'.format(self.kind, ', '.join(
+            '{}={!r}'.format(name, value)
+            for name, value in sorted(self.filters.items())))
+
+    def matches(self, elem):
+        """Return True if the element matches the query.
+
+        :param elem: ElementTree element
+        :returns: Boolean
+
+        """
+        return self._test(elem, **self._variables)
+
+    def findall(self, premis_elem):
+        """Return matching elements in a tree.
+
+        :param premis_elem: ElementTree element to search from
+        :returns: List of elements in document order
+
+        """
+        return self._select(premis_elem, **self._variables)
+
+    def filter(self, elements):
+        """Iterate matching elements of an iterable.
+
+        :param elements: Iterable of ElementTree elements
+        :returns: Generator object for iterating elements
+
+        """
+        for elem in elements:
+            if self._test(elem, **self._variables):
+                yield elem
+
+    def iterfile(self, source):
+        """Iterate matching elements in a file without parsing the whole
+        file into memory.
+
+        :param source: Path or binary file object
+        :returns: Generator object for iterating elements
+
+        """
+        return self.filter(iterparse_elements(source, [self.kind]))
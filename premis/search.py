@@ -0,0 +1,316 @@
+"""Persistent full-text index of event and agent texts in PREMIS files.
+
+The eventDetail and eventOutcomeDetailNote of events and the agentName and
+agentNote of agents are split into lowercase words, which are stored in an
+inverted index in an SQLite database. Searching for words returns the
+matching events and agents and the files they are in without reading the
+files::
+
+    with SearchIndex('search.db') as index:
+        index.update(paths)
+        for hit in index.search('checksum mismatch', kind='event'):
+            hit.path, hit.identifier_value
+
+Files are read element by element. :meth:`SearchIndex.update` indexes only
+the files that are new or whose size or modification time has changed
+since they were indexed, and :meth:`SearchIndex.prune` removes files that
+no longer exist.
+
+A search matches the elements containing all words of the query in any of
+the indexed fields or in the given fields. A word ending with ``*``
+matches all words starting with it.
+
+"""
+
+import os
+import re
+import sqlite3
+from collections import namedtuple
+
+from premis.agent_base import parse_agent_record
+from premis.event_base import parse_event_record
+from premis.stream import iterparse_elements
+
+SEARCH_FORMAT = '1'
+
+# Indexed fields of the records of each kind of element
+FIELDS = {
+    'event': ('detail', 'outcome_detail_note'),
+    'agent': ('name', 'note')
+}
+
+SearchHit = namedtuple(
+    'SearchHit', ['path', 'kind', 'identifier_type', 'identifier_value'])
+SearchHit.__doc__ = """Element matching a search.
+
+:path: Path of the file containing the element
+:kind: Element type, 'event' or 'agent'
+:identifier_type: PREMIS identifier type of the element
+:identifier_value: PREMIS identifier value of the element
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS elements (
+    id INTEGER PRIMARY KEY,
+    document INTEGER,
+    kind TEXT,
+    identifier_type TEXT,
+    identifier_value TEXT);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT,
+    field TEXT,
+    element INTEGER,
+    PRIMARY KEY (token, field, element)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS elements_document ON elements (document);
+CREATE INDEX IF NOT EXISTS postings_element ON postings (element);
+"""
+
+_PARSERS = {
+    'event': parse_event_record,
+    'agent': parse_agent_record
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Return the lowercase words of a text.
+
+    :param text: String or None
+    :returns: List of words
+
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _postings(record, kind):
+    """Return unique (token, field) pairs of a record."""
+    postings = set()
+    for field in FIELDS[kind]:
+        for token in tokenize(record[field]):
+            postings.add((token, field))
+    return postings
+
+
+class SearchIndex:
+    """Full-text index of PREMIS files.
+
+    :param index_path: Path to the SQLite database, created if missing
+
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._connection = sqlite3.connect(index_path)
+        self._connection.executescript(_SCHEMA)
+        self._connection.execute(
+            'INSERT OR IGNORE INTO meta VALUES (?, ?)',
+            ('format', SEARCH_FORMAT))
+        self._connection.commit()
+        version = self._connection.execute(
+            "SELECT value FROM meta WHERE key = 'format'").fetchone()[0]
+        if version != SEARCH_FORMAT:
+            self.close()
+            raise ValueError(
+                "Unsupported search index version {}".format(version))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the index database."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _remove_document(self, document):
+        """Remove the elements of a document from the index."""
+        connection = self._connection
+        connection.execute(
+            'DELETE FROM postings WHERE element IN '
+            '(SELECT id FROM elements WHERE document = ?)', (document,))
+        connection.execute(
+            'DELETE FROM elements WHERE document = ?', (document,))
+        connection.execute('DELETE FROM documents WHERE id = ?', (document,))
+
+    def add_file(self, path):
+        """Index a file, replacing its earlier entries.
+
+        :param path: Path to a PREMIS file
+        :returns: Number of indexed elements
+
+        """
+        path = os.path.abspath(path)
+        connection = self._connection
+        # Stat before reading, so that a file modified during indexing is
+        # indexed again by the next update
+        stat = os.stat(path)
+        count = 0
+        with connection:
+            row = connection.execute(
+                'SELECT id FROM documents WHERE path = ?', (path,)).fetchone()
+            if row is not None:
+                self._remove_document(row[0])
+            document = connection.execute(
+                'INSERT INTO documents (path, size, mtime_ns) '
+                'VALUES (?, ?, ?)',
+                (path, stat.st_size, stat.st_mtime_ns)).lastrowid
+            postings = []
+            for elem in iterparse_elements(path, list(FIELDS)):
+                kind = elem.tag.rpartition('}')[2]
+                record = _PARSERS[kind](elem)
+                element = connection.execute(
+                    'INSERT INTO elements (document, kind, identifier_type, '
+                    'identifier_value) VALUES (?, ?, ?, ?)',
+                    (document, kind, record['identifier_type'],
+                     record['identifier_value'])).lastrowid
+                postings.extend(
+                    (token, field, element)
+                    for token, field in _postings(record, kind))
+                count += 1
+                if len(postings) >= 10000:
+                    connection.executemany(
+                        'INSERT INTO postings VALUES (?, ?, ?)', postings)
+                    postings = []
+            connection.executemany(
+                'INSERT INTO postings VALUES (?, ?, ?)', postings)
+        return count
+
+    def is_stale(self, path):
+        """Return True if a file is not indexed or has changed since it was
+        indexed.
+
+        :param path: Path to a PREMIS file
+
+        """
+        row = self._connection.execute(
+            'SELECT size, mtime_ns FROM documents WHERE path = ?',
+            (os.path.abspath(path),)).fetchone()
+        if row is None:
+            return True
+        stat = os.stat(path)
+        return row != (stat.st_size, stat.st_mtime_ns)
+
+    def update(self, paths):
+        """Index the new and changed files.
+
+        :param paths: Iterable of paths to PREMIS files
+        :returns: List of the indexed paths
+
+        """
+        indexed = []
+        for path in paths:
+            if self.is_stale(path):
+                self.add_file(path)
+                indexed.append(path)
+        return indexed
+
+    def remove(self, path):
+        """Remove a file from the index.
+
+        :param path: Path to an indexed file
+        :returns: True if the file was indexed, False otherwise
+
+        """
+        with self._connection:
+            row = self._connection.execute(
+                'SELECT id FROM documents WHERE path = ?',
+                (os.path.abspath(path),)).fetchone()
+            if row is None:
+                return False
+            self._remove_document(row[0])
+        return True
+
+    def prune(self):
+        """Remove the files that no longer exist from the index.
+
+        :returns: List of the removed paths
+
+        """
+        removed = [
+            path for (path,) in self._connection.execute(
+                'SELECT path FROM documents')
+            if not os.path.exists(path)]
+        for path in removed:
+            self.remove(path)
+        return removed
+
+    def paths(self):
+        """Return the indexed paths in sorted order."""
+        return [path for (path,) in self._connection.execute(
+            'SELECT path FROM documents ORDER BY path')]
+
+    @staticmethod
+    def _matching(word, fields):
+        """Return query and parameters selecting ids of the elements
+        containing a query word.
+        """
+        if word.endswith('*'):
+            prefix = word[:-1].lower()
+            query = 'SELECT element FROM postings WHERE token >= ?'
+            parameters = [prefix]
+            if prefix:
+                query += ' AND token < ?'
+                parameters.append(prefix + '\U0010ffff')
+        else:
+            query = 'SELECT element FROM postings WHERE token = ?'
+            parameters = [word]
+        if fields:
+            query += ' AND field IN ({})'.format(', '.join('?' * len(fields)))
+            parameters.extend(fields)
+        return query, parameters
+
+    def search(self, query, kind=None, fields=None, limit=None):
+        """Return the elements containing all words of a query.
+
+        :param query: Words separated by whitespace
+        :param kind: Element type, 'event' or 'agent'. All types are
+                     searched by default.
+        :param fields: Record fields to search, e.g. ['detail']. All fields
+                       in FIELDS are searched by default.
+        :param limit: Maximum number of returned elements, None for no
+                      limit
+        :returns: List of SearchHit tuples ordered by path and document
+                  order
+
+        """
+        terms = []
+        for word in query.split():
+            if word.endswith('*'):
+                terms.append(word)
+            else:
+                # Words with punctuation match elements having all parts
+                terms.extend(tokenize(word))
+        if not terms:
+            return []
+
+        subqueries = []
+        parameters = []
+        for term in dict.fromkeys(terms):
+            subquery, term_parameters = self._matching(term, fields)
+            subqueries.append(subquery)
+            parameters.extend(term_parameters)
+        sql = (
+            'SELECT documents.path, kind, identifier_type, identifier_value '
+            'FROM elements JOIN documents ON documents.id = elements.document '
+            'WHERE elements.id IN ({})'.format(' INTERSECT '.join(subqueries)))
+        if kind is not None:
+            sql += ' AND kind = ?'
+            parameters.append(kind)
+        sql += ' ORDER BY documents.path, elements.id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        return [SearchHit(*row)
+                for row in self._connection.execute(sql, parameters)]
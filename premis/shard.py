@@ -0,0 +1,220 @@
+"""Splitting of large PREMIS documents into self-contained shards.
+
+The elements of a document are distributed in document order to shards of
+at most `max_elements` elements or `max_bytes` bytes, and each shard is
+written as a PREMIS document of its own::
+
+    shards = shard_file('premis.xml', 'shard-{:04d}.xml', max_bytes=2**28)
+
+Objects and agents referred to by the elements of a shard are copied to
+the shard if it does not already contain them, so the events and rights
+statements of a shard can be processed independently of the other shards.
+The following references are followed:
+
+    * linkingObjectIdentifier and linkingAgentIdentifier
+    * relatedObjectIdentification of objects
+    * dependencyIdentifier of object environments
+
+References are followed one level deep: the references of copied elements
+are not followed, and events are never copied. The linkingEventIdentifier
+and relatedEventIdentification of objects, as well as the references of
+copied objects, may thus point to elements in other shards. Following them
+would copy e.g. a package level event linking every object, and through it
+the whole document, to every shard.
+
+The document is not parsed. Elements are located and their references are
+found from the raw bytes of the memory mapped file, and shards are written
+by copying byte ranges of the file in worker processes. Only the locations
+of the objects and agents of the document and of the elements of the shards
+being written are held in memory.
+
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from premis.append import ELEMENT_ORDER
+from premis.parallel import pending_limit
+from premis.stream import (PremisWriter, element_texts, fragment_identifier,
+                           mapped_file, scan_fragments)
+
+Shard = namedtuple('Shard', ['path', 'elements', 'duplicates', 'size'])
+Shard.__doc__ = """Written shard of a PREMIS document.
+
+:path: Path of the shard
+:elements: Number of elements of the source document in the shard
+:duplicates: Number of referred objects and agents copied to the shard
+:size: Total size of the elements in bytes
+"""
+
+# Prefixes of the identifier type and value of the referring elements and
+# the kind of the referred elements
+_LINKS = (
+    ('linkingObject', 'object'),
+    ('linkingAgent', 'agent'),
+    ('relatedObject', 'object'),
+    ('dependency', 'object')
+)
+
+_LINKED_KINDS = ('object', 'agent')
+
+
+def _links(buf, fragment):
+    """Return (kind, identifier_type, identifier_value) keys of the
+    elements a located element refers to.
+    """
+    links = []
+    start, end = fragment.start, fragment.end
+    for prefix, kind in _LINKS:
+        types = element_texts(buf, prefix + 'IdentifierType', start, end)
+        values = element_texts(buf, prefix + 'IdentifierValue', start, end)
+        links.extend(
+            (kind, identifier_type, identifier_value)
+            for identifier_type, identifier_value in zip(types, values))
+    return links
+
+
+def _element_key(buf, fragment):
+    """Return (kind, identifier_type, identifier_value) key of a located
+    object or agent, or None for other elements.
+    """
+    if fragment.kind not in _LINKED_KINDS:
+        return None
+    identifier = fragment_identifier(buf, fragment)
+    if identifier is None:
+        return None
+    return (fragment.kind,) + identifier
+
+
+class _ShardPlan:
+    """Located elements assigned to a shard."""
+
+    def __init__(self):
+        self.fragments = {kind: [] for kind in ELEMENT_ORDER}
+        self.keys = set()
+        self.elements = 0
+        self.duplicates = 0
+        self.size = 0
+
+    def missing(self, links, targets):
+        """Return located elements referred to by `links` that are not in
+        the shard.
+        """
+        missing = {}
+        for link in links:
+            if link not in self.keys and link in targets:
+                missing[link] = targets[link]
+        return missing
+
+    def add(self, fragment, key, missing):
+        """Add an element and copies of the elements it refers to."""
+        self.elements += 1
+        for link, target in missing.items():
+            if link == key:
+                continue
+            self.keys.add(link)
+            self.fragments[target.kind].append(target)
+            self.duplicates += 1
+            self.size += target.end - target.start
+        if key is not None and key in self.keys:
+            # A copy of the element was already added for an earlier
+            # reference
+            self.duplicates -= 1
+            return
+        if key is not None:
+            self.keys.add(key)
+        self.fragments[fragment.kind].append(fragment)
+        self.size += fragment.end - fragment.start
+
+    def ranges(self):
+        """Return (start, end, namespaces) of the elements in schema
+        order.
+        """
+        return [
+            (fragment.start, fragment.end, fragment.namespaces)
+            for kind in ELEMENT_ORDER for fragment in self.fragments[kind]]
+
+
+def _plans(buf, max_elements, max_bytes):
+    """Iterate the shards of a document as _ShardPlan objects."""
+    targets = {}
+    for fragment in scan_fragments(buf, _LINKED_KINDS):
+        key = _element_key(buf, fragment)
+        if key is not None:
+            targets.setdefault(key, fragment)
+
+    plan = _ShardPlan()
+    for fragment in scan_fragments(buf, ELEMENT_ORDER):
+        key = _element_key(buf, fragment)
+        links = _links(buf, fragment)
+        missing = plan.missing(links, targets)
+        if plan.elements:
+            size = fragment.end - fragment.start + sum(
+                target.end - target.start for link, target in missing.items()
+                if link != key)
+            if ((max_elements is not None and
+                 plan.elements >= max_elements) or
+                    (max_bytes is not None and
+                     plan.size + size > max_bytes)):
+                yield plan
+                plan = _ShardPlan()
+                missing = plan.missing(links, targets)
+        plan.add(fragment, key, missing)
+
+    if plan.elements:
+        yield plan
+
+
+def _write_shard(source, target, ranges):
+    """Write the byte ranges of `source` as a PREMIS document."""
+    with mapped_file(source) as buf, memoryview(buf) as view, \
+            PremisWriter(target) as writer:
+        for start, end, namespaces in ranges:
+            with view[start:end] as data:
+                writer.write_raw(data, namespaces)
+    return target
+
+
+def shard_file(source, target, max_elements=None, max_bytes=None,
+               max_workers=None, executor=None):
+    """Split a PREMIS document into self-contained documents.
+
+    A shard exceeds `max_bytes` only if a single element and the elements
+    it refers to do not fit in it. The root elements of the shards are
+    created with :func:`premis.base.premis`.
+
+    :param source: Path to the PREMIS file
+    :param target: Format string of the shard paths, formatted with the
+                   number of the shard starting from zero, e.g.
+                   'shard-{:04d}.xml'
+    :param max_elements: Maximum number of elements of the source document
+                         in a shard, not counting the copied elements
+    :param max_bytes: Maximum total size of the elements in a shard
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: List of Shard tuples in order
+    :raises ValueError: If neither max_elements nor max_bytes is given
+
+    """
+    if max_elements is None and max_bytes is None:
+        raise ValueError("Either max_elements or max_bytes is required")
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as pool:
+            return shard_file(source, target, max_elements, max_bytes,
+                              max_workers, pool)
+
+    limit = pending_limit(max_workers)
+    pending = deque()
+    shards = []
+    with mapped_file(source) as buf:
+        for number, plan in enumerate(_plans(buf, max_elements, max_bytes)):
+            path = target.format(number)
+            pending.append(executor.submit(
+                _write_shard, source, path, plan.ranges()))
+            shards.append(
+                Shard(path, plan.elements, plan.duplicates, plan.size))
+            if len(pending) >= limit:
+                pending.popleft().result()
+    while pending:
+        pending.popleft().result()
+    return shards
@@ -0,0 +1,158 @@
+"""Functions for computing statistics of PREMIS documents in one pass.
+
+All statistics are computed while iterating the objects, events and agents
+once. Statistics computed separately, e.g. in worker processes, can be
+merged::
+
+    stats = Statistics()
+    stats.add_file('premis.xml')
+    stats.counts['event_type']['validation']
+
+    stats = aggregate_files(paths, max_workers=8)
+
+The following counters are collected:
+
+    * elements: Number of elements by type ('object', 'event', 'agent')
+    * event_type: Number of events by eventType
+    * event_outcome: Number of events by eventOutcome
+    * agent_type: Number of agents by agentType
+    * object_type: Number of objects by xsi:type
+    * identifier_type: Number of identifiers by (element type,
+      identifier type)
+    * format: Number of format designations in objects by (formatName,
+      formatVersion)
+
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from xml_helpers.utils import xsi_ns
+
+from premis.base import premis_ns
+from premis.parallel import chunks
+from premis.stream import ELEMENT_KINDS, iterparse_elements
+
+STATISTICS = ('elements', 'event_type', 'event_outcome', 'agent_type',
+              'object_type', 'identifier_type', 'format')
+
+_KINDS = {premis_ns(kind): kind for kind in ELEMENT_KINDS}
+_EVENT_OUTCOME = '/'.join([
+    premis_ns('eventOutcomeInformation'), premis_ns('eventOutcome')])
+_FORMAT_DESIGNATION = '/'.join([
+    premis_ns('objectCharacteristics'), premis_ns('format'),
+    premis_ns('formatDesignation')])
+
+
+class Statistics:
+    """Counters of PREMIS element properties.
+
+    :counts: Dictionary of collections.Counter objects by statistic name
+
+    """
+
+    def __init__(self):
+        self.counts = {name: Counter() for name in STATISTICS}
+
+    def __add__(self, other):
+        result = Statistics()
+        result.merge(self)
+        result.merge(other)
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, Statistics) and self.counts == other.counts
+
+    def merge(self, other):
+        """Add the counts of another Statistics object to this one.
+
+        :param other: Statistics object
+        :returns: self
+
+        """
+        for name, counter in other.counts.items():
+            self.counts[name].update(counter)
+        return self
+
+    def add_element(self, elem):
+        """Count a PREMIS object, event or agent.
+
+        Other elements are ignored.
+
+        :param elem: ElementTree element
+
+        """
+        kind = _KINDS.get(elem.tag)
+        if kind is None:
+            return
+        counts = self.counts
+        counts['elements'][kind] += 1
+        counts['identifier_type'][(kind, elem.findtext('/'.join([
+            premis_ns(kind + 'Identifier'),
+            premis_ns(kind + 'IdentifierType')])))] += 1
+
+        if kind == 'event':
+            counts['event_type'][elem.findtext(premis_ns('eventType'))] += 1
+            counts['event_outcome'][elem.findtext(_EVENT_OUTCOME)] += 1
+        elif kind == 'agent':
+            counts['agent_type'][elem.findtext(premis_ns('agentType'))] += 1
+        else:
+            counts['object_type'][elem.get(xsi_ns('type'))] += 1
+            for designation in elem.iterfind(_FORMAT_DESIGNATION):
+                counts['format'][(
+                    designation.findtext(premis_ns('formatName')),
+                    designation.findtext(premis_ns('formatVersion')))] += 1
+
+    def add_tree(self, premis_elem):
+        """Count all PREMIS objects, events and agents in a tree.
+
+        :param premis_elem: ElementTree element
+
+        """
+        for elem in premis_elem.iter(*_KINDS):
+            self.add_element(elem)
+
+    def add_file(self, source):
+        """Count all PREMIS objects, events and agents in a file without
+        parsing the whole file into memory.
+
+        :param source: Path or binary file object
+
+        """
+        for elem in iterparse_elements(source):
+            self.add_element(elem)
+
+    def as_dict(self):
+        """Return the counts as a dictionary of dictionaries."""
+        return {name: dict(counter) for name, counter in self.counts.items()}
+
+
+def _aggregate_chunk(paths):
+    """Return statistics of the files in `paths`."""
+    stats = Statistics()
+    for path in paths:
+        stats.add_file(path)
+    return stats
+
+
+def aggregate_files(paths, max_workers=None, chunksize=16, executor=None):
+    """Compute statistics of PREMIS files in a process pool.
+
+    Each worker computes the statistics of a chunk of files, and the
+    partial results are merged.
+
+    :param paths: Iterable of file paths
+    :param max_workers: Number of worker processes (default: CPU count)
+    :param chunksize: Number of files processed by a worker at a time
+    :param executor: Existing executor to use instead of a new process pool
+    :returns: Statistics object
+
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as pool:
+            return aggregate_files(paths, chunksize=chunksize, executor=pool)
+
+    stats = Statistics()
+    for partial in executor.map(_aggregate_chunk, chunks(paths, chunksize)):
+        stats.merge(partial)
+    return stats
@@ -0,0 +1,493 @@
+"""Functions for streaming access to PREMIS documents stored in files.
+
+The functions in this module work on the raw bytes of a PREMIS document
+instead of a parsed ElementTree. This makes it possible to locate PREMIS
+objects, events and agents in documents that are too large to be parsed
+into memory as a whole.
+
+The byte level scanner expects the document to be UTF-8 encoded.
+
+Located elements can be copied to new documents without parsing and
+serializing them again::
+
+    with PremisWriter('events.xml') as writer:
+        for fragment in iter_raw_fragments('premis.xml', kinds=['event']):
+            writer.write_fragment(fragment)
+
+"""
+
+import mmap
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from xml.sax.saxutils import quoteattr
+
+import lxml.etree as ET
+
+from premis.base import PREMIS_NS, premis
+
+ELEMENT_KINDS = ('object', 'event', 'agent')
+
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+
+# pylint: disable=c-extension-no-member
+
+Fragment = namedtuple('Fragment', ['kind', 'start', 'end', 'namespaces'])
+Fragment.__doc__ = """Location of a PREMIS element in a document.
+
+:kind: Local name of the element, e.g. 'event'
+:start: Byte offset of the start tag
+:end: Byte offset after the end tag
+:namespaces: Namespace declarations in scope for the element as a
+             dictionary of prefixes and namespace URIs
+"""
+
+RawFragment = namedtuple(
+    'RawFragment', ['kind', 'identifier', 'data', 'namespaces'])
+RawFragment.__doc__ = """Source bytes of a PREMIS element in a document.
+
+:kind: Local name of the element, e.g. 'event'
+:identifier: (identifier_type, identifier_value) or None
+:data: Bytes of the element as memoryview
+:namespaces: Namespace declarations in scope for the element
+"""
+
+_ATTRIBUTES = rb'(?:[^>"\']|"[^"]*"|\'[^\']*\')*?'
+
+_TOKEN_RE = re.compile(
+    rb'<!--.*?-->'
+    rb'|<!\[CDATA\[.*?\]\]>'
+    rb'|<\?.*?\?>'
+    rb'|<!DOCTYPE(?:[^>\[]|\[[^\]]*\])*>'
+    rb'|<(/?)([^\s/>!?]+)(' + _ATTRIBUTES + rb')(/?)>',
+    re.DOTALL)
+
+_START_TAG_RE = re.compile(
+    rb'\s*<[^\s/>]+(' + _ATTRIBUTES + rb')/?>', re.DOTALL)
+
+_DECLARATION_RE = re.compile(
+    rb'xmlns(?::([^\s=]+))?\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+_CLOSE_RE_CACHE = {}
+_IDENTIFIER_RE_CACHE = {}
+
+
+def _close_re(name):
+    """Return compiled regular expression for finding start and end tags
+    with given qualified `name`.
+    """
+    try:
+        return _CLOSE_RE_CACHE[name]
+    except KeyError:
+        pattern = re.compile(
+            rb'<!--.*?-->'
+            rb'|<!\[CDATA\[.*?\]\]>'
+            rb'|<(/?)' + re.escape(name) + rb'(?=[\s/>])' + _ATTRIBUTES +
+            rb'(/?)>',
+            re.DOTALL)
+        _CLOSE_RE_CACHE[name] = pattern
+        return pattern
+
+
+def _identifier_re(tag):
+    """Return compiled regular expression for finding the text of the
+    first element with local name `tag`.
+    """
+    try:
+        return _IDENTIFIER_RE_CACHE[tag]
+    except KeyError:
+        pattern = re.compile(
+            rb'<(?:[^\s/>:]+:)?' + tag.encode('utf-8') +
+            rb'\s*(?:/>|>([^<]*)<)')
+        _IDENTIFIER_RE_CACHE[tag] = pattern
+        return pattern
+
+
+def _unescape(raw):
+    """Return text content of an element from its raw bytes."""
+    if b'&' not in raw:
+        return raw.decode('utf-8')
+    return ET.fromstring(b'<text>' + raw + b'</text>').text
+
+
+def _end_position(buf, name, pos):
+    """Return byte offset after the end tag of element `name` whose start
+    tag ends at `pos`.
+    """
+    depth = 1
+    close_re = _close_re(name)
+    while True:
+        match = close_re.search(buf, pos)
+        if match is None:
+            raise ValueError(
+                "Unclosed element {} at offset {}".format(
+                    name.decode('utf-8'), pos))
+        pos = match.end()
+        if match.group(1) is None:
+            continue
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return pos
+        elif not match.group(2):
+            depth += 1
+
+
+def _declared_namespaces(attributes, namespaces):
+    """Return `namespaces` updated with the namespace declarations found
+    from `attributes` of a start tag.
+    """
+    if b'xmlns' not in attributes:
+        return namespaces
+    namespaces = dict(namespaces)
+    for match in _DECLARATION_RE.finditer(attributes):
+        prefix = match.group(1)
+        if prefix is not None:
+            prefix = prefix.decode('utf-8')
+        uri = match.group(2)
+        if uri is None:
+            uri = match.group(3)
+        namespaces[prefix] = _unescape(uri)
+    return namespaces
+
+
+def iter_tags(buf):
+    """Iterate the element tags of a document.
+
+    Comments, CDATA sections, processing instructions and the DOCTYPE
+    declaration are skipped, so tags written inside them are not reported.
+
+    :param buf: Document as bytes, memoryview or mmap
+    :returns: Generator object for iterating (start offset, end offset,
+              qualified name as bytes, kind) tuples, where kind is 'start',
+              'end' or 'empty'
+
+    """
+    for match in _TOKEN_RE.finditer(buf):
+        name = match.group(2)
+        if name is None:
+            continue
+        if match.group(1):
+            kind = 'end'
+        elif match.group(4):
+            kind = 'empty'
+        else:
+            kind = 'start'
+        yield match.start(), match.end(), name, kind
+
+
+def scan_fragments(buf, kinds=ELEMENT_KINDS, namespace=PREMIS_NS):
+    """Iterate the locations of PREMIS elements in a document.
+
+    Elements whose local name is listed in `kinds` are located from
+    anywhere in the document. Elements inside an already located element
+    are not reported separately.
+
+    :param buf: Document as bytes, memoryview or mmap
+    :param kinds: Local names of the elements to locate
+    :param namespace: Namespace of the elements to locate
+    :returns: Generator object for iterating Fragment tuples
+
+    """
+    kinds = frozenset(kinds)
+    stack = [{'xml': XML_NS}]
+    pos = 0
+    while True:
+        match = _TOKEN_RE.search(buf, pos)
+        if match is None:
+            return
+        pos = match.end()
+        name = match.group(2)
+        if name is None:
+            continue
+
+        if match.group(1):
+            if len(stack) > 1:
+                stack.pop()
+            continue
+
+        parent_namespaces = stack[-1]
+        namespaces = _declared_namespaces(
+            match.group(3), parent_namespaces)
+        prefix, _, local_name = name.rpartition(b':')
+        uri = namespaces.get(prefix.decode('utf-8') if prefix else None)
+        local_name = local_name.decode('utf-8')
+
+        if uri == namespace and local_name in kinds:
+            if not match.group(4):
+                pos = _end_position(buf, name, pos)
+            yield Fragment(
+                local_name, match.start(), pos, dict(parent_namespaces))
+        elif not match.group(4):
+            stack.append(namespaces)
+
+
+def iterparse_elements(source, kinds=ELEMENT_KINDS, namespace=PREMIS_NS):
+    """Iterate parsed PREMIS elements from a file without building the
+    whole tree.
+
+    Each element is detached from the document when it has been parsed, so
+    the memory use depends on the size of a single element rather than the
+    whole document. Elements nested inside an iterated element are not
+    iterated separately.
+
+    :param source: Path or binary file object
+    :param kinds: Local names of the elements to iterate
+    :param namespace: Namespace of the elements to iterate
+    :returns: Generator object for iterating ElementTree elements
+
+    """
+    tags = ['{%s}%s' % (namespace, kind) for kind in kinds]
+    depth = 0
+    for event, elem in ET.iterparse(source, events=('start', 'end'),
+                                    tag=tags, huge_tree=True):
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth:
+            continue
+
+        parent = elem.getparent()
+        if parent is not None:
+            # Drop the already processed siblings and the element itself
+            while elem.getprevious() is not None:
+                del parent[0]
+            parent.remove(elem)
+        elem.tail = None
+        yield elem
+
+
+def fragment_identifier(buf, fragment):
+    """Return identifier type and value of a located PREMIS element.
+
+    :param buf: Document the fragment was located from
+    :param fragment: Fragment tuple
+    :returns: (identifier_type, identifier_value) or None if the element
+              has no identifier
+
+    """
+    values = []
+    for tag in ('IdentifierType', 'IdentifierValue'):
+        match = _identifier_re(fragment.kind + tag).search(
+            buf, fragment.start, fragment.end)
+        if match is None:
+            return None
+        if match.group(1) is None:
+            values.append(None)
+        else:
+            values.append(_unescape(match.group(1)))
+    return tuple(values)
+
+
+def element_texts(buf, tag, start=0, end=None):
+    """Return texts of all elements with local name `tag` in a range of a
+    document.
+
+    Only elements with text content and no child elements are found.
+
+    :param buf: Document bytes
+    :param tag: Local name of the elements, e.g. 'linkingAgentIdentifierValue'
+    :param start: Byte offset to start from
+    :param end: Byte offset to stop at (default: end of the document)
+    :returns: List of texts, with None for empty elements
+
+    """
+    if end is None:
+        end = len(buf)
+    return [
+        None if match.group(1) is None else _unescape(match.group(1))
+        for match in _identifier_re(tag).finditer(buf, start, end)]
+
+
+def namespace_declarations(namespaces):
+    """Return namespace declarations as attributes for a start tag.
+
+    :param namespaces: Dictionary of prefixes and namespace URIs
+    :returns: Declarations as bytes, e.g. b'xmlns:premis="..."'
+
+    """
+    declarations = []
+    for prefix, uri in sorted(namespaces.items(),
+                              key=lambda item: item[0] or ''):
+        if prefix == 'xml':
+            continue
+        if prefix is None:
+            name = 'xmlns'
+        else:
+            name = 'xmlns:' + prefix
+        declarations.append(name + '=' + quoteattr(uri))
+    return ' '.join(declarations).encode('utf-8')
+
+
+def parse_fragment(data, namespaces=None):
+    """Parse the bytes of a located PREMIS element.
+
+    :param data: Bytes of the element
+    :param namespaces: Namespace declarations in scope for the element
+    :returns: ElementTree element
+
+    """
+    declarations = namespace_declarations(namespaces or {})
+    wrapper = ET.fromstring(
+        b'<fragment ' + declarations + b'>' + bytes(data) + b'</fragment>')
+    elem = wrapper[0]
+    wrapper.remove(elem)
+    elem.tail = None
+    return elem
+
+
+@contextmanager
+def mapped_file(path):
+    """Memory map a file for reading.
+
+    :param path: Path to the file
+    :returns: Context manager yielding the contents as mmap. Empty files
+              are returned as empty bytes.
+
+    """
+    with open(path, 'rb') as handle:
+        try:
+            buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be memory mapped
+            yield b''
+            return
+        try:
+            yield buf
+        finally:
+            buf.close()
+
+
+def iter_raw_fragments(path, kinds=ELEMENT_KINDS):
+    """Iterate the source bytes of PREMIS elements in a file.
+
+    The bytes are returned as memoryview slices of a memory mapped file
+    without copying them. A slice is released when the next fragment is
+    requested or the iteration ends; use bytes() to keep a copy of a
+    fragment.
+
+    :param path: Path to the PREMIS file
+    :param kinds: Local names of the elements to iterate
+    :returns: Generator object for iterating RawFragment tuples
+
+    """
+    with mapped_file(path) as buf, memoryview(buf) as view:
+        for fragment in scan_fragments(buf, kinds):
+            # Release the slice before the mapping is closed
+            with view[fragment.start:fragment.end] as data:
+                yield RawFragment(
+                    fragment.kind,
+                    fragment_identifier(buf, fragment),
+                    data,
+                    fragment.namespaces)
+
+
+def _split_root(root):
+    """Return serialized start and end tags of the root element."""
+    empty_root = ET.Element(root.tag, attrib=root.attrib, nsmap=root.nsmap)
+    empty_root.text = 'x'
+    data = ET.tostring(empty_root, encoding='UTF-8')
+    split = data.rindex(b'>x</') + 1
+    return data[:split], data[split + 1:]
+
+
+class PremisWriter:
+    """Write a PREMIS document element by element.
+
+    Elements are serialized and written to the target as they are given,
+    so the document is never held in memory as a whole::
+
+        with PremisWriter('premis.xml') as writer:
+            writer.write(event(...))
+
+    :param target: Path or binary file object to write to
+    :param root: Root element of the document. Its children are not
+                 written. Default is the root returned by premis().
+
+    """
+
+    def __init__(self, target, root=None):
+        if root is None:
+            root = premis()
+        self.target = target
+        self.namespaces = dict(root.nsmap)
+        self._head, self._tail = _split_root(root)
+        self._handle = None
+        self._close_handle = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        """Write the XML declaration and the root start tag."""
+        if hasattr(self.target, 'write'):
+            self._handle = self.target
+        else:
+            self._handle = open(self.target, 'wb')
+            self._close_handle = True
+        self._handle.write(b"<?xml version='1.0' encoding='UTF-8'?>\n")
+        self._handle.write(self._head)
+
+    def close(self):
+        """Write the root end tag and close the target if it was opened
+        by the writer.
+        """
+        if self._handle is None:
+            return
+        self._handle.write(self._tail)
+        if self._close_handle:
+            self._handle.close()
+        self._handle = None
+
+    def write(self, elem):
+        """Write an element to the document.
+
+        :param elem: ElementTree element or serialized element as bytes
+
+        """
+        if isinstance(elem, (bytes, bytearray, memoryview)):
+            self.write_raw(elem)
+        else:
+            self._handle.write(
+                ET.tostring(elem, encoding='UTF-8', with_tail=False))
+
+    def write_raw(self, data, namespaces=None):
+        """Write a serialized element to the document as such.
+
+        Namespace declarations the element relies on are added to its start
+        tag if they are not declared on the root element of the document.
+
+        :param data: Serialized element as bytes or memoryview
+        :param namespaces: Namespace declarations in scope for the element
+                           in its source document
+
+        """
+        missing = {
+            prefix: uri for prefix, uri in (namespaces or {}).items()
+            if prefix != 'xml' and self.namespaces.get(prefix) != uri}
+        if missing:
+            start_tag = _START_TAG_RE.match(data)
+            for prefix in _declared_namespaces(start_tag.group(1), {}):
+                missing.pop(prefix, None)
+        if not missing:
+            self._handle.write(data)
+            return
+
+        split = start_tag.start(1)
+        self._handle.write(data[:split])
+        self._handle.write(b' ' + namespace_declarations(missing))
+        self._handle.write(data[split:])
+
+    def write_fragment(self, fragment):
+        """Write a located element to the document without re-serializing
+        it.
+
+        :param fragment: RawFragment tuple
+
+        """
+        self.write_raw(fragment.data, fragment.namespaces)
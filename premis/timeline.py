@@ -0,0 +1,249 @@
+"""Time index of PREMIS events.
+
+The eventDateTime of each event is parsed once when the event is added.
+Added events are sorted by time once on the next query, so range queries
+are answered with binary search::
+
+    timeline = EventTimeline.from_file('premis.xml')
+    timeline.range('2020-01-01', '2021-01-01')
+    timeline.latest('object-001')
+    timeline.histogram()
+
+The events are stored as records returned by
+:func:`premis.event_base.parse_event_record`.
+
+"""
+
+import datetime
+import functools
+import re
+from bisect import bisect_left
+
+from xml_helpers.utils import decode_utf8
+
+from premis.event_base import parse_event_record
+from premis.stream import iterparse_elements
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+_TIMESTAMP_RE = re.compile(
+    r'\s*(?P<year>\d{4})'
+    r'(?:-(?P<month>\d{2})'
+    r'(?:-(?P<day>\d{2})'
+    r'(?:[Tt ](?P<hour>\d{2}):(?P<minute>\d{2})'
+    r'(?::(?P<second>\d{2})(?:[.,](?P<fraction>\d+))?)?)?)?)?'
+    r'\s*(?P<tz>[Zz]|[+-]\d{2}(?::?\d{2})?)?\s*$')
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(value):
+    """Parse an ISO 8601 date or datetime into an aware datetime in UTC.
+
+    Accepts years, dates and datetimes with or without seconds, fractions
+    of seconds and time zone. The date and time may be separated with a
+    space. Values without a time zone are assumed to be in UTC. Results are
+    cached, as the same timestamps tend to repeat in PREMIS documents.
+
+    :param value: Date or datetime string
+    :returns: datetime.datetime object in UTC
+    :raises ValueError: If the value cannot be parsed
+
+    """
+    match = _TIMESTAMP_RE.match(decode_utf8(value))
+    if match is None:
+        raise ValueError("Invalid datetime: {}".format(value))
+    fields = match.groupdict()
+
+    fraction = fields['fraction'] or '0'
+    timestamp = datetime.datetime(
+        int(fields['year']), int(fields['month'] or 1),
+        int(fields['day'] or 1), int(fields['hour'] or 0),
+        int(fields['minute'] or 0),
+        # Leap seconds are rounded down
+        min(int(fields['second'] or 0), 59),
+        int(fraction[:6].ljust(6, '0')),
+        tzinfo=datetime.timezone.utc)
+
+    offset = fields['tz']
+    if offset and offset not in 'Zz':
+        digits = offset[1:].replace(':', '')
+        delta = datetime.timedelta(
+            hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+        if offset[0] == '+':
+            timestamp -= delta
+        else:
+            timestamp += delta
+    return timestamp
+
+
+def _as_timestamp(value):
+    """Return datetime or string as an aware datetime in UTC."""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value.astimezone(datetime.timezone.utc)
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day,
+                                 tzinfo=datetime.timezone.utc)
+    return parse_timestamp(value)
+
+
+def _sort(keys, values):
+    """Sort a list of values by the parallel list of keys in place, keeping
+    the order of values with an equal key.
+    """
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    keys[:] = [keys[index] for index in order]
+    values[:] = [values[index] for index in order]
+
+
+class EventTimeline:
+    """Events sorted by eventDateTime.
+
+    Events whose eventDateTime cannot be parsed are not included in the
+    time queries. They are available in the `undated` attribute.
+
+    :param events: Iterable of event elements or event records
+
+    """
+
+    def __init__(self, events=()):
+        self._keys = []
+        self._records = []
+        self._objects = {}
+        self._unsorted = False
+        self.undated = []
+        self.extend(events)
+
+    @classmethod
+    def from_file(cls, source):
+        """Create a timeline of the events in a file without parsing the
+        whole file into memory.
+
+        :param source: Path or binary file object
+        :returns: EventTimeline object
+
+        """
+        return cls(parse_event_record(elem) for elem
+                   in iterparse_elements(source, ['event']))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        self._sort()
+        return iter(self._records)
+
+    def _sort(self):
+        """Sort the events added since the last query by time."""
+        if not self._unsorted:
+            return
+        _sort(self._keys, self._records)
+        for keys, records in self._objects.values():
+            _sort(keys, records)
+        self._unsorted = False
+
+    def add(self, event):
+        """Add an event to the timeline.
+
+        :param event: Event element or event record
+
+        """
+        record = event if isinstance(event, dict) else parse_event_record(
+            event)
+        try:
+            timestamp = parse_timestamp(record['datetime'])
+        except (TypeError, ValueError):
+            self.undated.append(record)
+            return
+
+        self._keys.append(timestamp)
+        self._records.append(record)
+        for (_, object_value, _) in record['linking_objects']:
+            keys, records = self._objects.setdefault(object_value, ([], []))
+            keys.append(timestamp)
+            records.append(record)
+        self._unsorted = True
+
+    def extend(self, events):
+        """Add events to the timeline.
+
+        :param events: Iterable of event elements or event records
+
+        """
+        for event in events:
+            self.add(event)
+
+    def range(self, start=None, end=None):
+        """Return events from `start` (inclusive) to `end` (exclusive).
+
+        :param start: Datetime string or datetime object, None for no limit
+        :param end: Datetime string or datetime object, None for no limit
+        :returns: List of event records sorted by time
+
+        """
+        self._sort()
+        low = 0 if start is None else bisect_left(
+            self._keys, _as_timestamp(start))
+        high = len(self._keys) if end is None else bisect_left(
+            self._keys, _as_timestamp(end))
+        return self._records[low:high]
+
+    def latest(self, object_value=None, before=None):
+        """Return the latest event, optionally of the events linked to an
+        object and before a point in time.
+
+        :param object_value: Linking object identifier value
+        :param before: Datetime string or datetime object (exclusive)
+        :returns: Event record or None if there is no such event
+
+        """
+        self._sort()
+        if object_value is None:
+            keys, records = self._keys, self._records
+        else:
+            keys, records = self._objects.get(object_value, ([], []))
+        index = len(keys) if before is None else bisect_left(
+            keys, _as_timestamp(before))
+        return records[index - 1] if index else None
+
+    def latest_per_object(self, before=None):
+        """Return the latest event of each linked object.
+
+        :param before: Datetime string or datetime object (exclusive)
+        :returns: Dictionary of event records by object identifier value
+
+        """
+        result = {}
+        for object_value in self._objects:
+            record = self.latest(object_value, before)
+            if record is not None:
+                result[object_value] = record
+        return result
+
+    def histogram(self, start=None, end=None):
+        """Return the number of events per day in UTC.
+
+        Days without events between the first and the last day are
+        included with zero count.
+
+        :param start: First day as date or string, None for the first event
+        :param end: Last day as date or string, None for the last event
+        :returns: List of (datetime.date, count) tuples sorted by day
+
+        """
+        self._sort()
+        if not self._keys:
+            return []
+        first = _as_timestamp(start) if start is not None else self._keys[0]
+        last = _as_timestamp(end) if end is not None else self._keys[-1]
+
+        day = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        low = bisect_left(self._keys, day)
+        result = []
+        while day <= last:
+            next_day = day + _ONE_DAY
+            high = bisect_left(self._keys, next_day)
+            result.append((day.date(), high - low))
+            day, low = next_day, high
+        return result
@@ -0,0 +1,341 @@
+"""Functions for generating PREMIS XML directly as bytes.
+
+The functions in this module take the same arguments as the corresponding
+functions in the base modules, but write the escaped XML into bytes without
+building an ElementTree. The output is equal to the serialized ElementTree
+after canonicalization. Use it for write-only workloads, e.g. with
+PremisWriter::
+
+    with PremisWriter('premis.xml') as writer:
+        writer.write(xmlbytes.event(
+            xmlbytes.identifier('local', 'event-001', 'event'), ...))
+
+Child elements can be given as bytes returned by this module or as
+ElementTree elements.
+
+The backend can also be selected per call or globally with
+:func:`builders`::
+
+    set_default_backend('bytes')
+    build = builders()
+    build.event(build.identifier('local', 'event-001', 'event'), ...)
+
+"""
+
+import re
+from types import SimpleNamespace
+
+import lxml.etree as ET
+from xml_helpers.utils import XSI_NS, decode_utf8
+
+from premis.base import PREMIS_NS, _identifier_fields, premis_ns
+from premis.object_base import _OBJECT_RANKS
+from premis.stream import Fragment, fragment_identifier
+
+BACKENDS = ('lxml', 'bytes')
+
+# pylint: disable=c-extension-no-member
+
+_PREMIS_DECLARATION = (' xmlns:premis="%s"' % PREMIS_NS).encode('utf-8')
+_XSI_DECLARATION = (' xmlns:xsi="%s"' % XSI_NS).encode('utf-8')
+
+_INVALID_CHARS_RE = re.compile(
+    '[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+_LOCAL_NAME_RE = re.compile(rb'\s*<(?:[^\s/>:]+:)?([^\s/>:]+)')
+
+_DEFAULT_BACKEND = {'name': 'lxml'}
+
+
+def _qname(tag, prefix=''):
+    """Return PREMIS tag with premis prefix as bytes.
+    eventType -> b'premis:eventType'
+    """
+    if prefix:
+        prefix = decode_utf8(prefix)
+        tag = prefix + tag[0].upper() + tag[1:]
+    return ('premis:' + tag).encode('utf-8')
+
+
+def _escape(text):
+    """Return escaped element text as bytes or None for None."""
+    if text is None:
+        return None
+    text = decode_utf8(text)
+    if _INVALID_CHARS_RE.search(text):
+        raise ValueError(
+            "All strings must be XML compatible: Unicode or ASCII, no NULL "
+            "bytes or control characters")
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace(
+        '>', '&gt;').replace('\r', '&#13;').encode('utf-8')
+
+
+def _text_element(tag, text):
+    """Return serialized element with escaped text."""
+    if text is None:
+        return b'<' + tag + b'/>'
+    return b'<' + tag + b'>' + text + b'</' + tag + b'>'
+
+
+def _embed(child):
+    """Return child element as bytes without the PREMIS namespace
+    declaration, which is inherited from the parent.
+    """
+    if isinstance(child, (bytes, bytearray, memoryview)):
+        child = bytes(child)
+    else:
+        child = ET.tostring(child, encoding='UTF-8', with_tail=False)
+    pos = child.find(_PREMIS_DECLARATION, 0, child.find(b'>'))
+    if pos != -1:
+        child = child[:pos] + child[pos + len(_PREMIS_DECLARATION):]
+    return child
+
+
+def _tag(child):
+    """Return namespaced tag of an element or a serialized element."""
+    if isinstance(child, (bytes, bytearray, memoryview)):
+        return premis_ns(
+            _LOCAL_NAME_RE.match(child).group(1).decode('utf-8'))
+    return child.tag
+
+
+def _linking_identifier(elem, kind):
+    """Return serialized linking identifier for an object or agent, given
+    as an element, a serialized element or an identifier tuple or record,
+    or a prebuilt linking identifier element.
+    """
+    prefix = 'linking' + kind.capitalize()
+    fields = _identifier_fields(elem)
+    if fields is not None:
+        return _identifier(fields[0], fields[1], prefix, fields[2], b'')
+    if not isinstance(elem, (bytes, bytearray, memoryview)) and \
+            elem.tag == premis_ns('Identifier', prefix):
+        return _embed(elem)
+    (identifier_type, identifier_value) = _identifier_values(elem, kind)
+    return _identifier(identifier_type, identifier_value, prefix, None, b'')
+
+
+def _object_rank(child):
+    """Return order number of an element or a serialized element in
+    premis:object schema.
+    """
+    tag = _tag(child)
+    try:
+        return _OBJECT_RANKS[tag]
+    except KeyError:
+        raise ValueError(
+            "{} is not a child of premis:object".format(tag)) from None
+
+
+def _identifier_values(elem, kind):
+    """Return identifier type and value of an element or a serialized
+    element.
+    """
+    if isinstance(elem, (bytes, bytearray, memoryview)):
+        return fragment_identifier(
+            elem, Fragment(kind, 0, len(elem), None)) or (None, None)
+    return (
+        elem.findtext('.//' + premis_ns(kind + 'IdentifierType')),
+        elem.findtext('.//' + premis_ns(kind + 'IdentifierValue')))
+
+
+def _identifier(identifier_type, identifier_value, prefix, role,
+                declaration):
+    """Return serialized identifier with or without namespace
+    declaration.
+    """
+    prefix = decode_utf8(prefix)
+    if prefix == 'relatedObject':
+        tag = _qname('Identification', prefix)
+    else:
+        tag = _qname('Identifier', prefix)
+
+    parts = [
+        b'<', tag, declaration, b'>',
+        _text_element(_qname('IdentifierType', prefix),
+                      _escape(identifier_type)),
+        _text_element(_qname('IdentifierValue', prefix),
+                      _escape(identifier_value))]
+    if 'linking' in prefix and role is not None:
+        parts.append(_text_element(_qname('Role', prefix), _escape(role)))
+    parts.extend([b'</', tag, b'>'])
+    return b''.join(parts)
+
+
+def identifier(identifier_type, identifier_value, prefix='object', role=None):
+    """Return serialized PREMIS identifier.
+
+    See :func:`premis.base.identifier`.
+
+    :returns: Bytes
+
+    """
+    return _identifier(identifier_type, identifier_value, prefix, role,
+                       _PREMIS_DECLARATION)
+
+
+# pylint: disable=redefined-outer-name
+def outcome(outcome, detail_note=None, detail_extension=None,
+            single_extension_element=False):
+    """Return serialized PREMIS event outcome.
+
+    See :func:`premis.event_base.outcome`.
+
+    :returns: Bytes
+
+    """
+    parts = [
+        b'<premis:eventOutcomeInformation', _PREMIS_DECLARATION, b'>',
+        _text_element(b'premis:eventOutcome', _escape(outcome))]
+
+    if detail_note or detail_extension:
+        parts.append(b'<premis:eventOutcomeDetail>')
+
+        if detail_note is not None:
+            parts.append(_text_element(
+                b'premis:eventOutcomeDetailNote', _escape(detail_note)))
+
+        if detail_extension:
+            if single_extension_element:
+                parts.append(b'<premis:eventOutcomeDetailExtension>')
+                parts.extend(
+                    _embed(extension) for extension in detail_extension)
+                parts.append(b'</premis:eventOutcomeDetailExtension>')
+            else:
+                for extension in detail_extension:
+                    parts.extend([
+                        b'<premis:eventOutcomeDetailExtension>',
+                        _embed(extension),
+                        b'</premis:eventOutcomeDetailExtension>'])
+
+        parts.append(b'</premis:eventOutcomeDetail>')
+
+    parts.append(b'</premis:eventOutcomeInformation>')
+    return b''.join(parts)
+
+
+# pylint: disable=too-many-arguments
+def event(event_id, event_type, event_date_time, event_detail,
+          child_elements=None, linking_objects=None, linking_agents=None):
+    """Return serialized PREMIS event.
+
+    See :func:`premis.event_base.event`.
+
+    :returns: Bytes
+
+    """
+    parts = [
+        b'<premis:event', _PREMIS_DECLARATION, b'>',
+        _embed(event_id),
+        _text_element(b'premis:eventType', _escape(event_type)),
+        _text_element(b'premis:eventDateTime', _escape(event_date_time)),
+        _text_element(b'premis:eventDetail', _escape(event_detail))]
+
+    if child_elements:
+        parts.extend(_embed(elem) for elem in child_elements)
+
+    if linking_agents:
+        parts.extend(
+            _linking_identifier(_agent, 'agent') for _agent in linking_agents)
+
+    if linking_objects:
+        parts.extend(
+            _linking_identifier(_object, 'object')
+            for _object in linking_objects)
+
+    parts.append(b'</premis:event>')
+    return b''.join(parts)
+
+
+def agent(agent_id, agent_name, agent_type, note=None):
+    """Return serialized PREMIS agent.
+
+    See :func:`premis.agent_base.agent`.
+
+    :returns: Bytes
+
+    """
+    parts = [
+        b'<premis:agent', _PREMIS_DECLARATION, b'>',
+        _embed(agent_id),
+        _text_element(b'premis:agentName', _escape(agent_name)),
+        _text_element(b'premis:agentType', _escape(agent_type))]
+    if note is not None:
+        parts.append(_text_element(b'premis:agentNote', _escape(note)))
+    parts.append(b'</premis:agent>')
+    return b''.join(parts)
+
+
+# pylint: disable=redefined-builtin
+def object(
+        object_id,
+        original_name=None,
+        child_elements=None,
+        representation=False,
+        bitstream=False):
+    """Return serialized PREMIS object.
+
+    See :func:`premis.object_base.object`.
+
+    :returns: Bytes
+
+    """
+    if representation:
+        object_type = b'premis:representation'
+    elif bitstream:
+        object_type = b'premis:bitstream'
+    else:
+        object_type = b'premis:file'
+
+    parts = [
+        b'<premis:object', _PREMIS_DECLARATION, _XSI_DECLARATION,
+        b' xsi:type="', object_type, b'">',
+        _embed(object_id)]
+
+    _object_elements = []
+    if original_name:
+        _object_elements.append(_text_element(
+            b'premis:originalName', _escape(original_name)))
+    if child_elements:
+        _object_elements.extend(child_elements)
+
+    _object_elements.sort(key=_object_rank)
+    parts.extend(_embed(elem) for elem in _object_elements)
+
+    parts.append(b'</premis:object>')
+    return b''.join(parts)
+
+
+def set_default_backend(backend):
+    """Set the backend returned by :func:`builders` by default.
+
+    :param backend: 'lxml' or 'bytes'
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend: {}".format(backend))
+    _DEFAULT_BACKEND['name'] = backend
+
+
+def builders(backend=None):
+    """Return the identifier, outcome, event, agent and object builders
+    of a backend.
+
+    :param backend: 'lxml' for builders returning ElementTree elements,
+                    'bytes' for builders returning serialized XML. Default
+                    is set with :func:`set_default_backend`.
+    :returns: Namespace object with the builder functions
+
+    """
+    if backend is None:
+        backend = _DEFAULT_BACKEND['name']
+    if backend == 'bytes':
+        return SimpleNamespace(identifier=identifier, outcome=outcome,
+                               event=event, agent=agent, object=object)
+    if backend == 'lxml':
+        # pylint: disable=import-outside-toplevel
+        from premis import agent_base, base, event_base, object_base
+        return SimpleNamespace(
+            identifier=base.identifier, outcome=event_base.outcome,
+            event=event_base.event, agent=agent_base.agent,
+            object=object_base.object)
+    raise ValueError("Unknown backend: {}".format(backend))
@@ -1,5 +1,7 @@
 """Test for the Premis agent class"""
 
+from pytest import raises
+
 import lxml.etree as ET
 import xml_helpers.utils as u
 import premis.base as p
@@ -89,3 +91,45 @@ def test_parse_note():
     agent = a.agent(p.identifier('a', 'b', 'agent'), 'nimi', 'tyyppi',
                     note='nootti')
     assert a.parse_note(agent) == 'nootti'
+
+
+def test_agent_registry():
+    """Test that AgentRegistry builds each agent once and links it to
+    events
+    """
+    registry = a.AgentRegistry()
+    key = registry.add('local', 'clamscan', 'clamscan', 'software')
+    assert registry.add('local', 'clamscan', 'other', 'software') == key
+    other = registry.add_element(
+        a.agent(p.identifier('local', 'person', 'agent'), 'Person',
+                'person'))
+    assert registry.add_element(
+        a.agent(p.identifier('local', 'person', 'agent'), 'Other',
+                'person')) == other
+    assert list(registry) == [('local', 'clamscan'), ('local', 'person')]
+    assert len(registry) == 2
+    assert key in registry
+    assert a.parse_name(registry.get(key)) == 'clamscan'
+
+    linking = registry.linking_identifier(key)
+    assert registry.linking_identifier(key) is linking
+    assert registry.linking_identifier(key, 'executing program') \
+        is not linking
+    assert linking.tag == p.premis_ns('linkingAgentIdentifier')
+    assert linking.findtext(p.premis_ns('linkingAgentIdentifierValue')) == \
+        'clamscan'
+    with raises(KeyError):
+        registry.linking_identifier(('local', 'missing'))
+
+    agents = registry.agents()
+    assert [a.parse_name(elem) for elem in agents] == ['clamscan', 'Person']
+    assert agents[0] is not registry.get(key)
+
+
+def test_parse_agent_record():
+    """Test parsing agent fields into a dictionary"""
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software', 'note')
+    assert a.parse_agent_record(agent) == {
+        'identifier_type': 'local', 'identifier_value': 'ag1',
+        'name': 'name', 'type': 'software', 'note': 'note'}
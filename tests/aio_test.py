@@ -0,0 +1,149 @@
+"""Test for the asyncio interface"""
+
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.agent_base as a
+import premis.object_base as o
+import premis.aio as aio
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _run(coroutine):
+    """Run coroutine in a new event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _premis_file(tmpdir, event_count=3):
+    """Write PREMIS document and return its path"""
+    obj = o.object(p.identifier('local', 'obj1'))
+    events = [e.event(p.identifier('local', 'ev%d' % number, 'event'),
+                      'tyyppi', '2012-12-12T12:12:12', 'detaili')
+              for number in range(event_count)]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'nimi', 'tyyppi')
+    path = tmpdir.join('premis.xml')
+    path.write_binary(ET.tostring(
+        p.premis(child_elements=[obj] + events + [agent])))
+    return str(path)
+
+
+def test_aiter_elements(tmpdir):
+    """Test iterating elements asynchronously"""
+    path = _premis_file(tmpdir)
+
+    async def collect(iterator):
+        """Return local names of the iterated elements"""
+        return [ET.QName(elem).localname async for elem in iterator]
+
+    assert _run(collect(aio.aiter_elements(path))) == [
+        'object', 'event', 'event', 'event', 'agent']
+    assert _run(collect(aio.aiter_events(path))) == ['event'] * 3
+    assert _run(collect(aio.aiter_objects(path))) == ['object']
+    assert _run(collect(aio.aiter_agents(path))) == ['agent']
+
+
+def test_aiter_backpressure(tmpdir):
+    """Test stopping iteration while the parser waits for the consumer"""
+    path = _premis_file(tmpdir, event_count=50)
+
+    async def first_events():
+        """Return the first two events"""
+        events = []
+        iterator = aio.aiter_events(path, queue_size=1)
+        async for event in iterator:
+            events.append(event)
+            if len(events) == 2:
+                break
+        await iterator.aclose()
+        return events
+
+    assert len(_run(first_events())) == 2
+
+
+def test_aiter_invalid_document():
+    """Test that parse errors are raised to the consumer"""
+    async def consume():
+        """Iterate an invalid document"""
+        async for _ in aio.aiter_events(io.BytesIO(b'<premis>')):
+            pass
+
+    with pytest.raises(ET.XMLSyntaxError):
+        _run(consume())
+
+
+def test_parse(tmpdir):
+    """Test parsing asynchronously"""
+    root = _run(aio.parse(_premis_file(tmpdir)))
+    assert e.event_count(root) == 3
+
+
+def test_validate(tmpdir):
+    """Test validating asynchronously against a local schema"""
+    schema = tmpdir.join('schema.xsd')
+    schema.write(
+        '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+        '<xs:element name="root" type="xs:string"/>'
+        '</xs:schema>')
+    assert _run(aio.validate(ET.fromstring('<root/>'), str(schema))) == []
+    errors = _run(aio.validate(ET.fromstring('<other/>'), str(schema)))
+    assert len(errors) == 1
+
+
+def test_async_writer():
+    """Test writing asynchronously"""
+    output = io.BytesIO()
+    events = [e.event(p.identifier('local', 'ev%d' % number, 'event'),
+                      'tyyppi', '2012-12-12T12:12:12', 'detaili')
+              for number in range(3)]
+
+    async def write():
+        """Write the events"""
+        async with aio.AsyncPremisWriter(output) as writer:
+            await writer.write(events[0])
+            await writer.write_many(events[1:])
+
+    _run(write())
+    assert e.event_count(ET.fromstring(output.getvalue())) == 3
+
+
+class _SlowOutput(io.BytesIO):
+    """Output whose writes let other threads run in between"""
+
+    def write(self, data):
+        time.sleep(0.001)
+        return super().write(data)
+
+
+def test_async_writer_concurrent_writes():
+    """Test that writes started concurrently are not interleaved"""
+    output = _SlowOutput()
+    events = [ET.tostring(e.event(
+        p.identifier('local', 'ev%d' % number, 'event'), 'tyyppi',
+        '2012-12-12T12:12:12', 'detaili')) for number in range(20)]
+
+    async def write():
+        """Write the events concurrently"""
+        async with aio.AsyncPremisWriter(output, executor=executor) as writer:
+            await asyncio.gather(*[
+                writer.write_raw(data, {'x': 'urn:x'})
+                for data in events])
+
+    with ThreadPoolExecutor(8) as executor:
+        _run(write())
+    root = ET.fromstring(output.getvalue())
+    assert [elem.findtext('.//' + p.premis_ns('eventIdentifierValue'))
+            for elem in root] == ['ev%d' % number for number in range(20)]
@@ -0,0 +1,170 @@
+"""Test for appending elements to PREMIS files"""
+
+import os
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+import premis.agent_base as a
+import premis.append as ap
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _event(event_id):
+    """Return PREMIS event with given identifier value"""
+    return e.event(p.identifier('local', event_id, 'event'), 'tyyppi',
+                   '2012-12-12T12:12:12', 'detaili')
+
+
+def _agent(agent_id):
+    """Return PREMIS agent with given identifier value"""
+    return a.agent(p.identifier('local', agent_id, 'agent'), 'nimi', 'tyyppi')
+
+
+def _write_premis(path):
+    """Write PREMIS document with an object, event and agent to `path`"""
+    obj = o.object(p.identifier('local', 'obj1'))
+    with open(path, 'wb') as handle:
+        handle.write(ET.tostring(p.premis(
+            child_elements=[obj, _event('ev1'), _agent('ag1')])))
+
+
+def _child_ids(path):
+    """Return identifier values of the root children in a PREMIS file"""
+    root = ET.parse(path).getroot()
+    return [p.parse_identifier_type_value(
+        p.parse_identifier(child, ET.QName(child).localname),
+        ET.QName(child).localname)[1] for child in root]
+
+
+def test_append_elements(tmpdir):
+    """Test that appended elements are placed in schema order"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path)
+
+    assert ap.append_elements(
+        path, [_agent('ag2'), _event('ev2'),
+               ET.tostring(_event('ev3'))]) == 3
+    assert _child_ids(path) == ['obj1', 'ev1', 'ev2', 'ev3', 'ag1', 'ag2']
+    assert not os.path.exists(path + ap.JOURNAL_SUFFIX)
+
+
+def test_append_without_preceding_elements(tmpdir):
+    """Test appending to a document with a default namespace"""
+    path = str(tmpdir.join('premis.xml'))
+    with open(path, 'wb') as handle:
+        handle.write(b'<premis xmlns="info:lc/xmlns/premis-v2">'
+                     b'<agent/></premis>\n')
+
+    ap.append_elements(path, [_event('ev1')])
+    root = ET.parse(path).getroot()
+    assert [ET.QName(child).localname for child in root] == [
+        'event', 'agent']
+
+
+@pytest.mark.parametrize('markup', [
+    b'<!-- </premis:event> -->',
+    b'<?note </premis:event>?>',
+    b'<premis:agent><premis:agentNote><![CDATA[</premis:event>]]>'
+    b'</premis:agentNote></premis:agent>'
+])
+def test_append_tags_in_markup(tmpdir, markup):
+    """Test that end tags in comments, processing instructions and CDATA
+    sections are not used as insertion points
+    """
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path)
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    data = data.replace(b'</premis:premis>', markup + b'</premis:premis>')
+    with open(path, 'wb') as handle:
+        handle.write(data + b'<!-- </premis:premis> -->')
+
+    ap.append_elements(path, [_event('ev2')])
+
+    root = ET.parse(path).getroot()
+    assert [ET.QName(child).localname for child in root
+            if isinstance(child.tag, str)][:3] == ['object', 'event', 'event']
+    assert [elem.text for elem in root.iter(
+        p.premis_ns('eventIdentifierValue'))] == ['ev1', 'ev2']
+
+
+def test_append_reads_only_tail(tmpdir, monkeypatch):
+    """Test that markup before the insertion point does not cause the whole
+    document to be tokenized
+    """
+    path = str(tmpdir.join('premis.xml'))
+    objects = b''.join(
+        b'<!-- <?pi?> --><![CDATA[ ]]>' +
+        ET.tostring(o.object(p.identifier('local', 'obj%d' % number)))
+        for number in range(100))
+    with open(path, 'wb') as handle:
+        handle.write(
+            b'<?xml version="1.0"?>\n<premis:premis xmlns:premis="'
+            + p.PREMIS_NS.encode('utf-8') + b'">' + objects +
+            b'<!-- agents --></premis:premis>')
+
+    def fail(buf):
+        """Fail if the document is tokenized"""
+        raise AssertionError("Document was tokenized")
+
+    monkeypatch.setattr(ap, '_scan_structure', fail)
+    ap.append_elements(path, [_event('ev1'), _agent('ag1')])
+    root = ET.parse(path).getroot()
+    assert [ET.QName(child).localname for child in root
+            if isinstance(child.tag, str)][-3:] == ['object', 'event', 'agent']
+
+
+def test_append_invalid_document(tmpdir):
+    """Test appending to a file without premis:premis root"""
+    path = str(tmpdir.join('premis.xml'))
+    with open(path, 'wb') as handle:
+        handle.write(b'<root/>')
+
+    with pytest.raises(ValueError):
+        ap.append_elements(path, [_event('ev1')])
+
+
+def test_premis_appender(tmpdir):
+    """Test batching appended elements"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path)
+
+    with ap.PremisAppender(path) as appender:
+        appender.extend([_event('ev2'), _event('ev3')])
+        assert len(appender) == 2
+        assert _child_ids(path) == ['obj1', 'ev1', 'ag1']
+    assert _child_ids(path) == ['obj1', 'ev1', 'ev2', 'ev3', 'ag1']
+
+    with pytest.raises(RuntimeError):
+        with ap.PremisAppender(path) as appender:
+            appender.append(_event('ev4'))
+            raise RuntimeError
+    assert len(_child_ids(path)) == 5
+
+
+def test_recover(tmpdir):
+    """Test restoring a file after an interrupted append"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path)
+    with open(path, 'rb') as handle:
+        original = handle.read()
+
+    # Simulate a crash after the journal was written
+    offset = original.index(b'<premis:agent')
+    # pylint: disable=protected-access
+    ap._write_journal(path, offset, original[offset:])
+    with open(path, 'r+b') as handle:
+        handle.seek(offset)
+        handle.write(b'<premis:event>')
+
+    assert ap.recover(path)
+    with open(path, 'rb') as handle:
+        assert handle.read() == original
+    assert not ap.recover(path)
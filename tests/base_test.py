@@ -15,6 +15,24 @@ def test_premis_ns():
     assert p.premis_ns('xxx') == '{info:lc/xmlns/premis-v2}xxx'
 
 
+def test_premis_ns_table():
+    """Test that precomputed names equal computed names"""
+    for (tag, prefix), name in p._QNAMES.items():
+        assert name == p._premis_ns(tag, prefix)
+    assert p.premis_ns('IdentifierValue', 'linkingAgent') == \
+        '{info:lc/xmlns/premis-v2}linkingAgentIdentifierValue'
+    assert p.premis_ns(b'yyy', b'xxx') == '{info:lc/xmlns/premis-v2}xxxYyy'
+    assert p.premis_ns(b'event') == '{info:lc/xmlns/premis-v2}event'
+
+
+def test_text():
+    """Test that str is returned as such and bytes are decoded"""
+    value = 'ä'
+    assert p._text(value) is value
+    assert p._text('ä'.encode('utf-8')) == 'ä'
+    assert p._text(None) is None
+
+
 def test_element():
     """Test PREMIS _element"""
     xml = """<premis:xxx xmlns:premis="info:lc/xmlns/premis-v2"/>"""
@@ -111,6 +129,53 @@ def test_premis():
     assert tree == tree_xml
 
 
+def test_compact_namespaces():
+    """Test moving namespace declarations to the root element"""
+    xml = ('<premis:premis xmlns:premis="info:lc/xmlns/premis-v2">'
+           '<premis:object xmlns:premis="info:lc/xmlns/premis-v2" '
+           'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+           'xsi:type="premis:file"><x:a xmlns:x="urn:x"/></premis:object>'
+           '<premis:object xmlns:xsi="http://www.w3.org/2001/XMLSchema-'
+           'instance" xsi:type="premis:file"><x:a xmlns:x="urn:x"/>'
+           '<y:b xmlns:y="urn:y1"/><y:b xmlns:y="urn:y2"/>'
+           '<c xmlns="urn:c"/></premis:object></premis:premis>')
+    root = ET.fromstring(xml)
+    assert p.compact_namespaces(root) is root
+    assert ET.tostring(root) == ET.tostring(ET.fromstring(
+        '<premis:premis xmlns:premis="info:lc/xmlns/premis-v2" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xmlns:x="urn:x"><premis:object xsi:type="premis:file"><x:a/>'
+        '</premis:object><premis:object xsi:type="premis:file"><x:a/>'
+        '<y:b xmlns:y="urn:y1"/><y:b xmlns:y="urn:y2"/>'
+        '<c xmlns="urn:c"/></premis:object></premis:premis>'))
+
+
+def test_compact_namespaces_declared_in_root():
+    """Test removing declarations already made in the root element"""
+    root = ET.fromstring(
+        '<p:premis xmlns:p="urn:p" xmlns:x="urn:x"><p:event xmlns:p="urn:p">'
+        '<p:b xmlns:x="urn:x"><x:a xmlns:x="urn:x"/></p:b></p:event>'
+        '<p:event/></p:premis>')
+    children = list(root)
+    p.compact_namespaces(root)
+    assert list(root) == children
+    assert ET.tostring(root) == (
+        b'<p:premis xmlns:p="urn:p" xmlns:x="urn:x"><p:event><p:b><x:a/>'
+        b'</p:b></p:event><p:event/></p:premis>')
+
+
+def test_premis_compact():
+    """Test compacting namespaces of the child elements of the root"""
+    extension = ET.Element('{urn:x}extension', nsmap={'x': 'urn:x'})
+    obj = o.object(p.identifier('a', 'b'))
+    obj.append(ET.fromstring('<x:a xmlns:x="urn:x"/>'))
+    obj.append(extension)
+    tree = ET.tostring(p.premis(child_elements=[obj], compact=True))
+    assert tree.count(b'xmlns:x=') == 1
+    assert tree.startswith(b'<premis:premis xmlns:premis=')
+    assert b'xmlns:x="urn:x"' in tree[:tree.index(b'>')]
+
+
 def test_iter_elements():
     """Test iter_elements"""
     obj1 = o.object(p.identifier('local', 'id01'), original_name='nimi1')
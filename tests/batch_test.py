@@ -0,0 +1,75 @@
+"""Test for parsing many PREMIS files concurrently"""
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+import premis.batch as b
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _premis_files(tmpdir, count):
+    """Write PREMIS files with `number` + 1 events and return the paths"""
+    paths = []
+    for number in range(count):
+        events = [e.event(p.identifier('local', 'ev%d' % index, 'event'),
+                          'tyyppi', '2012-12-12T12:12:12', 'detaili')
+                  for index in range(number + 1)]
+        obj = o.object(p.identifier('local', 'obj%d' % number))
+        path = tmpdir.join('premis%d.xml' % number)
+        path.write_binary(ET.tostring(
+            p.premis(child_elements=[obj] + events)))
+        paths.append(str(path))
+    return paths
+
+
+def test_count_elements():
+    """Test counting elements by type"""
+    obj = o.object(p.identifier('local', 'obj1'))
+    assert b.count_elements(p.premis(child_elements=[obj])) == {
+        'object': 1, 'event': 0, 'agent': 0}
+
+
+def test_parse_many(tmpdir):
+    """Test that results are yielded in the order of the paths"""
+    paths = _premis_files(tmpdir, 6)
+    results = list(b.parse_many(paths, max_workers=2, chunksize=2))
+    assert [path for path, _ in results] == paths
+    assert [e.event_count(root) for _, root in results] == [
+        1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parse_many_extract(tmpdir, executor):
+    """Test extracting results in completion order"""
+    paths = _premis_files(tmpdir, 4)
+    results = dict(b.parse_many(
+        iter(paths), extract=b.count_elements, executor=executor,
+        max_workers=2, ordered=False))
+    assert sorted(results) == sorted(paths)
+    assert [results[path]['event'] for path in paths] == [1, 2, 3, 4]
+
+    records = dict(b.parse_many(paths, extract=b.event_records,
+                                executor=executor))
+    assert records[paths[1]][1]['identifier_value'] == 'ev1'
+
+
+def test_parse_many_errors(tmpdir):
+    """Test errors in parsing"""
+    invalid = tmpdir.join('invalid.xml')
+    invalid.write('<premis>')
+    paths = _premis_files(tmpdir, 1) + [str(invalid)]
+
+    with pytest.raises(ET.XMLSyntaxError):
+        list(b.parse_many(paths))
+
+    results = list(b.parse_many(paths, return_exceptions=True))
+    assert isinstance(results[1][1], ET.XMLSyntaxError)
+
+    with pytest.raises(ValueError):
+        list(b.parse_many(paths, executor='process'))
@@ -0,0 +1,137 @@
+"""Test for the on-disk cache of PREMIS records"""
+
+import os
+import pickle
+import time
+
+import lxml.etree as ET
+import pytest
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+from premis.cache import DocumentCache, document_records
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _write(path, event_count=1):
+    """Write PREMIS file with an object, events and an agent"""
+    obj = o.object(p.identifier('local', 'obj1'))
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name', 'type')
+    events = [e.event(p.identifier('local', 'ev%d' % index, 'event'),
+                      'type', '2012-12-12T12:12:12', 'detail',
+                      linking_objects=[obj], linking_agents=[agent])
+              for index in range(event_count)]
+    path.write_binary(ET.tostring(
+        p.premis(child_elements=[obj] + events + [agent])))
+    return str(path)
+
+
+def test_document_records(tmpdir):
+    """Test extracting records of all elements"""
+    records = document_records(_write(tmpdir.join('premis.xml')))
+    assert [record['identifier_value'] for record in records['objects']] \
+        == ['obj1']
+    assert records['events'][0]['linking_objects'] == [
+        ('local', 'obj1', None)]
+    assert records['agents'][0]['name'] == 'name'
+
+
+def test_get(tmpdir):
+    """Test that unchanged files are read from the cache"""
+    path = _write(tmpdir.join('premis.xml'))
+    cache = DocumentCache(str(tmpdir.join('cache')))
+    records = cache.get(path)
+    assert cache.get(path) == records
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Changed size
+    _write(tmpdir.join('premis.xml'), 2)
+    assert len(cache.get(path)['events']) == 2
+    assert cache.misses == 2
+
+    # Changed modification time only
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.get(path)
+    assert cache.misses == 3
+
+    cache.invalidate(path)
+    assert cache.load(path) is None
+    cache.invalidate(path)
+
+
+def test_verify_hash(tmpdir):
+    """Test that changed content is detected with equal size and mtime"""
+    path = _write(tmpdir.join('premis.xml'))
+    stat = os.stat(path)
+    cache = DocumentCache(str(tmpdir.join('cache')), verify_hash=True)
+    cache.get(path)
+
+    with open(path, 'rb') as infile:
+        data = infile.read().replace(b'obj1', b'obj2')
+    with open(path, 'wb') as outfile:
+        outfile.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert DocumentCache(str(tmpdir.join('cache'))).load(path) is not None
+    assert cache.get(path)['objects'][0]['identifier_value'] == 'obj2'
+    assert cache.misses == 2
+
+
+def test_evict(tmpdir):
+    """Test removing entries by age and total size"""
+    paths = [_write(tmpdir.join('premis%d.xml' % index))
+             for index in range(3)]
+    directory = str(tmpdir.join('cache'))
+    cache = DocumentCache(directory)
+    for path in paths:
+        cache.get(path)
+    entries = sorted(os.listdir(directory))
+    size = os.path.getsize(os.path.join(directory, entries[0]))
+
+    # Make the entry of the first file the least recently used
+    now = time.time()
+    for index, path in enumerate(paths):
+        used = now - 100 + index
+        os.utime(cache._entry_path(path), (used, used))
+
+    with DocumentCache(directory, max_size=2 * size + 10) as limited:
+        pass
+    assert limited.load(paths[0]) is None
+    assert limited.load(paths[1]) is not None
+
+    # The entry of the second file was just used
+    assert DocumentCache(directory, max_age=50).evict() == 1
+    assert limited.load(paths[1]) is not None
+    assert limited.load(paths[2]) is None
+    assert DocumentCache(directory).evict() == 0
+
+    cache.clear()
+    assert os.listdir(directory) == []
+
+
+@pytest.mark.parametrize('records', [
+    b'garbage', b'\xff', b'[]', b'{"events": 1}', b'{"events": [1]}',
+    b'{"events": [{"linking_objects": [1]}]}', b'[' * 100000,
+    pickle.dumps({'events': []})
+])
+def test_corrupted_entry(tmpdir, records):
+    """Test that unreadable entries are treated as missing"""
+    path = _write(tmpdir.join('premis.xml'))
+    cache = DocumentCache(str(tmpdir.join('cache')))
+    cache.get(path)
+    entry_path = cache._entry_path(path)
+    with open(entry_path, 'rb') as entry:
+        header = entry.readline()
+    with open(entry_path, 'wb') as entry:
+        entry.write(header + records)
+    assert cache.load(path) is None
+    with open(entry_path, 'wb') as entry:
+        entry.write(records)
+    assert cache.load(path) is None
+    assert cache.get(path)['events']
@@ -0,0 +1,149 @@
+"""Test for converting PREMIS 2 documents to PREMIS 3"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+
+import premis.agent_base as a
+import premis.base as p
+import premis.convert as c
+import premis.event_base as e
+import premis.object_base as o
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+V3 = {'premis': c.PREMIS3_NS}
+
+
+def _object():
+    """Return object with an environment, a relationship and links"""
+    return o.object(
+        p.identifier('local', 'obj1'),
+        child_elements=[
+            o.environment('known', purposes=['render']),
+            o.relationship('structural', 'includes',
+                           [('local', 'obj2')]),
+            p.identifier('local', 'ev1', 'linkingEvent'),
+            p.identifier('local', 'ie1', 'linkingIntellectualEntity')])
+
+
+def _event():
+    """Return event with detail, outcome and linked objects"""
+    return e.event(
+        p.identifier('local', 'ev1', 'event'), 'validation',
+        '2012-12-12T12:12:12', 'File validation',
+        child_elements=[e.outcome('success')],
+        linking_objects=[('local', 'obj1', 'source')])
+
+
+def _premis():
+    """Return PREMIS 2 document as bytes"""
+    return ET.tostring(p.premis(child_elements=[
+        _object(), _event(),
+        a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                'software')]))
+
+
+def test_convert_event():
+    """Test that eventDetail is wrapped and namespaces converted"""
+    elem = c.convert_element(_event())
+
+    assert elem.tag == '{%s}event' % c.PREMIS3_NS
+    assert elem.nsmap['premis'] == c.PREMIS3_NS
+    assert p.PREMIS_NS not in ET.tostring(elem).decode('utf-8')
+    assert [ET.QName(child).localname for child in elem] == [
+        'eventIdentifier', 'eventType', 'eventDateTime',
+        'eventDetailInformation', 'eventOutcomeInformation',
+        'linkingObjectIdentifier']
+    assert elem.xpath(
+        'premis:eventDetailInformation/premis:eventDetail/text()',
+        namespaces=V3) == ['File validation']
+    assert elem.xpath(
+        'premis:linkingObjectIdentifier/premis:linkingObjectRole/text()',
+        namespaces=V3) == ['source']
+
+
+def test_convert_object():
+    """Test that object relationships, environments and intellectual
+    entity links are restructured
+    """
+    source = _object()
+    before = ET.tostring(source)
+    elem = c.convert_element(source)
+
+    assert ET.tostring(source) == before
+    assert elem.get(p.xsi_ns('type')) == 'premis:file'
+    assert [ET.QName(child).localname for child in elem] == [
+        'objectIdentifier', 'environmentExtension', 'relationship',
+        'relationship', 'linkingEventIdentifier']
+    assert elem.xpath(
+        'premis:relationship/premis:relatedObjectIdentifier/'
+        'premis:relatedObjectIdentifierValue/text()',
+        namespaces=V3) == ['obj2', 'ie1']
+    assert elem.xpath(
+        'premis:relationship[2]/premis:relationshipSubType/text()',
+        namespaces=V3) == ['is part of']
+    assert elem.xpath(
+        'premis:environmentExtension/v2:environment/'
+        'v2:environmentPurpose/text()',
+        namespaces={'premis': c.PREMIS3_NS,
+                    'v2': p.PREMIS_NS}) == ['render']
+
+
+def test_convert_root():
+    """Test that version and schema location of the root are converted"""
+    root = c.convert_element(ET.fromstring(_premis()))
+
+    assert root.get('version') == '3.0'
+    assert root.get(p.xsi_ns('schemaLocation')) == \
+        c.PREMIS3_SCHEMA_LOCATION
+    assert len(root) == 3
+
+
+def test_convert_foreign_prefix():
+    """Test that prefixes and xsi:type values are kept with other
+    prefixes for the PREMIS namespace
+    """
+    elem = ET.fromstring(
+        '<p2:object xmlns:p2="%s" xmlns:xsi="%s" xsi:type="p2:file">'
+        '<p2:objectIdentifier/><!-- comment --></p2:object>'
+        % (p.PREMIS_NS, p.XSI_NS))
+    elem = c.convert_element(elem)
+
+    assert elem.prefix == 'p2'
+    assert elem.nsmap['p2'] == c.PREMIS3_NS
+    assert elem[0].tag == '{%s}objectIdentifier' % c.PREMIS3_NS
+    assert isinstance(elem[1], ET._Comment)
+
+
+def test_convert_file():
+    """Test converting a file element by element"""
+    target = io.BytesIO()
+
+    assert c.convert_file(io.BytesIO(_premis()), target) == 3
+
+    root = ET.fromstring(target.getvalue())
+    assert root.tag == '{%s}premis' % c.PREMIS3_NS
+    assert root.get('version') == '3.0'
+    assert [ET.QName(child).localname for child in root] == [
+        'object', 'event', 'agent']
+    assert c.PREMIS3_NS in target.getvalue().decode('utf-8')
+    assert p.PREMIS_NS not in ET.tostring(root[1]).decode('utf-8')
+
+
+def test_convert_files(tmpdir):
+    """Test converting many files with an executor"""
+    pairs = []
+    for number in range(3):
+        source = tmpdir.join('source%d.xml' % number)
+        source.write_binary(_premis())
+        pairs.append((str(source), str(tmpdir.join('target%d.xml' % number))))
+
+    with ThreadPoolExecutor(2) as executor:
+        assert c.convert_files(pairs, executor=executor) == 9
+
+    for _, target in pairs:
+        assert len(ET.parse(target).getroot()) == 3
@@ -5,8 +5,10 @@ from pytest import raises
 import lxml.etree as ET
 import xml_helpers.utils as u
 
+import premis.agent_base as a
 import premis.base as p
 import premis.event_base as e
+import premis.object_base as o
 
 # using lxml.etree causes these, but importing c extensions is not a problem
 # for us
@@ -62,6 +64,75 @@ def test_event():
     assert u.compare_trees(event, ET.fromstring(xml))
 
 
+def test_event_with_linking_identifiers():
+    """Test that prebuilt linking identifiers are copied to events"""
+    linking_agent = p.identifier('local', 'agent1', 'linkingAgent',
+                                 'executing program')
+    agent = a.agent(p.identifier('local', 'agent2', 'agent'), 'name', 'type')
+    events = [e.event(p.identifier('local', 'ev%d' % i, 'event'), 'type',
+                      '2012-12-12T12:12:12', 'detail',
+                      linking_agents=[linking_agent, agent])
+              for i in range(2)]
+    for _event in events:
+        assert e.parse_event_record(_event)['linking_agents'] == [
+            ('local', 'agent1', 'executing program'),
+            ('local', 'agent2', None)]
+    assert linking_agent.getparent() is None
+
+
+def test_event_with_identifier_tuples():
+    """Test linking objects and agents given as tuples and records"""
+    _event = e.event(
+        p.identifier('local', 'ev1', 'event'), 'type', '2012-12-12T12:12:12',
+        'detail', linking_objects=[('local', 'obj1')],
+        linking_agents=[('local', 'agent1', 'implementer'),
+                        {'identifier_type': 'local',
+                         'identifier_value': 'agent2'}])
+    record = e.parse_event_record(_event)
+    assert record['linking_objects'] == [('local', 'obj1', None)]
+    assert record['linking_agents'] == [
+        ('local', 'agent1', 'implementer'), ('local', 'agent2', None)]
+
+
+def test_link_objects_and_agents():
+    """Test linking objects and agents to an existing event"""
+    _event = e.event(
+        p.identifier('local', 'ev1', 'event'), 'type', '2012-12-12T12:12:12',
+        'detail')
+    assert e.link_objects(
+        _event, [('local', 'obj%d' % i) for i in range(3)]) is _event
+    e.link_agents(_event, [('local', 'agent1')])
+    e.link_objects(_event, [o.object(p.identifier('local', 'obj3'))])
+    e.link_agents(_event, [p.identifier('local', 'agent2', 'linkingAgent')])
+
+    assert [elem.tag.split('}')[1] for elem in _event][3:] == [
+        'eventDetail', 'linkingAgentIdentifier',
+        'linkingAgentIdentifier'] + ['linkingObjectIdentifier'] * 4
+    record = e.parse_event_record(_event)
+    assert [value for _, value, _ in record['linking_agents']] == [
+        'agent1', 'agent2']
+    assert [value for _, value, _ in record['linking_objects']] == [
+        'obj0', 'obj1', 'obj2', 'obj3']
+
+    e.link_agents(_event, [])
+    assert len(e.parse_event_record(_event)['linking_agents']) == 2
+
+
+def test_add_to_event():
+    """Test adding elements to an existing event in schema order"""
+    _event = e.event(
+        p.identifier('local', 'ev1', 'event'), 'type', '2012-12-12T12:12:12',
+        'detail', linking_objects=[('local', 'obj1')])
+    e.add_to_event(_event, p.identifier('local', 'agent1', 'linkingAgent'))
+    assert e.add_to_event(_event, e.outcome('success')) is _event
+    assert [elem.tag.split('}')[1] for elem in _event] == [
+        'eventIdentifier', 'eventType', 'eventDateTime', 'eventDetail',
+        'eventOutcomeInformation', 'linkingAgentIdentifier',
+        'linkingObjectIdentifier']
+    with raises(ValueError):
+        e.add_to_event(_event, p.identifier('local', 'obj1'))
+
+
 def test_iter_events():
     """Test iter_events"""
     event1 = e.event(p.identifier('local', 'id1', 'event'), 'tyyppi1',
@@ -237,3 +308,24 @@ def test_parse_outcome_detail_extension():
     event = e.event(p.identifier('a', 'b', 'event'), 'tyyppi',
                     '2012-12-12T12:12:12', 'detaili', child_elements=[outcome])
     assert u.compare_trees(e.parse_outcome_detail_extension(event), tree)
+
+
+def test_parse_event_record():
+    """Test parse_event_record"""
+    outcome = e.outcome('success', detail_note='xxx')
+    event = e.event(
+        p.identifier('a', 'b', 'event'), 'tyyppi', '2012-12-12T12:12:12',
+        'detaili', child_elements=[
+            outcome,
+            p.identifier('c', 'd', 'linkingAgent', role='tester')],
+        linking_objects=[p.identifier('e', 'f')])
+    assert e.parse_event_record(event) == {
+        'identifier_type': 'a',
+        'identifier_value': 'b',
+        'type': 'tyyppi',
+        'datetime': '2012-12-12T12:12:12',
+        'detail': 'detaili',
+        'outcome': 'success',
+        'outcome_detail_note': 'xxx',
+        'linking_agents': [('c', 'd', 'tester')],
+        'linking_objects': [('e', 'f', None)]}
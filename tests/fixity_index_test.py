@@ -0,0 +1,110 @@
+"""Test for fixity digest index"""
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.fixity_index as f
+import premis.object_base as o
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _object(value, *fixities):
+    """Return object with fixities given as (digest, algorithm) tuples"""
+    return o.object(p.identifier('local', value), child_elements=[
+        o.object_characteristics(child_elements=[
+            o.fixity(digest, algorithm) for digest, algorithm in fixities])])
+
+
+def _premis():
+    """Return PREMIS tree with two objects sharing a digest"""
+    return p.premis(child_elements=[
+        _object('obj1', ('AB01', 'MD5'), ('ff', 'SHA-256')),
+        _object('obj2', ('ab01', 'md5')),
+        _object('obj3', ('cd02', 'MD5'))])
+
+
+def test_lookup():
+    """Test that digests are found regardless of case and hyphens"""
+    index = f.FixityIndex()
+    index.add_tree(_premis(), 'a.xml')
+
+    assert len(index) == 3
+    assert index.lookup('MD5', 'ab01') == [
+        ('a.xml', 'local', 'obj1'), ('a.xml', 'local', 'obj2')]
+    assert index.lookup('sha256', 'FF') == [('a.xml', 'local', 'obj1')]
+    assert index.lookup('MD5', 'ffff') == []
+
+
+def test_duplicates():
+    """Test duplicate clusters"""
+    index = f.FixityIndex()
+    index.add_tree(_premis(), 'a.xml')
+    # The same object twice is not a duplicate
+    index.add('MD5', 'cd02', 'local', 'obj3', 'a.xml')
+    index.add('SHA1', 'not hex', 'local', 'obj4')
+    index.add('SHA1', 'not hex', 'local', 'obj5')
+
+    assert dict(index.duplicates()) == {
+        ('MD5', 'ab01'): [('a.xml', 'local', 'obj1'),
+                          ('a.xml', 'local', 'obj2')],
+        ('SHA1', 'not hex'): [(None, 'local', 'obj4'),
+                              (None, 'local', 'obj5')]}
+
+
+def test_build_and_merge(tmpdir):
+    """Test building an index of files in parallel"""
+    paths = []
+    for name in ('a.xml', 'b.xml', 'c.xml'):
+        path = tmpdir.join(name)
+        path.write_binary(ET.tostring(_premis()))
+        paths.append(str(path))
+
+    with ThreadPoolExecutor(2) as executor:
+        index = f.build_index(paths, chunksize=2, executor=executor)
+
+    assert index.sources == paths
+    assert len(index.lookup('MD5', 'AB01')) == 6
+    assert len(index.lookup('MD5', 'cd02')) == 3
+
+    expected = f.FixityIndex()
+    for path in paths:
+        expected.add_file(path)
+    assert index == expected
+
+
+def test_save_load(tmpdir):
+    """Test saving and loading an index"""
+    index = f.FixityIndex()
+    index.add_tree(_premis(), 'a.xml')
+    path = str(tmpdir.join('fixity.index'))
+    index.save(path)
+
+    loaded = f.FixityIndex.load(path)
+    assert loaded == index
+    loaded.add('MD5', 'ab01', 'local', 'obj9', 'b.xml')
+    assert loaded.sources == ['a.xml', 'b.xml']
+    assert len(loaded.lookup('MD5', 'ab01')) == 3
+
+    tmpdir.join('old.index').write_binary(
+        b'{"version": 0, "sources": [], "entries": []}')
+    with pytest.raises(ValueError):
+        f.FixityIndex.load(str(tmpdir.join('old.index')))
+
+
+@pytest.mark.parametrize('data', [
+    b'garbage', b'[]', b'{"version": 2, "sources": [], "entries": [1]}',
+    pickle.dumps((1, [], {}))
+])
+def test_load_invalid(tmpdir, data):
+    """Test that files other than fixity indexes are rejected"""
+    path = tmpdir.join('invalid.index')
+    path.write_binary(data)
+    with pytest.raises(ValueError):
+        f.FixityIndex.load(str(path))
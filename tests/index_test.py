@@ -0,0 +1,97 @@
+"""Test for the PREMIS byte offset index"""
+
+import os
+
+import lxml.etree as ET
+import xml_helpers.utils as u
+
+import premis.base as p
+import premis.event_base as e
+import premis.agent_base as a
+import premis.index as i
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _write_premis(path, event_ids):
+    """Write PREMIS document with events and an agent to `path`"""
+    events = [e.event(p.identifier('local', event_id, 'event'), 'tyyppi',
+                      '2012-12-12T12:12:12', 'detaili')
+              for event_id in event_ids]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'nimi', 'tyyppi')
+    with open(path, 'wb') as handle:
+        handle.write(ET.tostring(p.premis(child_elements=events + [agent])))
+
+
+def test_load_element(tmpdir):
+    """Test loading single elements from a file"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path, ['ev1', 'ev2'])
+
+    event = i.load_element(path, 'ev2')
+    assert os.path.exists(path + '.idx')
+    assert e.parse_event_type(event) == 'tyyppi'
+    assert p.parse_identifier_type_value(
+        p.parse_identifier(event, 'event'), 'event') == ('local', 'ev2')
+
+    tree = ET.parse(path).getroot()
+    assert u.compare_trees(event, e.find_event_by_id(tree, 'ev2'))
+    assert i.load_element(path, 'ag1', kind='agent').tag == p.premis_ns(
+        'agent')
+    assert i.load_element(path, 'ag1', kind='event') is None
+    assert i.load_element(path, 'missing') is None
+
+
+def test_lookup(tmpdir):
+    """Test index entries"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path, ['ev1', 'ev2'])
+
+    with i.ElementIndex(path) as index:
+        [entry] = index.lookup('ev1')
+        assert entry.kind == 'event'
+        assert entry.identifier_type == 'local'
+        assert entry.namespaces['premis'] == p.PREMIS_NS
+        assert [entry.identifier_value for entry in index.entries()] == [
+            'ev1', 'ev2', 'ag1']
+        assert len(list(index.entries(kind='agent'))) == 1
+
+
+def test_rebuild_on_change(tmpdir):
+    """Test that the index is rebuilt when the file changes"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path, ['ev1'])
+
+    with i.ElementIndex(path) as index:
+        assert not index.refresh()
+        _write_premis(path, ['ev1', 'ev2', 'ev3'])
+        assert index.refresh()
+        assert index.load_element('ev3') is not None
+
+
+def test_verify_hash(tmpdir):
+    """Test that only touching the file does not rebuild the index when
+    hash verification is enabled
+    """
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path, ['ev1'])
+
+    with i.ElementIndex(path, verify_hash=True) as index:
+        os.utime(path, (0, 0))
+        assert not index.refresh()
+        _write_premis(path, ['ev2'])
+        os.utime(path, (0, 0))
+        assert index.refresh()
+        assert index.load_element('ev2') is not None
+
+
+def test_corrupted_index(tmpdir):
+    """Test that a corrupted index is rebuilt"""
+    path = str(tmpdir.join('premis.xml'))
+    _write_premis(path, ['ev1'])
+    with open(path + '.idx', 'wb') as handle:
+        handle.write(b'corrupted')
+
+    assert i.load_element(path, 'ev1') is not None
@@ -1,8 +1,49 @@
 """Test to see if premis can be imported and used directly."""
 
+import inspect
+import subprocess
+import sys
+
+import pytest
+
 import premis
+import premis.base
+import premis.object_base
+import premis.event_base
+import premis.agent_base
 
 
 def test_import():
     """Test import"""
     premis.outcome('success')
+
+
+def test_lazy_import():
+    """Test that importing the package does not import the submodules"""
+    statement = (
+        'import sys, premis\n'
+        'assert not [name for name in sys.modules\n'
+        '            if name.startswith("premis.")]\n'
+        'assert "lxml.etree" not in sys.modules\n'
+        'premis.identifier\n'
+        'assert "premis.base" in sys.modules\n'
+        'assert "premis.event_base" not in sys.modules\n')
+    subprocess.run([sys.executable, '-c', statement], check=True)
+
+
+def test_exports():
+    """Test that the public names of the base modules are available"""
+    for module in (premis.base, premis.object_base, premis.event_base,
+                   premis.agent_base):
+        for name, value in vars(module).items():
+            if not name.startswith('_') and (
+                    name == 'ET' or not inspect.ismodule(value)):
+                assert getattr(premis, name) is value
+    assert set(premis.__all__) <= set(dir(premis))
+
+
+def test_submodules():
+    """Test that submodules are imported on attribute access"""
+    assert premis.stream.PremisWriter
+    with pytest.raises(AttributeError):
+        premis.no_such_attribute  # pylint: disable=pointless-statement
@@ -0,0 +1,86 @@
+"""Test for referential integrity checks"""
+
+import io
+
+import lxml.etree as ET
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.integrity as i
+import premis.object_base as o
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _premis():
+    """Return PREMIS tree with a dangling reference of each kind"""
+    objects = [
+        o.object(p.identifier('local', 'obj1'), child_elements=[
+            o.environment(child_elements=[o.dependency(identifiers=[
+                p.identifier('local', 'obj2', 'dependency'),
+                p.identifier('local', 'missing-dep', 'dependency')])]),
+            o.relationship('structural', 'includes',
+                           [('local', 'obj2'), ('local', 'missing-obj')]),
+            p.identifier('local', 'ev1', 'linkingEvent')]),
+        o.object(p.identifier('local', 'obj2'), child_elements=[
+            p.identifier('local', 'missing-ev', 'linkingEvent')])]
+    events = [
+        e.event(p.identifier('local', 'ev1', 'event'), 'validation',
+                '2012-12-12T12:12:12', 'detail',
+                linking_agents=[('local', 'ag1'), ('local', 'missing-ag')],
+                linking_objects=[('local', 'obj1'),
+                                 ('other', 'obj2')])]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software')
+    return p.premis(child_elements=objects + events + [agent])
+
+
+EXPECTED = [
+    ('object', ('local', 'obj1'), 'dependencyIdentifier', 'object',
+     ('local', 'missing-dep')),
+    ('object', ('local', 'obj1'), 'relatedObjectIdentification', 'object',
+     ('local', 'missing-obj')),
+    ('object', ('local', 'obj2'), 'linkingEventIdentifier', 'event',
+     ('local', 'missing-ev')),
+    ('event', ('local', 'ev1'), 'linkingAgentIdentifier', 'agent',
+     ('local', 'missing-ag')),
+    ('event', ('local', 'ev1'), 'linkingObjectIdentifier', 'object',
+     ('other', 'obj2'))
+]
+
+
+def test_check_tree():
+    """Test that dangling references are reported in document order"""
+    assert [reference[:5] for reference in i.check_tree(_premis())] \
+        == EXPECTED
+    assert i.check_tree(p.premis(child_elements=[
+        o.object(p.identifier('local', 'obj1'))])) == []
+
+
+def test_check_file():
+    """Test checking a file in streaming mode"""
+    source = io.BytesIO(ET.tostring(_premis()))
+    references = i.check_file(source)
+
+    assert [reference[:5] for reference in references] == EXPECTED
+    assert references[0].source is source
+
+
+def test_checker_many_documents():
+    """Test that references between documents are resolved"""
+    root = _premis()
+    checker = i.IntegrityChecker()
+    checker.add_tree(root, 'first.xml')
+    checker.add_tree(p.premis(child_elements=[
+        o.object(p.identifier('local', 'missing-obj')),
+        a.agent(p.identifier('local', 'missing-ag', 'agent'), 'name',
+                'person')]), 'second.xml')
+
+    references = checker.dangling()
+
+    assert len(references) == 3
+    assert {reference.source for reference in references} == {'first.xml'}
+    assert ('local', 'missing-ag') in checker.identifiers['agent']
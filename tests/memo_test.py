@@ -0,0 +1,141 @@
+"""Test for memoizing parse function results"""
+
+import gc
+import threading
+
+import lxml.etree as ET
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+from premis.memo import ParseCache
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _object(name='text/plain'):
+    """Return object with format and fixity"""
+    return o.object(
+        p.identifier('local', 'obj1'), original_name='nimi',
+        child_elements=[o.object_characteristics(child_elements=[
+            o.fixity('abc'),
+            o.format(child_elements=[o.format_designation(name, '1.0')])])])
+
+
+def test_memoize():
+    """Test that results are cached only while the cache is active"""
+    obj = _object()
+    with ParseCache() as cache:
+        for _ in range(3):
+            assert o.parse_format(obj) == ('text/plain', '1.0')
+            assert o.parse_original_name(obj) == 'nimi'
+        assert (cache.hits, cache.misses) == (4, 2)
+        assert len(cache) == 1
+    assert len(cache) == 0
+
+    assert o.parse_format(obj) == ('text/plain', '1.0')
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_invalidate():
+    """Test that mutation helpers and invalidate() drop cached results"""
+    obj = _object()
+    _event = e.event(p.identifier('local', 'ev1', 'event'), 'type',
+                     '2012-12-12T12:12:12', 'detail',
+                     child_elements=[e.outcome('success')])
+    with ParseCache() as cache:
+        assert o.parse_fixity(obj) == ('MD5', 'abc')
+        assert e.parse_datetime(_event) == '2012-12-12T12:12:12'
+
+        fixity = obj.find('.//' + p.premis_ns('fixity'))
+        fixity.getparent().remove(fixity)
+        o.add_to_object(obj, o.fixity('def', 'SHA-1'))
+        assert o.parse_fixity(obj) == ('SHA-1', 'def')
+
+        _event.find(p.premis_ns('eventDateTime')).text = '2020-01-01'
+        cache.invalidate(_event.find(p.premis_ns('eventDateTime')))
+        assert e.parse_datetime(_event) == '2020-01-01'
+
+        e.link_objects(_event, [('local', 'obj1')])
+        assert len(cache) == 1
+        assert cache.hits == 0
+
+
+def test_lru_eviction():
+    """Test that the least recently used elements are evicted"""
+    objects = [_object(str(index)) for index in range(3)]
+    with ParseCache(maxsize=2) as cache:
+        o.parse_format(objects[0])
+        o.parse_format(objects[1])
+        o.parse_format(objects[0])
+        o.parse_format(objects[2])
+        assert len(cache) == 2
+        o.parse_format(objects[0])
+        assert cache.hits == 2
+        o.parse_format(objects[1])
+        assert cache.misses == 4
+
+
+class WeakElement(ET.ElementBase):
+    """Element class supporting weak references"""
+
+
+def test_weak_keys():
+    """Test that weakly referable elements are not kept alive"""
+    parser = ET.XMLParser()
+    parser.set_element_class_lookup(
+        ET.ElementDefaultClassLookup(element=WeakElement))
+    root = ET.fromstring(ET.tostring(p.premis(
+        child_elements=[_object()])), parser)
+
+    with ParseCache() as cache:
+        obj = root[0]
+        assert o.parse_format(obj) == ('text/plain', '1.0')
+        assert o.parse_format(obj) == ('text/plain', '1.0')
+        assert cache.hits == 1
+        del obj
+        gc.collect()
+        assert len(cache) == 0
+
+
+def test_nested_caches():
+    """Test that the innermost cache is used and all are invalidated"""
+    obj = _object()
+    with ParseCache() as outer:
+        o.parse_format(obj)
+        with ParseCache() as inner:
+            o.parse_format(obj)
+            o.add_to_object(obj, o.fixity('def'))
+            assert len(outer) == 0
+        o.parse_format(obj)
+    assert (outer.misses, inner.misses) == (2, 1)
+
+
+def test_cache_per_thread():
+    """Test that a cache is not used by other threads"""
+    obj = _object()
+    with ParseCache() as cache:
+        thread = threading.Thread(target=o.parse_format, args=(obj,))
+        thread.start()
+        thread.join()
+        assert (cache.hits, cache.misses) == (0, 0)
+        o.parse_format(obj)
+    assert cache.misses == 1
+
+
+def test_keyword_arguments():
+    """Test that decorated functions accept the element as a keyword
+    argument with and without an active cache
+    """
+    obj = _object()
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'nimi', 'tyyppi')
+    assert o.parse_original_name(premis_object=obj) == 'nimi'
+    assert a.parse_name(agent=agent) == 'nimi'
+    with ParseCache() as cache:
+        assert o.parse_original_name(premis_object=obj) == 'nimi'
+        assert o.parse_original_name(obj) == 'nimi'
+        assert o.parse_fixity(obj=obj) == o.parse_fixity(obj)
+    assert (cache.hits, cache.misses) == (2, 2)
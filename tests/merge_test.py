@@ -0,0 +1,92 @@
+"""Test for merging events of many PREMIS files in time order"""
+
+import io
+import json
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.merge as m
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _write(tmpdir, name, events):
+    """Write PREMIS file with events given as (id, datetime) pairs"""
+    path = tmpdir.join(name)
+    path.write_binary(ET.tostring(p.premis(child_elements=[
+        e.event(p.identifier('local', value, 'event'), 'type', date_time,
+                'detail')
+        for value, date_time in events])))
+    return str(path)
+
+
+@pytest.fixture
+def sources(tmpdir):
+    """PREMIS files with events in time order"""
+    return [
+        _write(tmpdir, 'a.xml', [('a1', '2012-01-01T00:00:00'),
+                                 ('a2', '2012-01-03T00:00:00+01:00'),
+                                 ('a3', '2012-01-05')]),
+        _write(tmpdir, 'b.xml', [('b1', '2012-01-02'),
+                                 ('b2', '2012-01-02T23:00:00')]),
+        _write(tmpdir, 'c.xml', []),
+        _write(tmpdir, 'd.xml', [('d1', '2012-01-05'), ('d2', '2012-01-06')])]
+
+
+EXPECTED = ['a1', 'b1', 'a2', 'b2', 'a3', 'd1', 'd2']
+
+
+def _ids(pairs):
+    """Return event identifier values of merged pairs"""
+    return [ET.fromstring(data).findtext(
+        './/' + p.premis_ns('eventIdentifierValue')) for _, data in pairs]
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'presorted': True},
+    {'presorted': True, 'fan_in': 2},
+    {'chunksize': 1},
+    {'chunksize': 2, 'fan_in': 2},
+])
+def test_merge_events(sources, kwargs):
+    """Test merging presorted and unsorted files with bounded fan-in"""
+    assert _ids(m.merge_events(sources, **kwargs)) == EXPECTED
+
+
+def test_merge_unsorted(tmpdir, sources):
+    """Test that unsorted files are sorted in chunks, but rejected when
+    given as presorted
+    """
+    unsorted = _write(tmpdir, 'u.xml', [('u1', '2012-01-04'),
+                                        ('u2', 'unknown'),
+                                        ('u3', '2011-12-31')])
+    assert _ids(m.merge_events(sources + [unsorted], chunksize=2)) == [
+        'u2', 'u3', 'a1', 'b1', 'a2', 'b2', 'u1', 'a3', 'd1', 'd2']
+    with pytest.raises(ValueError):
+        list(m.merge_events([unsorted], presorted=True))
+
+
+def test_write_merged(tmpdir, sources):
+    """Test writing merged events into a PREMIS document"""
+    target = str(tmpdir.join('merged.xml'))
+    assert m.write_merged(target, sources, presorted=True) == 7
+    root = ET.parse(target).getroot()
+    assert [elem.findtext('.//' + p.premis_ns('eventIdentifierValue'))
+            for elem in e.iter_events(root)] == EXPECTED
+
+
+def test_write_jsonl(tmpdir, sources):
+    """Test writing merged event records as JSON lines"""
+    output = io.StringIO()
+    assert m.write_jsonl(output, sources, chunksize=2) == 7
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['identifier_value'] for record in records] == EXPECTED
+
+    target = str(tmpdir.join('merged.jsonl'))
+    assert m.write_jsonl(target, iter(sources)) == 7
+    assert len(open(target).readlines()) == 7
@@ -134,6 +134,18 @@ def test_relationship_with_many_related_objects():
     assert u.compare_trees(rel, ET.fromstring(xml))
 
 
+def test_relationship_with_identifier_tuples():
+    """Test relationship with related objects given as tuples and
+    records
+    """
+    rel = o.relationship(
+        'a', 'b', [('c', 'd'), {'identifier_type': 'e',
+                                'identifier_value': 'f'}])
+    expected = o.relationship(
+        'a', 'b', [p.identifier('c', 'd'), p.identifier('e', 'f')])
+    assert u.compare_trees(rel, expected)
+
+
 @pytest.mark.parametrize(
     "related_object",
     (
@@ -327,6 +339,16 @@ def test_parse_fixity():
     assert o.parse_fixity(obj) == ('yyy', 'xxx')
 
 
+def test_parse_fixities():
+    """Test parse_fixities"""
+    oc = o.object_characteristics(child_elements=[
+        o.fixity('xxx', 'MD5'), o.fixity('zzz', 'SHA-256')])
+    obj = o.object(p.identifier('x', 'y', 'object'), child_elements=[oc])
+    assert o.parse_fixities(obj) == (('MD5', 'xxx'), ('SHA-256', 'zzz'))
+    assert o.parse_fixities(
+        o.object(p.identifier('x', 'y', 'object'))) == ()
+
+
 # pylint: disable=invalid-name
 def test_parse_format():
     """Test parse_format"""
@@ -499,3 +521,63 @@ def test_parse_relationship_subtype():
     """Test parse_relationship_subtype"""
     rel = o.relationship('a', 'b', [p.identifier('c', 'd')])
     assert o.parse_relationship_subtype(rel) == 'b'
+
+
+def test_add_to_object():
+    """Test adding elements to an existing object in schema order"""
+    obj = o.object(p.identifier('a', 'b'), original_name='nimi')
+    o.add_to_object(obj, p.identifier('local', 'ev1', 'linkingEvent'))
+    o.add_to_object(obj, o.fixity('abc'))
+    o.add_to_object(obj, o.relationship('a', 'b', [('c', 'd')]))
+    o.add_to_object(obj, o.environment(characteristic='known to work'))
+    o.add_to_object(obj, o.format(child_elements=[
+        o.format_designation('text/plain')]))
+    assert o.add_to_object(
+        obj, p.identifier('local', 'ev2', 'linkingEvent')) is obj
+
+    assert [elem.tag.split('}')[1] for elem in obj] == [
+        'objectIdentifier', 'objectCharacteristics', 'originalName',
+        'environment', 'relationship', 'linkingEventIdentifier',
+        'linkingEventIdentifier']
+    assert [elem.findtext(p.premis_ns('linkingEventIdentifierValue'))
+            for elem in obj[-2:]] == ['ev1', 'ev2']
+    assert [elem.tag.split('}')[1] for elem in obj[1]] == [
+        'compositionLevel', 'fixity', 'format']
+
+    obj2 = o.object(p.identifier('a', 'b'))
+    o.add_to_object(obj2, o.environment(characteristic='known to work'))
+    o.add_to_object(obj2, o.fixity('abc'))
+    assert [elem.tag.split('}')[1] for elem in obj2] == [
+        'objectIdentifier', 'objectCharacteristics', 'environment']
+    assert obj2[1].findtext(p.premis_ns('compositionLevel')) == '0'
+
+    with pytest.raises(ValueError):
+        o.add_to_object(obj, p.identifier('a', 'b', 'event'))
+    with pytest.raises(ValueError):
+        o.object(p.identifier('a', 'b'),
+                 child_elements=[p.identifier('a', 'b', 'event')])
+
+
+def test_parse_object_record():
+    """Test parsing object fields into a dictionary"""
+    obj = o.object(
+        p.identifier('local', 'obj1'), original_name='nimi',
+        child_elements=[
+            o.object_characteristics(child_elements=[
+                o.fixity('abc', 'SHA-1'),
+                o.format(child_elements=[
+                    o.format_designation('text/plain', '1.0')])]),
+            o.relationship('structural', 'includes', [('local', 'obj2')]),
+            p.identifier('local', 'ev1', 'linkingEvent')],
+        representation=True)
+    assert o.parse_object_record(obj) == {
+        'identifier_type': 'local',
+        'identifier_value': 'obj1',
+        'object_type': 'premis:representation',
+        'original_name': 'nimi',
+        'formats': [('text/plain', '1.0')],
+        'fixities': [('SHA-1', 'abc')],
+        'relationships': [('structural', 'includes', 'local', 'obj2')],
+        'linking_events': [('local', 'ev1')]}
+    assert o.parse_object_record(o.object(p.identifier('a', 'b')))[
+        'formats'] == []
@@ -0,0 +1,60 @@
+"""Test for parallel serialization of PREMIS elements"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+
+import premis.base as p
+import premis.event_base as e
+import premis.parallel as par
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def build_event(number):
+    """Return PREMIS event for a record"""
+    return e.event(p.identifier('local', 'ev%d' % number, 'event'), 'tyyppi',
+                   '2012-12-12T12:12:12', 'detaili')
+
+
+def test_chunks():
+    """Test splitting records into lists"""
+    assert list(par.chunks(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(par.chunks([], 2)) == []
+    assert par.pending_limit(3) == 6
+    assert par.pending_limit() >= 2
+
+
+def test_serialize_parallel():
+    """Test that elements are serialized in the order of the records"""
+    fragments = list(par.serialize_parallel(
+        build_event, range(25), max_workers=2, chunksize=4))
+    assert fragments == [
+        ET.tostring(build_event(number), encoding='UTF-8')
+        for number in range(25)]
+
+
+def test_serialize_parallel_executor():
+    """Test serialization with a given executor"""
+    with ThreadPoolExecutor(2) as executor:
+        fragments = list(par.serialize_parallel(
+            build_event, iter(range(5)), chunksize=2, executor=executor))
+    assert len(fragments) == 5
+
+
+def test_write_parallel():
+    """Test writing a PREMIS document"""
+    output = io.BytesIO()
+    assert par.write_parallel(
+        output, build_event, range(10), max_workers=2, chunksize=3) == 10
+
+    root = ET.fromstring(output.getvalue())
+    assert root.tag == p.premis_ns('premis')
+    assert e.event_count(root) == 10
+    assert [p.parse_identifier_type_value(
+        p.parse_identifier(event, 'event'), 'event')[1]
+            for event in e.iter_events(root)] == [
+                'ev%d' % number for number in range(10)]
@@ -0,0 +1,109 @@
+"""Test for streaming pipelines"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+
+import premis.base as p
+import premis.event_base as e
+import premis.pipeline as pl
+from premis.query import Query
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _events():
+    """Return four events with alternating outcomes"""
+    return [
+        e.event(p.identifier('local', 'ev%d' % number, 'event'),
+                'validation', '2012-12-12T12:12:12', 'detail',
+                child_elements=[e.outcome(
+                    'success' if number % 2 else 'failure')])
+        for number in range(4)]
+
+
+def _double(value):
+    """Return value multiplied by two"""
+    return value * 2
+
+
+def test_stages():
+    """Test library filters, predicates and maps as stages"""
+    pipeline = (
+        pl.Pipeline(_events())
+        .stage(e.events_with_outcome, 'failure')
+        .filter(Query('event', identifier='ev2').matches, name='ev2')
+        .map(e.parse_event_record))
+
+    records = pipeline.run(list)
+
+    assert [record['identifier_value'] for record in records] == ['ev2']
+    assert [(metrics.name, metrics.items) for metrics in pipeline.metrics] \
+        == [('source', 4), ('events_with_outcome', 2), ('ev2', 1),
+            ('parse_event_record', 1), ('list', 1)]
+    for metrics in pipeline.metrics:
+        assert metrics.seconds >= 0
+        assert set(metrics.as_dict()) == {
+            'name', 'items', 'seconds', 'throughput'}
+
+
+def test_parallel_map():
+    """Test that parallel maps keep the order of the items"""
+    pipeline = pl.Pipeline(range(100)).map(_double, workers=3, chunksize=7)
+    assert list(pipeline) == [value * 2 for value in range(100)]
+
+    with ThreadPoolExecutor(2) as executor:
+        pipeline = pl.Pipeline(range(10)).map(
+            _double, executor=executor, max_pending=1)
+        assert pipeline.run() == 10
+
+
+def test_process_map():
+    """Test map in a process pool"""
+    pipeline = pl.Pipeline(range(10)).map(
+        _double, workers=2, processes=True, chunksize=3)
+    assert pipeline.run(sum) == 90
+
+
+def test_backpressure():
+    """Test that a parallel map reads at most max_pending chunks ahead"""
+    consumed = []
+
+    def source():
+        for value in range(100):
+            consumed.append(value)
+            yield value
+
+    items = iter(pl.Pipeline(source()).map(
+        _double, workers=2, chunksize=5, max_pending=2))
+    next(items)
+    assert len(consumed) <= 15
+
+
+def test_batch():
+    """Test batching and flattening"""
+    pipeline = pl.Pipeline(range(7)).batch(3)
+    assert list(pipeline) == [[0, 1, 2], [3, 4, 5], [6]]
+
+    pipeline = pl.Pipeline(range(7)).batch(3).map(sum)
+    assert pipeline.run(list) == [3, 12, 6]
+    assert list(pl.Pipeline([[1], [2, 3]]).flatten()) == [1, 2, 3]
+
+
+def test_files_to_premis(tmpdir):
+    """Test reading elements from files and writing them to a document"""
+    source = tmpdir.join('premis.xml')
+    source.write_binary(ET.tostring(p.premis(child_elements=_events())))
+    target = io.BytesIO()
+
+    count = (
+        pl.Pipeline.from_files([str(source)] * 2, kinds=['event'])
+        .stage(e.events_with_outcome, 'success')
+        .run(pl.write_premis(target)))
+
+    assert count == 4
+    root = ET.fromstring(target.getvalue())
+    assert [e.parse_outcome(elem) for elem in root] == ['success'] * 4
@@ -0,0 +1,121 @@
+"""Test for compiled PREMIS queries"""
+
+import lxml.etree as ET
+import pytest
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+from premis.query import Query
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _premis():
+    """Return PREMIS document with objects, events and agents"""
+    obj1 = o.object(
+        p.identifier('local', 'obj1'),
+        child_elements=[o.object_characteristics(child_elements=[
+            o.format(child_elements=[
+                o.format_designation('text/plain', '1.0')])])])
+    obj2 = o.object(p.identifier('urn', 'obj2'), representation=True)
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software')
+    events = [
+        e.event(p.identifier('local', 'ev1', 'event'), 'validation',
+                '2012-12-12T12:12:12', 'detail1',
+                child_elements=[e.outcome('success')],
+                linking_objects=[obj1], linking_agents=[agent]),
+        e.event(p.identifier('local', 'ev2', 'event'), 'validation',
+                '2013-01-01T00:00:00+02:00', 'detail2',
+                child_elements=[e.outcome('failure')],
+                linking_objects=[obj2]),
+        e.event(p.identifier('local', 'ev3', 'event'), 'migration',
+                '2014-06-01', 'detail1',
+                child_elements=[e.outcome('success')])]
+    return p.premis(child_elements=[obj1, obj2] + events + [agent])
+
+
+def _ids(elements, kind='event'):
+    """Return identifier values of elements"""
+    return [elem.findtext('.//' + p.premis_ns(kind + 'IdentifierValue'))
+            for elem in elements]
+
+
+@pytest.mark.parametrize(('filters', 'expected'), [
+    ({}, ['ev1', 'ev2', 'ev3']),
+    ({'type': 'validation'}, ['ev1', 'ev2']),
+    ({'type': 'validation', 'detail': 'detail1'}, ['ev1']),
+    ({'outcome': 'success'}, ['ev1', 'ev3']),
+    ({'after': '2012-12-31T22:00:00'}, ['ev2', 'ev3']),
+    ({'after': '2012-12-31T23:00:00+01:00'}, ['ev2', 'ev3']),
+    ({'before': '2012-12-31T22:00:00Z'}, ['ev1']),
+    ({'after': '2012-12-31', 'before': '2014-06-01'}, ['ev2']),
+    ({'linking_object': 'obj2'}, ['ev2']),
+    ({'linking_object': ('local', 'obj2')}, []),
+    ({'linking_agent': ('local', 'ag1'), 'outcome': 'success'}, ['ev1']),
+    ({'identifier': 'ev3', 'type': 'validation'}, []),
+])
+def test_event_query(filters, expected):
+    """Test filtering events"""
+    assert _ids(Query('event', **filters).findall(_premis())) == expected
+
+
+def test_datetime_formats():
+    """Test that datetimes without seconds or with a space separator are
+    compared, and invalid values never match
+    """
+    root = p.premis(child_elements=[
+        e.event(p.identifier('local', 'ev%d' % number, 'event'), 'type',
+                date_time, 'detail')
+        for number, date_time in enumerate([
+            '2020-06-01T10:00', '2020-06-01 10:00:00', '2020-06-01T10:00Z',
+            '2020-06-01T10:00:00.5', '2020-06', 'unknown'])])
+    assert _ids(Query('event', after='2020-01-01').findall(root)) == [
+        'ev0', 'ev1', 'ev2', 'ev3', 'ev4']
+    assert _ids(Query('event', after='2020-06-01 10:00',
+                      before='2020-06-01T10:00:00.5').findall(root)) == [
+                          'ev0', 'ev1', 'ev2']
+    assert _ids(Query('event', before='2020').findall(root)) == []
+    with pytest.raises(ValueError):
+        Query('event', after='01.06.2020')
+
+
+def test_object_and_agent_query():
+    """Test filtering objects and agents"""
+    root = _premis()
+    assert _ids(Query('object', format_name='text/plain').findall(root),
+                'object') == ['obj1']
+    assert _ids(Query('object', type='premis:representation').findall(
+        root), 'object') == ['obj2']
+    assert _ids(Query('agent', type='software', name='name').findall(root),
+                'agent') == ['ag1']
+    assert Query('agent', type='hardware').findall(root) == []
+
+
+def test_matches_and_filter():
+    """Test testing single elements and filtering iterables"""
+    query = Query('event', outcome='success')
+    events = list(e.iter_events(_premis()))
+    assert [query.matches(elem) for elem in events] == [True, False, True]
+    assert _ids(query.filter(events)) == ['ev1', 'ev3']
+    assert not query.matches(o.object(p.identifier('local', 'obj1')))
+
+
+def test_iterfile(tmpdir):
+    """Test filtering elements streamed from a file"""
+    path = tmpdir.join('premis.xml')
+    path.write_binary(ET.tostring(_premis()))
+    query = Query('event', type='validation', before='2013-01-01')
+    assert _ids(query.iterfile(str(path))) == ['ev1', 'ev2']
+
+
+def test_invalid_query():
+    """Test that unknown element types and filters raise ValueError"""
+    with pytest.raises(ValueError):
+        Query('rights')
+    with pytest.raises(ValueError):
+        Query('agent', outcome='success')
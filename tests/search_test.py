@@ -0,0 +1,96 @@
+"""Test for full-text index of PREMIS files"""
+
+import os
+
+import lxml.etree as ET
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.search as s
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _write_premis(path, note):
+    """Write PREMIS document with two events and an agent"""
+    events = [
+        e.event(p.identifier('local', 'ev1', 'event'), 'validation',
+                '2012-12-12T12:12:12', 'File format validation',
+                child_elements=[e.outcome('failure', note)]),
+        e.event(p.identifier('local', 'ev2', 'event'), 'message digest '
+                'calculation', '2012-12-12T12:12:12', 'Checksum calculation',
+                child_elements=[e.outcome('success')])]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'),
+                    'JHOVE validator', 'software', note='Version 1.20')
+    path.write_binary(ET.tostring(
+        p.premis(child_elements=events + [agent])))
+
+
+def test_tokenize():
+    """Test splitting texts into words"""
+    assert s.tokenize('Checksum MISMATCH: file.txt, näyte') == [
+        'checksum', 'mismatch', 'file', 'txt', 'näyte']
+    assert s.tokenize(None) == []
+
+
+def test_search(tmpdir):
+    """Test searching words, prefixes, fields and kinds"""
+    first = tmpdir.join('first.xml')
+    second = tmpdir.join('second.xml')
+    _write_premis(first, 'Checksum mismatch in file.txt')
+    _write_premis(second, 'Invalid header')
+
+    with s.SearchIndex(str(tmpdir.join('search.db'))) as index:
+        assert index.update([str(first), str(second)]) == [
+            str(first), str(second)]
+
+        assert index.search('MISMATCH checksum') == [
+            s.SearchHit(str(first), 'event', 'local', 'ev1')]
+        assert [hit.identifier_value for hit in index.search('checksum')] \
+            == ['ev1', 'ev2', 'ev2']
+        assert index.search('checksum', fields=['outcome_detail_note']) \
+            == [s.SearchHit(str(first), 'event', 'local', 'ev1')]
+        assert [hit.path for hit in index.search('valid*', kind='event')] \
+            == [str(first), str(second)]
+        assert [hit.kind for hit in index.search('jhove 1.20')] == [
+            'agent', 'agent']
+        assert index.search('file.txt') == [
+            s.SearchHit(str(first), 'event', 'local', 'ev1')]
+        assert index.search('missing') == []
+        assert index.search('checksum mismatch missing') == []
+        assert index.search('checksum', limit=2) == [
+            s.SearchHit(str(first), 'event', 'local', 'ev1'),
+            s.SearchHit(str(first), 'event', 'local', 'ev2')]
+        assert index.search('valid*', kind='agent', limit=1) == [
+            s.SearchHit(str(first), 'agent', 'local', 'ag1')]
+        assert index.search(' ') == []
+
+
+def test_incremental_update(tmpdir):
+    """Test that only changed files are indexed again"""
+    first = tmpdir.join('first.xml')
+    second = tmpdir.join('second.xml')
+    _write_premis(first, 'Checksum mismatch')
+    _write_premis(second, 'Invalid header')
+    index_path = str(tmpdir.join('search.db'))
+
+    with s.SearchIndex(index_path) as index:
+        index.update([str(first), str(second)])
+
+    _write_premis(first, 'Truncated file')
+    stat = os.stat(str(first))
+    os.utime(str(first), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with s.SearchIndex(index_path) as index:
+        assert index.update([str(first), str(second)]) == [str(first)]
+        assert index.search('mismatch') == []
+        assert len(index.search('truncated')) == 1
+
+        second.remove()
+        assert index.prune() == [str(second)]
+        assert index.paths() == [str(first)]
+        assert index.search('header') == []
+        assert not index.remove(str(second))
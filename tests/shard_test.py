@@ -0,0 +1,133 @@
+"""Test for splitting PREMIS documents into shards"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+import pytest
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.integrity as i
+import premis.object_base as o
+import premis.shard as s
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _write_premis(path):
+    """Write PREMIS document with two objects, four events and an agent"""
+    objects = [
+        o.object(p.identifier('local', 'obj1')),
+        o.object(p.identifier('local', 'obj2'), child_elements=[
+            o.relationship('structural', 'is part of',
+                           [('local', 'obj1')])])]
+    events = [
+        e.event(p.identifier('local', 'ev%d' % number, 'event'),
+                'validation', '2012-12-12T12:12:12', 'detail',
+                linking_agents=[('local', 'ag1')],
+                linking_objects=[('local', 'obj%d' % (number % 2 + 1))])
+        for number in range(4)]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software')
+    path.write_binary(ET.tostring(
+        p.premis(child_elements=objects + events + [agent])))
+
+
+def _identifiers(path):
+    """Return identifier values of the elements of a document"""
+    return [elem[0][1].text for elem in ET.parse(path).getroot()]
+
+
+def test_shard_by_elements(tmpdir):
+    """Test that shards are bounded and contain the referred elements"""
+    source = tmpdir.join('premis.xml')
+    _write_premis(source)
+    target = str(tmpdir.join('shard-{:02d}.xml'))
+
+    with ThreadPoolExecutor(2) as executor:
+        shards = s.shard_file(str(source), target, max_elements=3,
+                              executor=executor)
+
+    assert [(shard.elements, shard.duplicates) for shard in shards] == [
+        (3, 1), (3, 3), (1, 0)]
+    assert shards[0].path == str(tmpdir.join('shard-00.xml'))
+    # Objects, events and agents are in schema order
+    assert _identifiers(shards[0].path) == ['obj1', 'obj2', 'ev0', 'ag1']
+    assert _identifiers(shards[1].path) == [
+        'obj2', 'obj1', 'ev1', 'ev2', 'ev3', 'ag1']
+    assert _identifiers(shards[2].path) == ['ag1']
+
+
+def test_shard_package_event(tmpdir):
+    """Test that events linked to the objects of a shard are not copied, so
+    an event linking every object does not end up in every shard
+    """
+    objects = [
+        o.object(p.identifier('local', 'obj%d' % number), child_elements=[
+            p.identifier('local', 'ev-package', 'linkingEvent'),
+            p.identifier('local', 'ev%d' % number, 'linkingEvent')])
+        for number in range(20)]
+    events = [e.event(
+        p.identifier('local', 'ev-package', 'event'), 'ingestion',
+        '2012-12-12T12:12:12', 'detail', linking_agents=[('local', 'ag1')],
+        linking_objects=[('local', 'obj%d' % number)
+                         for number in range(20)])]
+    events.extend(
+        e.event(p.identifier('local', 'ev%d' % number, 'event'),
+                'validation', '2012-12-12T12:12:12', 'detail',
+                linking_agents=[('local', 'ag1')],
+                linking_objects=[('local', 'obj%d' % number)])
+        for number in range(20))
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software')
+    source = tmpdir.join('premis.xml')
+    source.write_binary(ET.tostring(
+        p.premis(child_elements=objects + events + [agent])))
+
+    with ThreadPoolExecutor(2) as executor:
+        shards = s.shard_file(str(source), str(tmpdir.join('shard-{}.xml')),
+                              max_elements=5, executor=executor)
+
+    assert len(shards) == 9
+    package_shard = shards[4]
+    assert 'ev-package' in _identifiers(package_shard.path)
+    # All objects and the agent
+    assert package_shard.duplicates == 21
+    for shard in shards:
+        identifiers = _identifiers(shard.path)
+        assert identifiers.count('ev-package') == (shard is package_shard)
+        if shard is not package_shard:
+            # At most the object and the agent of each event are copied
+            assert shard.duplicates <= 6
+            assert shard.size < source.size() / 3
+        # Only the links from objects to events may point to other shards
+        assert {reference.link for reference in i.check_file(shard.path)} \
+            <= {'linkingEventIdentifier'}
+
+
+def test_shard_by_bytes(tmpdir):
+    """Test that shards are bounded by size"""
+    source = tmpdir.join('premis.xml')
+    _write_premis(source)
+    target = str(tmpdir.join('shard-{}.xml'))
+
+    with ThreadPoolExecutor(1) as executor:
+        shards = s.shard_file(str(source), target, max_bytes=2500,
+                              executor=executor)
+
+    assert len(shards) > 1
+    for shard in shards:
+        assert shard.size <= 2500
+        assert shard.size < os.path.getsize(shard.path)
+        assert ET.parse(shard.path).getroot().tag == p.premis_ns('premis')
+    assert sum(shard.elements for shard in shards) == 7
+
+
+def test_shard_limits(tmpdir):
+    """Test that a limit is required"""
+    with pytest.raises(ValueError):
+        s.shard_file(str(tmpdir.join('premis.xml')), 'shard-{}.xml')
@@ -0,0 +1,91 @@
+"""Test for computing statistics of PREMIS documents"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree as ET
+
+import premis.agent_base as a
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+import premis.stats as s
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _premis():
+    """Return PREMIS document with objects, events and agents"""
+    obj = o.object(
+        p.identifier('local', 'obj1'),
+        child_elements=[o.object_characteristics(child_elements=[
+            o.format(child_elements=[
+                o.format_designation('text/plain', '1.0')])])])
+    rep = o.object(p.identifier('urn', 'rep1'), representation=True)
+    events = [
+        e.event(p.identifier('local', 'ev1', 'event'), 'validation',
+                '2012-12-12T12:12:12', 'detail',
+                child_elements=[e.outcome('success')]),
+        e.event(p.identifier('local', 'ev2', 'event'), 'validation',
+                '2012-12-12T12:12:12', 'detail',
+                child_elements=[e.outcome('failure')]),
+        e.event(p.identifier('local', 'ev3', 'event'), 'migration',
+                '2012-12-12T12:12:12', 'detail')]
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'name',
+                    'software')
+    return p.premis(child_elements=[obj, rep] + events + [agent])
+
+
+def test_add_tree():
+    """Test counting the properties of all elements in a tree"""
+    stats = s.Statistics()
+    stats.add_tree(_premis())
+    counts = stats.counts
+    assert counts['elements'] == {'object': 2, 'event': 3, 'agent': 1}
+    assert counts['event_type'] == {'validation': 2, 'migration': 1}
+    assert counts['event_outcome'] == {
+        'success': 1, 'failure': 1, None: 1}
+    assert counts['agent_type'] == {'software': 1}
+    assert counts['object_type'] == {
+        'premis:file': 1, 'premis:representation': 1}
+    assert counts['identifier_type'] == {
+        ('object', 'local'): 1, ('object', 'urn'): 1, ('event', 'local'): 3,
+        ('agent', 'local'): 1}
+    assert counts['format'] == {('text/plain', '1.0'): 1}
+
+
+def test_add_file_and_merge(tmpdir):
+    """Test that streaming a file gives the same statistics as a tree and
+    that partial statistics can be merged
+    """
+    path = tmpdir.join('premis.xml')
+    path.write_binary(ET.tostring(_premis()))
+
+    from_tree = s.Statistics()
+    from_tree.add_tree(_premis())
+    from_file = s.Statistics()
+    from_file.add_file(str(path))
+    assert from_file == from_tree
+
+    total = from_file + from_tree
+    assert total.counts['elements']['event'] == 6
+    assert from_file.counts['elements']['event'] == 3
+    assert from_file.merge(from_tree) == total
+    assert total.as_dict()['event_type'] == {'validation': 4, 'migration': 2}
+
+
+def test_aggregate_files(tmpdir):
+    """Test aggregating statistics of many files"""
+    paths = []
+    for number in range(5):
+        path = tmpdir.join('premis%d.xml' % number)
+        path.write_binary(ET.tostring(_premis()))
+        paths.append(str(path))
+
+    stats = s.aggregate_files(paths, max_workers=2, chunksize=2)
+    assert stats.counts['elements'] == {
+        'object': 10, 'event': 15, 'agent': 5}
+
+    with ThreadPoolExecutor(2) as executor:
+        assert s.aggregate_files(iter(paths), executor=executor) == stats
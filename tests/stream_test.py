@@ -0,0 +1,191 @@
+"""Test for the PREMIS streaming functions"""
+
+import io
+import mmap
+
+import lxml.etree as ET
+import pytest
+import xml_helpers.utils as u
+
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+import premis.agent_base as a
+import premis.stream as s
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _premis_document():
+    """Return serialized PREMIS document with an object, event and agent"""
+    obj = o.object(p.identifier('local', 'obj&1'), original_name='nimi')
+    event = e.event(p.identifier('local', 'ev1', 'event'), 'tyyppi',
+                    '2012-12-12T12:12:12', 'detaili',
+                    child_elements=[e.outcome('success')])
+    agent = a.agent(p.identifier('local', 'ag1', 'agent'), 'nimi', 'tyyppi')
+    return ET.tostring(p.premis(child_elements=[obj, event, agent]))
+
+
+def test_scan_fragments():
+    """Test that objects, events and agents are located from a document"""
+    document = _premis_document()
+    fragments = list(s.scan_fragments(document))
+    assert [fragment.kind for fragment in fragments] == [
+        'object', 'event', 'agent']
+    for fragment in fragments:
+        assert fragment.namespaces['premis'] == p.PREMIS_NS
+
+    tree = ET.fromstring(document)
+    for fragment, elem in zip(fragments, tree):
+        parsed = s.parse_fragment(
+            document[fragment.start:fragment.end], fragment.namespaces)
+        assert parsed.getparent() is None
+        assert u.compare_trees(parsed, elem)
+
+
+def test_scan_fragments_nested():
+    """Test scanning elements nested in other XML with custom prefixes,
+    comments and CDATA sections
+    """
+    document = (
+        b'<?xml version="1.0"?>'
+        b'<!-- <p:event> -->'
+        b'<mets xmlns:p="info:lc/xmlns/premis-v2" attr=\'a>b\'><wrap>'
+        b'<p:event><p:eventIdentifier>'
+        b'<p:eventIdentifierType/>'
+        b'<p:eventIdentifierValue>ev1</p:eventIdentifierValue>'
+        b'</p:eventIdentifier>'
+        b'<p:eventOutcomeDetailExtension><p:event/>'
+        b'<![CDATA[</p:event>]]></p:eventOutcomeDetailExtension>'
+        b'</p:event>'
+        b'<p:agent xmlns:p="info:lc/xmlns/premis-v2"/>'
+        b'<other:agent xmlns:other="urn:other"/>'
+        b'</wrap></mets>')
+    fragments = list(s.scan_fragments(document))
+    assert [fragment.kind for fragment in fragments] == ['event', 'agent']
+    assert document[fragments[0].start:fragments[0].end].endswith(
+        b'</p:eventOutcomeDetailExtension></p:event>')
+    assert s.fragment_identifier(document, fragments[0]) == (None, 'ev1')
+    assert s.fragment_identifier(document, fragments[1]) is None
+
+
+def test_fragment_identifier():
+    """Test reading identifiers of located elements"""
+    document = _premis_document()
+    identifiers = [s.fragment_identifier(document, fragment)
+                   for fragment in s.scan_fragments(document)]
+    assert identifiers == [
+        ('local', 'obj&1'), ('local', 'ev1'), ('local', 'ag1')]
+
+
+def test_element_texts():
+    """Test reading texts of all elements with a local name"""
+    document = _premis_document()
+    fragment = next(s.scan_fragments(document, kinds=['object']))
+    assert s.element_texts(document, 'objectIdentifierValue') == ['obj&1']
+    assert s.element_texts(
+        document, 'eventIdentifierValue', fragment.start, fragment.end) == []
+
+
+def test_mapped_file(tmpdir):
+    """Test memory mapping of files"""
+    path = tmpdir.join('premis.xml')
+    path.write_binary(_premis_document())
+    with s.mapped_file(str(path)) as buf:
+        assert len(list(s.scan_fragments(buf))) == 3
+
+    empty = tmpdir.join('empty.xml')
+    empty.write_binary(b'')
+    with s.mapped_file(str(empty)) as buf:
+        assert buf == b''
+
+
+def test_iter_raw_fragments(tmpdir):
+    """Test iterating source bytes of elements"""
+    document = _premis_document()
+    path = tmpdir.join('premis.xml')
+    path.write_binary(document)
+
+    fragments = [
+        (fragment.kind, fragment.identifier, bytes(fragment.data))
+        for fragment in s.iter_raw_fragments(str(path))]
+    assert [fragment[:2] for fragment in fragments] == [
+        ('object', ('local', 'obj&1')),
+        ('event', ('local', 'ev1')),
+        ('agent', ('local', 'ag1'))]
+    for fragment in fragments:
+        assert fragment[2] in document
+
+    events = list(s.iter_raw_fragments(str(path), kinds=['event']))
+    assert [fragment.kind for fragment in events] == ['event']
+    # Slices are released when the iteration continues
+    with pytest.raises(ValueError):
+        bytes(events[0].data)
+
+
+def test_iter_raw_fragments_closes_mapping(tmpdir, monkeypatch):
+    """Test that the memory mapping is closed after the iteration"""
+    closed = []
+
+    class RecordingMap(mmap.mmap):
+        """Memory mapping recording successful closing"""
+
+        def close(self):
+            super().close()
+            closed.append(True)
+
+    monkeypatch.setattr(mmap, 'mmap', RecordingMap)
+    path = tmpdir.join('premis.xml')
+    path.write_binary(_premis_document())
+
+    assert len(list(s.iter_raw_fragments(str(path)))) == 3
+    assert closed == [True]
+
+    fragments = s.iter_raw_fragments(str(path))
+    next(fragments)
+    fragments.close()
+    assert closed == [True, True]
+
+
+def test_premis_writer(tmpdir):
+    """Test writing elements and raw fragments"""
+    source = tmpdir.join('source.xml')
+    source.write_binary(
+        b'<mets xmlns:p="info:lc/xmlns/premis-v2" xmlns:q="urn:q">'
+        b'<p:agent q:attr="1"><p:agentName>nimi</p:agentName></p:agent>'
+        b'</mets>')
+    target = tmpdir.join('target.xml')
+
+    event = e.event(p.identifier('local', 'ev1', 'event'), 'tyyppi',
+                    '2012-12-12T12:12:12', 'detaili')
+    with s.PremisWriter(str(target)) as writer:
+        writer.write(event)
+        for fragment in s.iter_raw_fragments(str(source)):
+            writer.write_fragment(fragment)
+
+    root = ET.parse(str(target)).getroot()
+    assert u.compare_trees(root[0], event)
+    assert a.parse_name(root[1]) == 'nimi'
+    assert root[1].get('{urn:q}attr') == '1'
+    assert root.get('version') == '2.2'
+    assert len(root) == 2
+
+
+def test_iterparse_elements():
+    """Test iterating parsed elements from a file object"""
+    document = io.BytesIO(
+        b'<mets xmlns:p="info:lc/xmlns/premis-v2"><other/>'
+        b'<p:event><p:eventType>tyyppi</p:eventType>'
+        b'<p:eventOutcomeDetailExtension><p:event/>'
+        b'</p:eventOutcomeDetailExtension></p:event>\n'
+        b'<p:agent><p:agentName>nimi</p:agentName></p:agent></mets>')
+    elements = list(s.iterparse_elements(document))
+    assert [ET.QName(elem).localname for elem in elements] == [
+        'event', 'agent']
+    assert e.parse_event_type(elements[0]) == 'tyyppi'
+    assert a.parse_name(elements[1]) == 'nimi'
+    for elem in elements:
+        assert elem.getparent() is None
+        assert elem.tail is None
@@ -0,0 +1,117 @@
+"""Test for the time index of PREMIS events"""
+
+import datetime
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+from premis.timeline import EventTimeline, parse_timestamp
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize(('value', 'expected'), [
+    ('2012-12-12T12:12:12', datetime.datetime(2012, 12, 12, 12, 12, 12)),
+    ('2012-12-12T12:12:12Z', datetime.datetime(2012, 12, 12, 12, 12, 12)),
+    ('2012-12-12T12:12:12+02:00', datetime.datetime(2012, 12, 12, 10, 12, 12)),
+    ('2012-12-12 12:12-0130', datetime.datetime(2012, 12, 12, 13, 42)),
+    ('2012-12-12T12:12:12.5', datetime.datetime(
+        2012, 12, 12, 12, 12, 12, 500000)),
+    ('2012-12-12', datetime.datetime(2012, 12, 12)),
+    ('2012', datetime.datetime(2012, 1, 1)),
+])
+def test_parse_timestamp(value, expected):
+    """Test parsing ISO 8601 variants into datetimes in UTC"""
+    assert parse_timestamp(value) == expected.replace(tzinfo=UTC)
+
+
+@pytest.mark.parametrize('value', ['', 'OPEN', '12.12.2012'])
+def test_parse_invalid_timestamp(value):
+    """Test that invalid values raise ValueError"""
+    with pytest.raises(ValueError):
+        parse_timestamp(value)
+
+
+def _events():
+    """Return events linked to objects, not in time order"""
+    obj1 = o.object(p.identifier('local', 'obj1'))
+    obj2 = o.object(p.identifier('local', 'obj2'))
+    values = [
+        ('ev1', '2012-12-13T01:00:00+02:00', [obj1]),
+        ('ev2', '2012-12-12T12:00:00', [obj1, obj2]),
+        ('ev3', '2012-12-15T00:00:00', [obj2]),
+        ('ev4', 'unknown', [obj1]),
+        ('ev5', '2012-12-12', [])]
+    return [e.event(p.identifier('local', value, 'event'), 'type',
+                    date_time, 'detail', linking_objects=objects)
+            for value, date_time, objects in values]
+
+
+def _ids(records):
+    """Return identifier values of event records"""
+    return [record['identifier_value'] for record in records]
+
+
+def test_range():
+    """Test that events are sorted by time and queried by range"""
+    timeline = EventTimeline(_events())
+    assert len(timeline) == 4
+    assert _ids(timeline) == ['ev5', 'ev2', 'ev1', 'ev3']
+    assert _ids(timeline.undated) == ['ev4']
+    assert _ids(timeline.range('2012-12-12T12:00:00', '2012-12-15')) == [
+        'ev2', 'ev1']
+    assert _ids(timeline.range(start=datetime.date(2012, 12, 13))) == ['ev3']
+    assert _ids(timeline.range(end=datetime.datetime(2012, 12, 12, 12))) == [
+        'ev5']
+
+
+def test_add_after_query():
+    """Test that events added after a query are sorted on the next query
+    and events with equal times stay in the order they were added
+    """
+    events = _events()
+    timeline = EventTimeline(events[:2])
+    assert _ids(timeline) == ['ev2', 'ev1']
+    for event in events[2:]:
+        timeline.add(event)
+    timeline.add(e.event(p.identifier('local', 'ev6', 'event'), 'type',
+                         '2012-12-12T12:00:00Z', 'detail'))
+    assert _ids(timeline.range()) == ['ev5', 'ev2', 'ev6', 'ev1', 'ev3']
+    assert timeline.latest('obj2')['identifier_value'] == 'ev3'
+
+
+def test_latest():
+    """Test finding the latest events of objects"""
+    timeline = EventTimeline(_events())
+    assert timeline.latest()['identifier_value'] == 'ev3'
+    assert timeline.latest('obj1')['identifier_value'] == 'ev1'
+    assert timeline.latest('obj1', before='2012-12-12T23:00')[
+        'identifier_value'] == 'ev2'
+    assert timeline.latest('obj1', before='2012-12-12T12:00') is None
+    assert timeline.latest('obj3') is None
+    assert {key: value['identifier_value'] for key, value
+            in timeline.latest_per_object().items()} == {
+                'obj1': 'ev1', 'obj2': 'ev3'}
+    assert list(timeline.latest_per_object(before='2012-12-01')) == []
+
+
+def test_histogram(tmpdir):
+    """Test counting events per day in a timeline read from a file"""
+    path = tmpdir.join('premis.xml')
+    path.write_binary(ET.tostring(p.premis(child_elements=_events())))
+    timeline = EventTimeline.from_file(str(path))
+
+    day = datetime.date(2012, 12, 12)
+    assert timeline.histogram() == [
+        (day, 3), (day + datetime.timedelta(1), 0),
+        (day + datetime.timedelta(2), 0), (day + datetime.timedelta(3), 1)]
+    assert timeline.histogram('2012-12-14', '2012-12-15T23:59') == [
+        (day + datetime.timedelta(2), 0), (day + datetime.timedelta(3), 1)]
+    assert EventTimeline().histogram() == []
@@ -0,0 +1,115 @@
+"""Test for generating PREMIS XML directly as bytes"""
+
+import lxml.etree as ET
+import pytest
+
+import premis.base as p
+import premis.event_base as e
+import premis.object_base as o
+import premis.agent_base as a
+import premis.xmlbytes as x
+
+# using lxml.etree causes these, but importing c extensions is not a problem
+# for us
+# pylint: disable=c-extension-no-member
+
+
+def _canonical(elem):
+    """Return canonicalized XML for an element or serialized element"""
+    if isinstance(elem, bytes):
+        elem = ET.fromstring(elem)
+    return ET.tostring(elem, method='c14n')
+
+
+@pytest.mark.parametrize('args', [
+    ('local', 'id01'),
+    ('local', 'id01', 'relatedObject'),
+    ('local', 'id01', 'event'),
+    ('local', 'id01', 'linkingAgent', 'tester'),
+    ('a&b', '<c>', 'dependency'),
+    (None, 'id01')
+])
+def test_identifier(args):
+    """Test identifier"""
+    assert _canonical(x.identifier(*args)) == _canonical(p.identifier(*args))
+
+
+def test_outcome():
+    """Test outcome with detail notes and extensions"""
+    extensions = [ET.fromstring('<xxx a="1"/>'), ET.fromstring('<yyy/>')]
+    for single in (True, False):
+        assert _canonical(x.outcome(
+            'success', 'OK', extensions, single)) == _canonical(e.outcome(
+                'success', 'OK', extensions, single))
+    assert _canonical(x.outcome('failure')) == _canonical(
+        e.outcome('failure'))
+
+
+def test_event():
+    """Test event with child and linking elements"""
+    def build(module):
+        """Build event with the builders of `module`"""
+        return module.event(
+            module.identifier('local', 'ev1', 'event'), 'tyyppi',
+            '2012-12-12T12:12:12', 'detaili\rä',
+            child_elements=[module.outcome('success')],
+            linking_objects=[module.identifier('local', 'obj1')],
+            linking_agents=[module.agent(
+                module.identifier('local', 'ag1', 'agent'), 'nimi', 'tyyppi')])
+
+    assert _canonical(build(x)) == _canonical(build(x.builders('lxml')))
+    assert build(x) == ET.tostring(
+        build(x.builders('lxml')), encoding='UTF-8')
+
+    linking_agent = p.identifier('local', 'ag2', 'linkingAgent', 'role')
+    assert _canonical(x.event(
+        x.identifier('local', 'ev1', 'event'), 'tyyppi', 'aika', 'detaili',
+        linking_agents=[linking_agent])) == _canonical(e.event(
+            p.identifier('local', 'ev1', 'event'), 'tyyppi', 'aika',
+            'detaili', linking_agents=[linking_agent]))
+    assert _canonical(x.event(
+        x.identifier('local', 'ev1', 'event'), 'tyyppi', 'aika', 'detaili',
+        linking_objects=[('local', 'obj1')],
+        linking_agents=[('local', 'ag2', 'role')])) == _canonical(e.event(
+            p.identifier('local', 'ev1', 'event'), 'tyyppi', 'aika',
+            'detaili', linking_objects=[p.identifier('local', 'obj1')],
+            linking_agents=[linking_agent]))
+
+
+def test_agent():
+    """Test agent"""
+    assert _canonical(x.agent(
+        x.identifier('a', 'b', 'agent'), 'c', 'd', 'e')) == _canonical(
+            a.agent(p.identifier('a', 'b', 'agent'), 'c', 'd', 'e'))
+
+
+def test_object():
+    """Test that object children are sorted like in premis.object"""
+    children = [
+        o.relationship('structural', 'includes', [p.identifier('a', 'b')]),
+        o.object_characteristics()]
+    assert _canonical(x.object(
+        x.identifier('a', 'b'), original_name='nimi',
+        child_elements=children, bitstream=True)) == _canonical(o.object(
+            p.identifier('a', 'b'), original_name='nimi',
+            child_elements=children, bitstream=True))
+
+
+def test_invalid_characters():
+    """Test that strings not allowed in XML are rejected"""
+    with pytest.raises(ValueError):
+        x.identifier('local', 'id\x00')
+
+
+def test_builders():
+    """Test selecting the backend"""
+    assert x.builders('bytes').event is x.event
+    assert x.builders('lxml').event is e.event
+    assert x.builders().event is e.event
+    x.set_default_backend('bytes')
+    try:
+        assert x.builders().event is x.event
+    finally:
+        x.set_default_backend('lxml')
+    with pytest.raises(ValueError):
+        x.set_default_backend('unknown')